@@ -0,0 +1,241 @@
+import numpy as np
+import pandas as pd
+from BlackScholesPricer import BlackScholesPricer
+from NormalizedChain import NormalizedChain
+from Profiler import profiler
+
+# Per-row flags, in report order
+CHECKS = ["no_bid", "monotonic", "vertical", "butterfly", "calendar"]
+
+
+class ArbitrageScanner:
+    """
+    Vectorized static-arbitrage checks over a sorted chain.
+
+    Within each (expiry, type) run of strikes, prices must be monotone
+    (calls non-increasing, puts non-decreasing in strike), vertical spreads
+    must cost no more than the discounted strike difference, and prices must
+    be convex in strike (no negative butterflies). Across expiries, total
+    implied variance at a fixed log-moneyness must not decrease with maturity.
+    Zero-bid quotes are flagged as well, since their mids are unreliable and
+    are the usual source of negative densities.
+
+    Every check is a comparison between neighbouring rows of the flat sorted
+    arrays. A whole snapshot history is scanned at once by grouping rows by
+    (snapshot, expiry) instead of expiry. repair() drops flagged quotes and
+    rescans, because removing a quote can expose a violation between its
+    former neighbours.
+    """
+
+    def __init__(self, r=0.0, prices="quotes", price_tol=0.01, variance_tol=1e-5, max_passes=5):
+        """
+        Parameters:
+        r : float or Series : Risk-free rate for the vertical-spread bound and IV repricing; a Series
+            indexed by expiry (e.g. ForwardCurve's rate column) gives a rate per expiry
+        prices : str : 'quotes' checks tradable arbitrage (buy at the ask, sell at the bid), 'mid'
+                 checks mid prices, and 'iv' checks Black-76 prices of the IV column, i.e. the
+                 inputs RNDCalculator and the smile fits actually use
+        price_tol : float : Price violations at or below this are ignored (quote rounding)
+        variance_tol : float : Total-variance decreases at or below this are ignored
+        max_passes : int : Scan / drop rounds made by repair()
+        """
+        if prices not in ("quotes", "mid", "iv"):
+            raise ValueError(f"Unknown price source: {prices}")
+        self.r = r
+        self.prices = prices
+        self.pricer = BlackScholesPricer()
+        self.price_tol = price_tol
+        self.variance_tol = variance_tol
+        self.max_passes = max_passes
+        self.dropped = 0
+
+    def scan(self, chain, forwards=None, valuation_date=None, iv_column="IV"):
+        """
+        Flag static-arbitrage violations in one snapshot.
+
+        Parameters:
+        chain : DataFrame or NormalizedChain : Combined chain in the CBOE column layout
+        forwards : float, array_like or Series : Forward per expiry; defaults to the index spot
+        valuation_date : Timestamp : Date the quotes were taken; defaults to today
+        iv_column : str : Column holding implied volatilities
+
+        Returns:
+        DataFrame : One boolean column per check plus 'violation', indexed by the chain's index
+                    labels in (expiry, type, strike) order
+        """
+        chain = self._normalize(chain, forwards, iv_column)
+        with profiler.stage("arbitrage_scan", rows=len(chain)):
+            flags = self._scan_chain(chain, valuation_date)
+            return self._frame(flags, chain.index)
+
+    def repair(self, chain, forwards=None, valuation_date=None, iv_column="IV", drop_no_bid=True):
+        """
+        Drop violating quotes until the chain scans clean (or max_passes is reached).
+
+        Parameters:
+        chain, forwards, valuation_date, iv_column : As for scan()
+        drop_no_bid : bool : Also drop zero-bid quotes
+
+        Returns:
+        NormalizedChain : The chain without the violating quotes, ready for the calculators; the
+                          number dropped is kept on self.dropped
+        """
+        chain = self._normalize(chain, forwards, iv_column)
+        checks = CHECKS if drop_no_bid else CHECKS[1:]
+        with profiler.stage("arbitrage_repair", rows=len(chain)) as event:
+            dropped = 0
+            for _ in range(self.max_passes):
+                flags = self._scan_chain(chain, valuation_date)
+                bad = np.logical_or.reduce([flags[name] for name in checks])
+                if not bad.any():
+                    break
+                dropped += int(bad.sum())
+                chain = chain.take(~bad)
+            event["dropped"] = dropped
+        self.dropped = dropped
+        return chain
+
+    def scan_history(self, history, iv_column="IV", forward_column="Index Spot"):
+        """
+        Flag violations in every snapshot of a history in one pass.
+
+        Parameters:
+        history : DataFrame : Rows with a 'Snapshot Time' column, as returned by SnapshotStore.query
+        iv_column : str : Column holding implied volatilities
+        forward_column : str : Column used as each row's forward
+
+        Returns:
+        DataFrame : One boolean column per check plus 'violation', aligned with history's index
+        """
+        with profiler.stage("arbitrage_scan_history", rows=len(history)) as event:
+            snapshot = pd.to_datetime(history["Snapshot Time"]).to_numpy()
+            expiry = pd.to_datetime(history["Expiration Date"]).to_numpy()
+            is_call = (history["Type"] == "Call").to_numpy(dtype=bool)
+            strike = history["Strike"].to_numpy(dtype=float)
+            order = np.lexsort((strike, ~is_call, expiry, snapshot))
+            snapshot, expiry = snapshot[order], expiry[order]
+
+            # Groups are (snapshot, expiry) runs; calendar pairs must share a snapshot
+            boundary = np.concatenate([[True], (snapshot[1:] != snapshot[:-1]) | (expiry[1:] != expiry[:-1])])
+            group = np.cumsum(boundary) - 1
+            starts = np.flatnonzero(boundary)
+            group_snapshot = snapshot[starts]
+            same_snapshot = group_snapshot[1:] == group_snapshot[:-1]
+            event["snapshots"] = len(np.unique(group_snapshot))
+
+            days = (expiry - snapshot.astype("datetime64[D]")).astype("timedelta64[D]").astype(float)
+            column = {name: pd.to_numeric(history[name], errors="coerce").to_numpy(dtype=float)[order]
+                      for name in ["Bid", "Ask", iv_column, forward_column]}
+            r = self.r
+            if isinstance(r, pd.Series):
+                r = r.set_axis(pd.to_datetime(r.index)).reindex(expiry).to_numpy(dtype=float)
+            flags = self._scan_arrays(group, is_call[order], strike[order], column["Bid"], column["Ask"],
+                                      column[iv_column], days / 365, column[forward_column], same_snapshot, r)
+            unsorted = {name: np.empty_like(values) for name, values in flags.items()}
+            for name, values in flags.items():
+                unsorted[name][order] = values
+            return self._frame(unsorted, history.index)
+
+    @staticmethod
+    def report(flags):
+        """
+        Print the number of flagged quotes per check.
+        """
+        counts = ", ".join(f"{name} {int(flags[name].sum())}" for name in CHECKS)
+        print(f"Arbitrage scan: {int(flags['violation'].sum())} of {len(flags)} quotes flagged ({counts})")
+
+    def _scan_chain(self, chain, valuation_date):
+        group = np.repeat(np.arange(len(chain.expiries)), chain.counts)
+        T = np.repeat(chain.time_to_expiry(valuation_date), chain.counts)
+        adjacent = np.ones(max(len(chain.expiries) - 1, 0), dtype=bool)
+        r = np.repeat(chain.per_expiry(self.r), chain.counts) if isinstance(self.r, pd.Series) else self.r
+        return self._scan_arrays(group, chain.is_call, chain.strike, chain.bid, chain.ask, chain.iv, T,
+                                 chain.forward, adjacent, r)
+
+    def _scan_arrays(self, group, is_call, strike, bid, ask, iv, T, forward, adjacent, r):
+        """
+        Run every check on flat arrays sorted by (group, type, strike), calls first.
+
+        adjacent[g] says whether groups g and g + 1 are consecutive expiries of the same snapshot;
+        r is a scalar or one rate per row.
+        """
+        n = len(strike)
+        flags = {name: np.zeros(n, dtype=bool) for name in CHECKS}
+        flags["no_bid"] = ~(bid > 0)
+
+        # Price checks run on the rows with usable prices, compacted so neighbours are adjacent
+        if self.prices == "iv":
+            rows = np.flatnonzero((iv > 0) & (T > 0) & (forward > 0))
+            rate = r[rows] if np.ndim(r) else r
+            buy = sell = self.pricer.price(forward[rows], strike[rows], T[rows], rate, iv[rows], is_call[rows])
+        else:
+            rows = np.flatnonzero((ask > 0) & (bid >= 0) & (ask >= bid))
+            if self.prices == "mid":
+                buy = sell = 0.5 * (bid[rows] + ask[rows])
+            else:
+                buy, sell = ask[rows], bid[rows]
+        K, call = strike[rows], is_call[rows]
+        segment = 2 * group[rows] + ~call
+        discount = np.exp(-(r[rows] if np.ndim(r) else r) * T[rows])
+
+        # Pairs (i, i + 1) with increasing strikes inside one (group, type) run. The long vertical
+        # holds the leg nearer the money (the lower strike for calls, the higher for puts)
+        pair = (segment[1:] == segment[:-1]) & (K[1:] > K[:-1])
+        dK = K[1:] - K[:-1]
+        near = np.where(call[:-1], np.arange(len(K) - 1), np.arange(1, len(K)))
+        far = np.where(call[:-1], np.arange(1, len(K)), np.arange(len(K) - 1))
+        # Buying the vertical must cost at least 0; selling it must bring in at most the discounted gap
+        monotonic = pair & (buy[near] - sell[far] < -self.price_tol)
+        vertical = pair & (sell[near] - buy[far] > discount[:-1] * dK + self.price_tol)
+        for name, bad in (("monotonic", monotonic), ("vertical", vertical)):
+            flags[name][rows[:-1][bad]] = True
+            flags[name][rows[1:][bad]] = True
+
+        # Triples (i, i + 1, i + 2): a butterfly long the weighted wings and short the body must not pay
+        triple = pair[:-1] & pair[1:]
+        weight = (K[2:] - K[1:-1]) / np.where(triple, K[2:] - K[:-2], 1.0)
+        butterfly = triple & (weight * buy[:-2] + (1.0 - weight) * buy[2:] - sell[1:-1] < -self.price_tol)
+        flags["butterfly"][rows[1:-1][butterfly]] = True
+
+        flags["calendar"] = self._calendar(group, strike, iv, T, forward, is_call, adjacent)
+        return flags
+
+    def _calendar(self, group, strike, iv, T, forward, is_call, adjacent):
+        flags = np.zeros(len(strike), dtype=bool)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            k = np.log(strike / forward)
+        # OTM quotes describe the smile; total variance at each point is compared with the next expiry
+        rows = np.flatnonzero((iv > 0) & (T > 0) & np.isfinite(k) & np.where(is_call, k >= 0, k < 0))
+        if len(rows) == 0 or not adjacent.any():
+            return flags
+        g, k, w = group[rows], k[rows], iv[rows] ** 2 * T[rows]
+
+        # One sort on (group, k) packed into a float key, as in NormalizedChain.smile()
+        span = k.max() - k.min() + 1.0
+        order = np.argsort(g * span + (k - k.min()), kind="stable")
+        rows, g, k, w = rows[order], g[order], k[order], w[order]
+        key = g * span + (k - k.min())
+
+        # Bracket each point's k inside the next group; points outside its k range are not compared
+        nxt = np.searchsorted(key, (g + 1) * span + (k - k.min()))
+        inside = (nxt > 0) & (nxt < len(key))
+        nxt = np.clip(nxt, 1, len(key) - 1)
+        inside &= (g[nxt] == g + 1) & (g[nxt - 1] == g + 1)
+        inside &= adjacent[np.minimum(g, len(adjacent) - 1)] & (g < len(adjacent))
+        gap = k[nxt] - k[nxt - 1]
+        fraction = np.where(gap > 0, (k - k[nxt - 1]) / np.where(gap > 0, gap, 1.0), 0.0)
+        w_next = w[nxt - 1] + fraction * (w[nxt] - w[nxt - 1])
+        flags[rows[inside & (w > w_next + self.variance_tol)]] = True
+        return flags
+
+    @staticmethod
+    def _normalize(chain, forwards, iv_column):
+        if isinstance(chain, NormalizedChain):
+            return chain.with_forwards(forwards)
+        return NormalizedChain(chain, forwards, iv_column)
+
+    @staticmethod
+    def _frame(flags, index):
+        frame = pd.DataFrame({name: flags[name] for name in CHECKS}, index=index)
+        frame["violation"] = frame.to_numpy().any(axis=1)
+        return frame
@@ -0,0 +1,138 @@
+import numpy as np
+from scipy.special import ndtr
+
+_INV_SQRT_2PI = 0.3989422804014327
+
+GREEKS = ("delta", "gamma", "vega", "theta", "vanna", "volga", "dual_delta", "dual_gamma", "dual_vanna")
+
+
+class BlackScholesPricer:
+    """
+    Vectorized Black-76 pricer on the forward.
+
+    Every input is broadcast against the others, so a (n_expiries, 1) column of
+    forwards/maturities and a (1, n_strikes) row of strikes prices a whole
+    surface in one call. Greeks are taken with respect to the forward (delta,
+    gamma), volatility (vega, vanna, volga), calendar time (theta, per year) and
+    strike (dual_delta, dual_gamma, dual_vanna).
+    """
+
+    def __init__(self, dtype=np.float64):
+        self.dtype = np.dtype(dtype)
+        if self.dtype not in (np.float32, np.float64):
+            raise ValueError(f"Unsupported dtype {self.dtype}; use float32 or float64")
+
+    def price(self, F, K, T, r, sigma, option_type="call", out=None):
+        """
+        Calculate Black-Scholes prices for arrays of options.
+
+        Parameters:
+        F : array_like : Forward price of the underlying
+        K : array_like : Strike price
+        T : array_like : Time to expiration in years
+        r : array_like : Risk-free interest rate
+        sigma : array_like : Implied volatility
+        option_type : str or array_like : 'call'/'put', or a per-option array of types or booleans (True = call)
+        out : ndarray : Optional preallocated output buffer
+
+        Returns:
+        ndarray : Option prices with the broadcast shape of the inputs
+        """
+        buffers = None if out is None else {"price": out}
+        return self.evaluate(F, K, T, r, sigma, option_type, out=buffers)["price"]
+
+    def evaluate(self, F, K, T, r, sigma, option_type="call", greeks=(), out=None):
+        """
+        Calculate prices and any requested Greeks in a single pass.
+
+        Parameters:
+        F, K, T, r, sigma : array_like : As for price()
+        option_type : str or array_like : As for price()
+        greeks : iterable : Names from GREEKS to compute alongside the price
+        out : dict : Optional preallocated buffers keyed by 'price' or Greek name
+
+        Returns:
+        dict : {'price': ndarray, <greek>: ndarray, ...}
+        """
+        greeks = tuple(greeks)
+        unknown = set(greeks) - set(GREEKS)
+        if unknown:
+            raise ValueError(f"Unknown Greeks requested: {sorted(unknown)}")
+
+        F, K, T, r, sigma, w = np.broadcast_arrays(
+            *(np.asarray(x, dtype=self.dtype) for x in (F, K, T, r, sigma)), self._sign(option_type)
+        )
+        results = {name: self._buffer(out, name, F.shape) for name in ("price",) + greeks}
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            sqrt_t = np.sqrt(T)
+            vol_sqrt_t = sigma * sqrt_t
+            d1 = np.log(F / K)
+            d1 += 0.5 * vol_sqrt_t * vol_sqrt_t
+            d1 /= vol_sqrt_t
+            d2 = d1 - vol_sqrt_t
+            df = np.exp(-r * T)
+
+            n_d1 = ndtr(w * d1)
+            n_d2 = ndtr(w * d2)
+            price = results["price"]
+            np.multiply(F, n_d1, out=price)
+            price -= K * n_d2
+            price *= w * df
+
+            if not greeks:
+                return results
+
+            pdf_d1 = np.exp(-0.5 * d1 * d1) * _INV_SQRT_2PI
+            vega = df * F * pdf_d1 * sqrt_t
+            for name in greeks:
+                buf = results[name]
+                if name == "delta":
+                    np.multiply(w * df, n_d1, out=buf)
+                elif name == "gamma":
+                    np.divide(df * pdf_d1, F * vol_sqrt_t, out=buf)
+                elif name == "vega":
+                    buf[...] = vega
+                elif name == "theta":
+                    np.multiply(-0.5 * sigma / T, vega, out=buf)
+                    buf += r * price
+                elif name == "vanna":
+                    np.multiply(-df * pdf_d1, d2 / sigma, out=buf)
+                elif name == "volga":
+                    np.multiply(vega, d1 * d2 / sigma, out=buf)
+                elif name == "dual_delta":
+                    np.multiply(-w * df, n_d2, out=buf)
+                elif name == "dual_gamma":
+                    # n(d2) * K == n(d1) * F, so reuse the d1 density
+                    np.divide(df * pdf_d1 * F, K * K * vol_sqrt_t, out=buf)
+                elif name == "dual_vanna":
+                    np.multiply(df * pdf_d1 * F / K, d1 / sigma, out=buf)
+        return results
+
+    def _sign(self, option_type):
+        if isinstance(option_type, str):
+            return self._type_sign(option_type)
+        types = np.asarray(option_type)
+        if types.dtype == bool:
+            is_call = types
+        else:
+            is_call = np.char.lower(types.astype(str)) == "call"
+        return np.where(is_call, 1.0, -1.0).astype(self.dtype)
+
+    def _type_sign(self, option_type):
+        option_type = option_type.lower()
+        if option_type == "call":
+            return self.dtype.type(1.0)
+        if option_type == "put":
+            return self.dtype.type(-1.0)
+        raise ValueError(f"Unknown option type: {option_type}")
+
+    def _buffer(self, out, name, shape):
+        if out is None or name not in out:
+            return np.empty(shape, dtype=self.dtype)
+        buf = out[name]
+        if buf.shape != shape or buf.dtype != self.dtype:
+            raise ValueError(
+                f"Buffer for '{name}' has shape {buf.shape} / dtype {buf.dtype}, expected {shape} / {self.dtype}"
+            )
+        return buf
@@ -1,25 +1,205 @@
 import os
 import csv
-import time
+import json
+import hashlib
+import numpy as np
 import pandas as pd
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.common.action_chains import ActionChains
-from selenium.webdriver.common.keys import Keys
-from fake_useragent import UserAgent
+from concurrent.futures import ThreadPoolExecutor
+import requests
+from requests.adapters import HTTPAdapter
+from ChainStore import ChainStore
+from SnapshotStore import SnapshotStore
+from RateLimiter import with_retries
+from Profiler import profiler
+
+# selenium and fake_useragent are imported by the methods that use them, so combine_csv_files needs neither
+
+CBOE_CDN_URL = "https://cdn.cboe.com"
+DELAYED_QUOTES_PATH = "/api/global/delayed_quotes/options/_{symbol}.json"
+
+QUOTE_COLUMNS = ['Last Sale', 'Net', 'Bid', 'Ask', 'Volume', 'IV', 'Delta', 'Gamma', 'Open Interest']
+INTEGER_COLUMNS = ['Volume', 'Open Interest']
+# Volume / OI can be blank in the export, so read them as floats and cast after filling
+CSV_DTYPES = {
+    'Expiration Date': str,
+    'Strike': 'float64',
+    **{col: 'float64' for col in QUOTE_COLUMNS},
+    **{f'{col}.1': 'float64' for col in QUOTE_COLUMNS},
+}
+
+
+def _parse_expiry_csv(file_path):
+    """
+    Parse one per-expiry CBOE quote-table export into long call/put rows.
+
+    Parameters:
+    file_path : str : Path to the downloaded CSV
+
+    Returns:
+    tuple : (DataFrame in the combined layout without 'Index Spot', index spot as float),
+            or None if the file cannot be parsed
+    """
+    try:
+        with open(file_path, newline='') as f:
+            reader = csv.reader(f)
+            next(reader)
+            idx_spot = float(next(reader)[1].split(" ")[1])
+            next(reader)
+            wide = pd.read_csv(f, usecols=list(CSV_DTYPES), dtype=CSV_DTYPES)
+    except (pd.errors.ParserError, StopIteration, IndexError, ValueError) as e:
+        print(f"Error parsing file {file_path}: {e}")
+        return None
+
+    # Stack the call block on top of the put block column by column: one allocation per output column
+    n = len(wide.index)
+    columns = {
+        'Expiration Date': np.concatenate([wide['Expiration Date'].to_numpy()] * 2),
+        **{col: np.concatenate([wide[col].to_numpy(), wide[f'{col}.1'].to_numpy()]) for col in QUOTE_COLUMNS},
+        'Strike': np.concatenate([wide['Strike'].to_numpy()] * 2),
+        'Type': np.repeat(np.array(['Call', 'Put'], dtype=object), n),
+    }
+    for col in INTEGER_COLUMNS:
+        columns[col] = np.nan_to_num(columns[col]).astype('int64')
+    return pd.DataFrame(columns), idx_spot
+
+
+def parse_delayed_quotes(payload):
+    """
+    Convert the CDN delayed-quotes JSON into the combined chain layout.
+
+    Parameters:
+    payload : dict : Decoded JSON with data.current_price and data.options[]
+
+    Returns:
+    DataFrame : Combined chain sorted by expiry and strike, calls before puts
+    """
+    data = payload["data"]
+    options = pd.DataFrame.from_records(data["options"])
+    # OSI-style symbols: root, YYMMDD expiry, C/P, strike * 1000 zero-padded to 8 digits
+    parts = options["option"].str.extract(r'^(?P<root>[A-Z]+)(?P<expiry>\d{6})(?P<type>[CP])(?P<strike>\d{8})$')
+    final_df = pd.DataFrame({
+        'Expiration Date': pd.to_datetime(parts['expiry'], format='%y%m%d'),
+        'Last Sale': options['last_trade_price'].astype('float64'),
+        'Net': options['change'].astype('float64'),
+        'Bid': options['bid'].astype('float64'),
+        'Ask': options['ask'].astype('float64'),
+        'Volume': options['volume'].fillna(0).astype('int64'),
+        'IV': options['iv'].astype('float64'),
+        'Delta': options['delta'].astype('float64'),
+        'Gamma': options['gamma'].astype('float64'),
+        'Open Interest': options['open_interest'].fillna(0).astype('int64'),
+        'Strike': parts['strike'].astype('int64') / 1000,
+        'Type': parts['type'].map({'C': 'Call', 'P': 'Put'}),
+    })
+    final_df = final_df.sort_values(by=['Expiration Date', 'Strike', 'Type'], kind='stable', ignore_index=True)
+    final_df['Index Spot'] = float(data['current_price'])
+    return final_df
+
+
+TABLE_ROW_XPATH = "//table//tbody/tr"
+EXPIRATION_BUTTON_XPATH = "//button[contains(@class, 'Button__StyledButton-cui__sc-1ahwe65-2')]"
+MANIFEST_FILE = "manifest.json"
+# Validators of the last HTTP payload, kept next to the store it was written to
+HTTP_CACHE_FILE = "http_cache.json"
+PARTIAL_SUFFIXES = ('.crdownload', '.tmp', '.part')
+
+
+class _DownloadCompleted:
+    """
+    WebDriverWait condition: a file that was not in the directory before the click exists,
+    is not a browser partial, and its size has stopped changing between polls.
+    """
+
+    def __init__(self, download_dir, existing_files):
+        self.download_dir = download_dir
+        self.existing_files = existing_files
+        self.sizes = {}
+
+    def __call__(self, driver):
+        new_files = set(os.listdir(self.download_dir)) - self.existing_files
+        if not new_files or any(f.endswith(PARTIAL_SUFFIXES) for f in new_files):
+            return False
+        if len(new_files) > 1:
+            raise RuntimeError(f"Expected one new download, found {sorted(new_files)}")
+        path = os.path.join(self.download_dir, new_files.pop())
+        size = os.path.getsize(path)
+        previous = self.sizes.get(path)
+        self.sizes[path] = size
+        return path if size > 0 and size == previous else False
+
+
+def _sha256(file_path):
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class _DownloadManifest:
+    """
+    Persistent record of the expirations already downloaded in a scrape session.
+
+    A rerun in the same session (by default, the same calendar day) skips any
+    expiration whose file is still on disk with the recorded hash.
+    """
+
+    def __init__(self, path, session=None):
+        self.path = path
+        self.session = session or pd.Timestamp.today().date().isoformat()
+        self.completed = {}
+        if os.path.exists(path):
+            with open(path) as f:
+                data = json.load(f)
+            if data.get('session') == self.session:
+                self.completed = data.get('completed', {})
+
+    def is_complete(self, expiration, file_path):
+        entry = self.completed.get(expiration)
+        return entry is not None and os.path.exists(file_path) and _sha256(file_path) == entry['sha256']
+
+    def record(self, expiration, file_path):
+        self.completed[expiration] = {'file': os.path.basename(file_path), 'sha256': _sha256(file_path)}
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump({'session': self.session, 'completed': self.completed}, f, indent=2)
+        os.replace(tmp_path, self.path)
+
 
 class CBOEDownloader:
-    def __init__(self, download_dir="./cboe_csvs"):
+    def __init__(self, download_dir="./cboe_csvs", store_dir="./chain_store", history_dir="./snapshot_store", export_csv=False,
+                 mode="http", symbol="SPX", base_url=CBOE_CDN_URL, record_dir=None, session=None, max_attempts=3,
+                 driver=None, driver_pool=None):
         self.download_dir = download_dir
+        # mode="http" pulls the delayed-quotes JSON directly; Selenium is the fallback
+        self.mode = mode
+        self.symbol = symbol
+        self.base_url = base_url
+        self.record_dir = record_dir
+        self.session = session
+        self.max_attempts = max_attempts
+        self.store = ChainStore(store_dir)
+        self.history = SnapshotStore(history_dir)
+        self.export_csv = export_csv
         os.makedirs(self.download_dir, exist_ok=True)
-        self.driver = self._setup_driver()
+        # A driver passed in, or borrowed from driver_pool (anything with acquire/release) for the Selenium
+        # fallback only, is shared: reuse it and leave it running
+        self.driver = driver
+        self.driver_pool = driver_pool
+        self._owns_driver = driver is None and driver_pool is None
+        # Set by refresh() when the server confirmed the stored quotes are current
+        self.unchanged = False
 
-    def _setup_driver(self):
+    @staticmethod
+    def create_driver(download_dir="./cboe_csvs"):
+        """
+        Launch a headless Chrome that saves downloads into download_dir.
+        """
+        from fake_useragent import UserAgent
+        from selenium import webdriver
         options = webdriver.ChromeOptions()
         prefs = {
-            "download.default_directory": os.path.abspath(self.download_dir),
+            "download.default_directory": os.path.abspath(download_dir),
             "download.prompt_for_download": False,
             "download.directory_upgrade": True,
             "safebrowsing.enabled": True,
@@ -42,19 +222,152 @@ class CBOEDownloader:
         options.add_argument("--disable-dev-shm-usage")
         return webdriver.Chrome(options=options)
 
-    def download_data(self):
-        url = "https://www.cboe.com/delayed_quotes/spx/quote_table"
+    @staticmethod
+    def create_session(pool_size=4):
+        """
+        Keep-alive HTTP session with a connection pool of pool_size, for fetch_http.
+        """
+        from fake_useragent import UserAgent
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        session.headers.update({
+            "User-Agent": UserAgent().random,
+            "Accept": "application/json",
+            "Accept-Encoding": "gzip, deflate",
+            "Connection": "keep-alive",
+        })
+        return session
+
+    def refresh(self):
+        """
+        Download and store a fresh combined chain, over HTTP when possible.
+
+        Returns:
+        bool : True if a snapshot was stored; False if nothing was, with self.unchanged set when that is
+               because the quotes were confirmed unchanged since the last stored fetch
+        """
+        self.unchanged = False
+        with profiler.stage("refresh", symbol=self.symbol, mode=self.mode):
+            if self.mode == "http":
+                try:
+                    final_df, validators = self.fetch_http()
+                except Exception as e:
+                    print(f"HTTP fetch failed ({e}); falling back to Selenium.")
+                else:
+                    if final_df is None:
+                        print(f"{self.symbol} quotes unchanged since the last fetch; keeping the stored snapshot.")
+                        self.unchanged = True
+                        return False
+                    # A failed save propagates (it is not an HTTP failure), and the payload is only marked
+                    # as seen once it is stored, so the next fetch retries it
+                    self._save_combined(final_df)
+                    self.remember_payload(validators)
+                    return True
+            self.download_data()
+            return self.combine_csv_files()
+
+    def fetch_http(self):
+        """
+        Fetch the full delayed-quote chain in one request on a pooled keep-alive session.
+
+        The request is conditional on the ETag / Last-Modified of the previous
+        payload, and the body is hashed, so an unchanged chain is neither parsed
+        nor written again. The new payload's validators are returned rather than
+        saved: pass them to remember_payload() once the chain has been stored.
+
+        Returns:
+        tuple : (DataFrame in the combined CBOE column layout, or None if unchanged since the last
+                stored fetch; validators for remember_payload, or None)
+        """
+        if self.session is None:
+            self.session = self.create_session()
+        url = self.base_url + DELAYED_QUOTES_PATH.format(symbol=self.symbol)
+        cache_path = os.path.join(self.store.root, HTTP_CACHE_FILE)
+        validators = {}
+        if os.path.exists(cache_path):
+            with open(cache_path) as f:
+                validators = json.load(f).get(url, {})
+        headers = {}
+        if validators.get('etag'):
+            headers['If-None-Match'] = validators['etag']
+        if validators.get('last_modified'):
+            headers['If-Modified-Since'] = validators['last_modified']
+
+        with profiler.stage("fetch_http", symbol=self.symbol) as event:
+            response = with_retries(self.session.get, url, headers=headers, timeout=30)
+            if response.status_code == 304:
+                return None, None
+            response.raise_for_status()
+            digest = hashlib.sha256(response.content).hexdigest()
+            if digest == validators.get('sha256'):
+                return None, None
+            if self.record_dir:
+                os.makedirs(self.record_dir, exist_ok=True)
+                with open(os.path.join(self.record_dir, os.path.basename(url)), "wb") as f:
+                    f.write(response.content)
+            final_df = parse_delayed_quotes(response.json())
+            event["rows"] = len(final_df)
+        return final_df, {url: {
+            'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified'),
+            'sha256': digest,
+        }}
+
+    def remember_payload(self, validators):
+        """
+        Record a stored payload's validators, so later fetches of the same payload are skipped.
+
+        Parameters:
+        validators : dict : As returned by fetch_http()
+        """
+        cache_path = os.path.join(self.store.root, HTTP_CACHE_FILE)
+        with open(f"{cache_path}.tmp", "w") as f:
+            json.dump(validators, f, indent=2)
+        os.replace(f"{cache_path}.tmp", cache_path)
+
+    def download_data(self, scrape_session=None):
+        borrowed = self.driver is None and self.driver_pool is not None
+        if borrowed:
+            self.driver = self.driver_pool.acquire()
+        try:
+            self._scrape(scrape_session)
+        finally:
+            if borrowed:
+                self.driver_pool.release(self.driver)
+                self.driver = None
+
+    def _scrape(self, scrape_session):
+        from selenium.webdriver.common.action_chains import ActionChains
+        from selenium.webdriver.common.by import By
+        from selenium.webdriver.common.keys import Keys
+        from selenium.webdriver.support import expected_conditions as EC
+        from selenium.webdriver.support.ui import WebDriverWait
+        url = f"https://www.cboe.com/delayed_quotes/{self.symbol.lower()}/quote_table"
+        if self.driver is None:
+            self.driver = self.create_driver(self.download_dir)
+        if not self._owns_driver:
+            # Shared drivers were launched with another download directory; point this run at ours
+            self.driver.execute_cdp_cmd("Browser.setDownloadBehavior", {
+                "behavior": "allow", "downloadPath": os.path.abspath(self.download_dir),
+            })
         self.driver.get(url)
         wait = WebDriverWait(self.driver, 15)
 
-        try:
-            # Dismiss cookies popup
-            reject_button_xpath = "//button[contains(@class, 'cky-btn-reject') and @aria-label='Reject All']"
-            reject_button = WebDriverWait(self.driver, 10).until(
-                EC.element_to_be_clickable((By.XPATH, reject_button_xpath))
-            )
-            reject_button.click()
+        if not getattr(self.driver, "cboe_cookies_dismissed", False):
+            try:
+                # Dismiss cookies popup (once per browser; the choice persists in its cookies)
+                reject_button_xpath = "//button[contains(@class, 'cky-btn-reject') and @aria-label='Reject All']"
+                reject_button = WebDriverWait(self.driver, 10).until(
+                    EC.element_to_be_clickable((By.XPATH, reject_button_xpath))
+                )
+                reject_button.click()
+                self.driver.cboe_cookies_dismissed = True
+            except Exception as e:
+                print(f"Error dismissing cookies popup: {e}")
 
+        try:
             # Select "All" from the dropdown
             dropdown_xpath = "//div[contains(@class, 'ReactSelect__control') and .//div[text()='Near the Money']]"
             dropdown = WebDriverWait(self.driver, 15).until(
@@ -76,98 +389,141 @@ class CBOEDownloader:
         except Exception as e:
             print(f"Error interacting with the dropdown: {e}")
 
-        processed_expirations = []
-        while True:
-            try:
-                expiration_buttons = wait.until(EC.presence_of_all_elements_located(
-                    (By.XPATH, "//button[contains(@class, 'Button__StyledButton-cui__sc-1ahwe65-2')]")
-                ))
-                expiration_buttons = [btn for btn in expiration_buttons if "20" in btn.text]
-
-                for i in range(len(expiration_buttons)):
-                    expiration_buttons = wait.until(EC.presence_of_all_elements_located(
-                        (By.XPATH, "//button[contains(@class, 'Button__StyledButton-cui__sc-1ahwe65-2')]")
-                    ))
-                    expiration_buttons = [btn for btn in expiration_buttons if "20" in btn.text]
-
-                    button = expiration_buttons[i]
-                    expiration = button.text.strip()
-
-                    if expiration in processed_expirations:
-                        continue
-
-                    print(f"Processing expiration: {expiration}")
-                    self.driver.execute_script("arguments[0].scrollIntoView(true);", button)
-                    time.sleep(1)
-                    self.driver.execute_script("arguments[0].click();", button)
-                    time.sleep(3)
-
-                    export_button_xpath = "//a[span[text()='Download CSV']]"
-                    export_button = wait.until(EC.presence_of_element_located((By.XPATH, export_button_xpath)))
-                    print(f"Clicking 'Download CSV' button for {expiration}")
-                    self.driver.execute_script("arguments[0].click();", export_button)
-                    time.sleep(5)
-
-                    latest_file = max([os.path.join(self.download_dir, f) for f in os.listdir(self.download_dir)], key=os.path.getctime)
-                    new_file_name = os.path.join(self.download_dir, f"{expiration.replace(' ', '_')}.csv")
-                    os.rename(latest_file, new_file_name)
-                    print(f"File saved as {new_file_name}")
-                    processed_expirations.append(expiration)
-
-                if len(processed_expirations) >= len(expiration_buttons):
+        manifest = _DownloadManifest(os.path.join(self.download_dir, MANIFEST_FILE), scrape_session)
+        try:
+            # Read the expiration labels once; each button is looked up by its label when needed
+            expirations = [
+                btn.text.strip()
+                for btn in wait.until(EC.presence_of_all_elements_located((By.XPATH, EXPIRATION_BUTTON_XPATH)))
+                if "20" in btn.text
+            ]
+            pending = [e for e in expirations if not manifest.is_complete(e, self._expiration_file(e))]
+            if len(pending) < len(expirations):
+                print(f"Skipping {len(expirations) - len(pending)} expirations already downloaded this session.")
+
+            for attempt in range(1, self.max_attempts + 1):
+                failed = []
+                for expiration in pending:
+                    try:
+                        with profiler.stage("download_expiry", symbol=self.symbol, expiration=expiration):
+                            manifest.record(expiration, self._download_expiration(expiration, wait))
+                    except Exception as e:
+                        print(f"Error processing expiration {expiration} (attempt {attempt}): {e}")
+                        failed.append(expiration)
+                pending = failed
+                if not pending:
                     break
-            except KeyboardInterrupt:
-                break
-            except Exception as e:
-                print(f"Error locating or processing expiration buttons: {e}")
-                break
+            if pending:
+                print(f"Giving up on {len(pending)} expirations after {self.max_attempts} attempts: {pending}")
+        except KeyboardInterrupt:
+            print(f"Interrupted; completed expirations are recorded in {manifest.path}")
+        except Exception as e:
+            print(f"Error locating expiration buttons: {e}")
+        finally:
+            if self._owns_driver:
+                self.driver.quit()
+                self.driver = None
 
-        self.driver.quit()
+    def _download_expiration(self, expiration, wait):
+        from selenium.webdriver.common.by import By
+        from selenium.webdriver.support import expected_conditions as EC
+        print(f"Processing expiration: {expiration}")
+        button = wait.until(EC.presence_of_element_located(
+            (By.XPATH, f"{EXPIRATION_BUTTON_XPATH}[normalize-space()='{expiration}']")
+        ))
+        self.driver.execute_script("arguments[0].scrollIntoView(true);", button)
+        wait.until(EC.element_to_be_clickable(button))
+        first_row = self._first_table_row()
+        self.driver.execute_script("arguments[0].click();", button)
+        self._wait_for_table_refresh(first_row)
 
-    def combine_csv_files(self):
-        all_data = pd.DataFrame()
-        current_idx_flag = False
-        for file in os.listdir(self.download_dir):
-            if file.endswith(".csv"):
-                file_path = os.path.join(self.download_dir, file)
-                try:
-                    if not current_idx_flag:
-                        with open(file_path, newline='') as f:
-                            reader = csv.reader(f)
-                            row1 = next(reader)
-                            row2 = next(reader)
-                            idx_spot = row2[1].split(" ")[1]
-                        current_idx_flag = True
-
-                    df = pd.read_csv(file_path, skiprows=3).fillna('')
-                    call_column_headers = ['Expiration Date', 'Last Sale', 'Net', 'Bid', 'Ask', 'Volume', 'IV', 'Delta', 'Gamma', 'Open Interest', 'Strike']
-                    put_column_headers = ['Expiration Date', 'Last Sale.1', 'Net.1', 'Bid.1', 'Ask.1', 'Volume.1', 'IV.1', 'Delta.1', 'Gamma.1', 'Open Interest.1', 'Strike']
-
-                    df_calls = df[call_column_headers].copy().dropna(how='any', axis=1)
-                    df_calls['Type'] = 'Call'
-                    df_calls.columns = df_calls.columns.str.replace(r'\.1$', '', regex=True)
-
-                    df_puts = df[put_column_headers].copy().dropna(how='any', axis=1)
-                    df_puts['Type'] = 'Put'
-                    df_puts.columns = df_puts.columns.str.replace(r'\.1$', '', regex=True)
-
-                    df = pd.concat([df_calls, df_puts], ignore_index=True)
-                    all_data = pd.concat([all_data, df], ignore_index=True)
-                except pd.errors.ParserError as e:
-                    print(f"Error parsing file {file_path}: {e}")
-                    continue
+        export_button_xpath = "//a[span[text()='Download CSV']]"
+        export_button = wait.until(EC.element_to_be_clickable((By.XPATH, export_button_xpath)))
+        print(f"Clicking 'Download CSV' button for {expiration}")
+        existing_files = set(os.listdir(self.download_dir))
+        self.driver.execute_script("arguments[0].click();", export_button)
+        downloaded_file = self._wait_for_download(existing_files)
+        self._check_expiration(downloaded_file, expiration)
+
+        new_file_name = self._expiration_file(expiration)
+        os.replace(downloaded_file, new_file_name)
+        print(f"File saved as {new_file_name}")
+        return new_file_name
+
+    @staticmethod
+    def _check_expiration(file_path, expiration):
+        # A table that had not re-rendered yet exports the previous expiration; drop the file and raise so the
+        # expiration is retried instead of being saved under the wrong name
+        expected = pd.to_datetime(expiration).normalize()
+        with open(file_path, newline='') as f:
+            for _ in range(3):
+                next(f, None)
+            found = pd.read_csv(f, usecols=['Expiration Date'], dtype=str)['Expiration Date'].dropna().unique()
+        dates = set(pd.to_datetime(found, format='%a %b %d %Y'))
+        if dates != {expected}:
+            os.remove(file_path)
+            shown = sorted(d.strftime('%Y-%m-%d') for d in dates)
+            raise RuntimeError(f"Downloaded table is for {shown}, not {expected:%Y-%m-%d}")
+
+    def _expiration_file(self, expiration):
+        return os.path.join(self.download_dir, f"{expiration.replace(' ', '_')}.csv")
+
+    def _first_table_row(self):
+        from selenium.webdriver.common.by import By
+        rows = self.driver.find_elements(By.XPATH, TABLE_ROW_XPATH)
+        return rows[0] if rows else None
+
+    def _wait_for_table_refresh(self, previous_row, timeout=10):
+        from selenium.common.exceptions import TimeoutException
+        from selenium.webdriver.common.by import By
+        from selenium.webdriver.support import expected_conditions as EC
+        from selenium.webdriver.support.ui import WebDriverWait
+        # The quote table is re-rendered when a new expiration loads, detaching the old rows.
+        # If the clicked expiration was already showing nothing re-renders, so a timeout is not an error by
+        # itself: _check_expiration rejects the export if the table still shows another expiration.
+        try:
+            if previous_row is not None:
+                WebDriverWait(self.driver, timeout, poll_frequency=0.1).until(EC.staleness_of(previous_row))
+            WebDriverWait(self.driver, timeout, poll_frequency=0.1).until(
+                EC.presence_of_element_located((By.XPATH, TABLE_ROW_XPATH))
+            )
+        except TimeoutException:
+            print(f"Quote table did not refresh within {timeout}s; the export will be checked against the expiration.")
+
+    def _wait_for_download(self, existing_files, timeout=60):
+        """
+        Block until exactly the file started by the last click has finished downloading.
+        """
+        from selenium.webdriver.support.ui import WebDriverWait
+        return WebDriverWait(self.driver, timeout, poll_frequency=0.1).until(
+            _DownloadCompleted(self.download_dir, existing_files),
+            message=f"No completed download appeared in {self.download_dir}",
+        )
+
+    def combine_csv_files(self, max_workers=None):
+        """
+        Combine the downloaded per-expiry CSVs into one snapshot and store it.
+
+        Returns:
+        bool : True if a snapshot was stored, False if there was nothing to combine
+        """
+        files = sorted(os.path.join(self.download_dir, f) for f in os.listdir(self.download_dir) if f.endswith(".csv"))
+        with profiler.stage("parse_csvs", files=len(files)) as event:
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                parsed = [result for result in executor.map(_parse_expiry_csv, files) if result is not None]
+            event["rows"] = sum(len(df) for df, _ in parsed)
+
+        with profiler.stage("concat", frames=len(parsed)) as event:
+            all_data = pd.concat([df for df, _ in parsed], ignore_index=True) if parsed else pd.DataFrame()
+            event["rows"] = len(all_data)
+        idx_spot = parsed[0][1] if parsed else None
 
         if len(all_data.index) != 0:
-            final_df = all_data.copy()
+            final_df = all_data
             final_df['Expiration Date'] = pd.to_datetime(final_df['Expiration Date'], format='%a %b %d %Y')
-            final_df = final_df.sort_values(by=['Expiration Date', 'Strike'])
+            final_df = final_df.sort_values(by=['Expiration Date', 'Strike'], kind='stable', ignore_index=True)
             final_df['Index Spot'] = idx_spot
-
-            combined_csv_path = "spx_options_combined.csv"
-            if os.path.exists(combined_csv_path):
-                os.remove(combined_csv_path)
-            final_df.to_csv(combined_csv_path, index=False)
-            print(f"Data saved to {combined_csv_path}")
+            self._save_combined(final_df)
 
             for file in os.listdir(self.download_dir):
                 if file.endswith(".csv"):
@@ -177,5 +533,20 @@ class CBOEDownloader:
                         print(f"Deleted file: {file_path}")
                     except OSError as e:
                         print(f"Error deleting file {file_path}: {e}")
-        else:
-            print("No valid data to save.")
\ No newline at end of file
+            manifest_path = os.path.join(self.download_dir, MANIFEST_FILE)
+            if os.path.exists(manifest_path):
+                os.remove(manifest_path)
+            return True
+        print("No valid data to save.")
+        return False
+
+    def _save_combined(self, final_df):
+        with profiler.stage("store_write", rows=len(final_df)) as event:
+            self.store.write(final_df)
+            event["unchanged_expiries"] = len(self.store.unchanged)
+        with profiler.stage("history_append", rows=len(final_df)):
+            self.history.append(final_df)
+        print(f"Data saved to {self.store.root} ({len(self.store.unchanged)} unchanged expiries skipped) "
+              f"and appended to {self.history.root}")
+        if self.export_csv:
+            self.store.export_csv("spx_options_combined.csv")
\ No newline at end of file
@@ -0,0 +1,133 @@
+import gzip
+import hashlib
+import json
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+import pandas as pd
+
+
+class CBOEReplayServer:
+    """
+    Local stand-in for the CBOE delayed-quotes CDN.
+
+    Serves JSON payloads recorded by CBOEDownloader(record_dir=...) (or built
+    with write_fixture) from fixture_dir, keyed by file name, so the HTTP fetch
+    mode can be tested and benchmarked offline. Responses are gzip-encoded when
+    the client asks for it and carry an ETag honoured by If-None-Match, as the
+    CDN does.
+
+    Usage:
+        with CBOEReplayServer("./fixtures") as server:
+            CBOEDownloader(base_url=server.url).refresh()
+    """
+
+    def __init__(self, fixture_dir, host="127.0.0.1", port=0):
+        self.fixture_dir = fixture_dir
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _handler(self):
+        fixture_dir = self.fixture_dir
+        compressed = {}
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                path = os.path.join(fixture_dir, os.path.basename(self.path.split("?")[0]))
+                if not os.path.isfile(path):
+                    self.send_error(404)
+                    return
+                with open(path, "rb") as f:
+                    body = f.read()
+                etag = f'"{hashlib.sha256(body).hexdigest()[:16]}"'
+                if self.headers.get("If-None-Match") == etag:
+                    self.send_response(304)
+                    self.send_header("ETag", etag)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("ETag", etag)
+                if "gzip" in self.headers.get("Accept-Encoding", ""):
+                    if (path, etag) not in compressed:
+                        compressed[path, etag] = gzip.compress(body)
+                    body = compressed[path, etag]
+                    self.send_header("Content-Encoding", "gzip")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+
+def write_fixture(chain, fixture_dir, symbol="SPX"):
+    """
+    Build a CDN-shaped JSON fixture from a combined chain (e.g. spx_options_combined.csv).
+
+    Parameters:
+    chain : DataFrame : Combined chain in the CBOE column layout
+    fixture_dir : str : Directory to write the fixture into
+    symbol : str : Underlying symbol; the file is named _<symbol>.json
+
+    Returns:
+    str : Path of the written fixture
+    """
+    os.makedirs(fixture_dir, exist_ok=True)
+    expiry = pd.to_datetime(chain["Expiration Date"]).dt.strftime("%y%m%d")
+    strike = (chain["Strike"].to_numpy(dtype=float) * 1000).round().astype(np.int64)
+    option = (symbol + "W" + expiry + chain["Type"].astype(str).str[0]
+              + pd.Series(strike, index=chain.index).map("{:08d}".format))
+    options = pd.DataFrame({
+        "option": option,
+        "bid": chain["Bid"],
+        "ask": chain["Ask"],
+        "iv": chain["IV"],
+        "open_interest": chain["Open Interest"],
+        "volume": chain["Volume"],
+        "delta": chain["Delta"],
+        "gamma": chain["Gamma"],
+        "change": chain["Net"],
+        "last_trade_price": chain["Last Sale"],
+    })
+    payload = {
+        "timestamp": pd.Timestamp.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "data": {
+            "symbol": f"_{symbol}",
+            "current_price": float(chain["Index Spot"].iloc[0]),
+            "options": options.to_dict("records"),
+        },
+    }
+    path = os.path.join(fixture_dir, f"_{symbol}.json")
+    with open(path, "w") as f:
+        json.dump(payload, f)
+    return path
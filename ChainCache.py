@@ -0,0 +1,150 @@
+import json
+import os
+from datetime import datetime
+
+import pandas as pd
+
+MARKET_TIMEZONE = "America/New_York"
+# Regular session for index options, including the 15 minute SPX post-close
+MARKET_OPEN = pd.Timedelta(hours=9, minutes=30)
+MARKET_CLOSE = pd.Timedelta(hours=16, minutes=15)
+CACHE_FILE = "cache.json"
+
+
+def market_is_open(now=None):
+    """
+    Whether US index options are in their regular session (weekends are closed; exchange holidays are not modelled).
+
+    Parameters:
+    now : Timestamp : Time to check; naive times are taken as local time. Defaults to now
+
+    Returns:
+    bool : True during the regular session
+    """
+    now = _market_time(now).tz_localize(None)
+    session = now - now.normalize()
+    return now.weekday() < 5 and MARKET_OPEN <= session < MARKET_CLOSE
+
+
+def last_market_close(now=None):
+    """
+    Most recent regular-session close at or before now.
+
+    Parameters:
+    now : Timestamp : Reference time; naive times are taken as local time. Defaults to now
+
+    Returns:
+    Timestamp : Close time in the market timezone
+    """
+    now = _market_time(now)
+    # Step back in wall-clock days so the close stays at 16:15 across DST changes
+    close = now.tz_localize(None).normalize() + MARKET_CLOSE
+    if close > now.tz_localize(None):
+        close -= pd.Timedelta(days=1)
+    while close.weekday() >= 5:
+        close -= pd.Timedelta(days=1)
+    return close.tz_localize(MARKET_TIMEZONE)
+
+
+def _market_time(t):
+    t = pd.Timestamp.now(tz=MARKET_TIMEZONE) if t is None else pd.Timestamp(t)
+    if t.tzinfo is None:
+        # Snapshot times are stored as naive local time
+        t = t.tz_localize(datetime.now().astimezone().tzinfo)
+    return t.tz_convert(MARKET_TIMEZONE)
+
+
+class ChainCache:
+    """
+    Freshness-aware front for CBOEDownloader and YFinanceDownloader.
+
+    The stored snapshot is reused while it is younger than ttl seconds, or, when
+    the market is closed, if it was taken after the last close. Otherwise the
+    downloader refreshes; unchanged payloads and unchanged expiry partitions are
+    skipped by content hash further down (CBOEDownloader.fetch_http and
+    ChainStore.write). The time of the last successful check is kept in
+    <store root>/cache.json so unchanged refreshes also count as fresh.
+    """
+
+    def __init__(self, downloader, ttl=900, reuse_when_closed=True):
+        self.downloader = downloader
+        self.ttl = pd.Timedelta(seconds=ttl)
+        self.reuse_when_closed = reuse_when_closed
+        self.path = os.path.join(downloader.store.root, CACHE_FILE)
+        self.stats = {"hits": 0, "misses": 0, "expiries_written": 0, "expiries_unchanged": 0}
+
+    def refresh(self, force=False, now=None):
+        """
+        Make sure the store holds a fresh snapshot, downloading only when needed.
+
+        Parameters:
+        force : bool : Download even if the stored snapshot is fresh
+        now : Timestamp : Current time (for testing); defaults to now
+
+        Returns:
+        bool : True on a cache hit (no download was needed)
+        """
+        now = _market_time(now)
+        checked = self.last_checked()
+        if not force and self.is_fresh(checked, now):
+            self.stats["hits"] += 1
+            print(f"Cache hit: using snapshot checked at {checked:%Y-%m-%d %H:%M:%S %Z} "
+                  f"({self._age(checked, now)} old).")
+            return True
+
+        self.stats["misses"] += 1
+        reason = "forced" if force else ("empty" if checked is None else f"stale, {self._age(checked, now)} old")
+        print(f"Cache miss ({reason}): refreshing.")
+        store, history = self.downloader.store, self.downloader.history
+        before = history.snapshot_times()[-1:]
+        # Judge the refresh by what reached the history, not only by its return value: a fallback that
+        # stored nothing must not count as a fresh check
+        if self.downloader.refresh() and history.snapshot_times()[-1:] != before:
+            self.stats["expiries_unchanged"] += len(store.unchanged)
+            self.stats["expiries_written"] += len(store.expiries()) - len(store.unchanged)
+        elif self.downloader.unchanged:
+            self.stats["expiries_unchanged"] += len(store.expiries())
+        else:
+            print("Refresh stored no snapshot; the stored one stays stale.")
+            self.report()
+            return False
+        self._record_check(now)
+        self.report()
+        return False
+
+    def is_fresh(self, checked, now=None):
+        """
+        Whether a snapshot checked at `checked` can be reused at `now`.
+        """
+        if checked is None:
+            return False
+        now = _market_time(now)
+        if now - checked < self.ttl:
+            return True
+        return self.reuse_when_closed and not market_is_open(now) and checked >= last_market_close(now)
+
+    def last_checked(self):
+        """
+        Time the stored snapshot was last downloaded or confirmed unchanged, in the market timezone.
+        """
+        if os.path.exists(self.path):
+            with open(self.path) as f:
+                return _market_time(json.load(f)["checked"])
+        times = self.downloader.history.snapshot_times()
+        if times and self.downloader.store.expiries():
+            return _market_time(times[-1])
+        return None
+
+    def report(self):
+        stats = self.stats
+        print(f"Cache: {stats['hits']} hits, {stats['misses']} misses; expiries written "
+              f"{stats['expiries_written']}, unchanged {stats['expiries_unchanged']}.")
+
+    def _record_check(self, now):
+        with open(f"{self.path}.tmp", "w") as f:
+            json.dump({"checked": now.isoformat()}, f)
+        os.replace(f"{self.path}.tmp", self.path)
+
+    @staticmethod
+    def _age(checked, now):
+        return str(pd.Timedelta(seconds=round((now - checked).total_seconds())))
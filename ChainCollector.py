@@ -0,0 +1,150 @@
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from CBOEDownloader import CBOE_CDN_URL, CBOEDownloader
+from YFinanceDownloader import YFinanceDownloader
+
+
+class ResourcePool:
+    """
+    Bounded pool of reusable, expensive resources (WebDriver instances, HTTP sessions).
+
+    Resources are created lazily by factory, up to size, and handed back out on
+    later acquisitions, so launch and login costs are paid once per resource
+    rather than once per ticker per refresh.
+    """
+
+    def __init__(self, factory, size, close=None):
+        self.factory = factory
+        self.size = size
+        self.close_resource = close
+        self._idle = queue.LifoQueue()
+        self._created = []
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if len(self._created) < self.size:
+                resource = self.factory()
+                self._created.append(resource)
+                return resource
+        return self._idle.get()
+
+    def release(self, resource):
+        self._idle.put(resource)
+
+    def close(self):
+        with self._lock:
+            if self.close_resource is not None:
+                for resource in self._created:
+                    self.close_resource(resource)
+            self._created = []
+            self._idle = queue.LifoQueue()
+
+
+class ChainCollector:
+    """
+    Scheduled collection of option chains for several underlyings.
+
+    Every refresh runs all underlyings concurrently on at most max_workers
+    threads, borrowing a pooled HTTP session (and, when the CBOE downloader falls
+    back to Selenium, a pooled WebDriver). Each underlying writes to its own
+    partition: <root>/<SYMBOL>/chain_store and <root>/<SYMBOL>/snapshot_store.
+    """
+
+    def __init__(self, underlyings, interval=900, source="cboe", root="./collections", max_workers=4,
+                 mode="http", base_url=CBOE_CDN_URL):
+        self.underlyings = list(underlyings)
+        self.interval = interval
+        self.source = source
+        self.root = root
+        self.max_workers = max_workers
+        self.mode = mode
+        self.base_url = base_url
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._sessions = None
+        self._drivers = None
+
+    def run(self, cycles=None):
+        """
+        Refresh every underlying each interval until stop() is called or cycles refreshes have run.
+        """
+        try:
+            cycle = 0
+            while not self._stop.is_set() and (cycles is None or cycle < cycles):
+                started = time.monotonic()
+                self.collect_once()
+                cycle += 1
+                if cycles is None or cycle < cycles:
+                    self._stop.wait(max(0.0, self.interval - (time.monotonic() - started)))
+        finally:
+            self.close()
+
+    def stop(self):
+        self._stop.set()
+
+    def collect_once(self):
+        """
+        Refresh all underlyings concurrently.
+
+        Returns:
+        dict : {symbol: None on success or the exception raised}
+        """
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {symbol: executor.submit(self._collect, symbol) for symbol in self.underlyings}
+        results = {}
+        for symbol, future in futures.items():
+            results[symbol] = future.exception()
+            if results[symbol] is not None:
+                print(f"Refresh of {symbol} failed: {results[symbol]}")
+        return results
+
+    def close(self):
+        for pool in (self._sessions, self._drivers):
+            if pool is not None:
+                pool.close()
+
+    def partition(self, symbol):
+        return os.path.join(self.root, symbol.upper())
+
+    def _collect(self, symbol):
+        partition = self.partition(symbol)
+        store_dir = os.path.join(partition, "chain_store")
+        history_dir = os.path.join(partition, "snapshot_store")
+        if self.source == "yfinance":
+            YFinanceDownloader(ticker=symbol, store_dir=store_dir, history_dir=history_dir).refresh()
+            return
+
+        sessions = self._session_pool()
+        session = sessions.acquire()
+        try:
+            CBOEDownloader(
+                download_dir=os.path.join(partition, "cboe_csvs"), store_dir=store_dir, history_dir=history_dir,
+                mode=self.mode, symbol=symbol.upper(), base_url=self.base_url, session=session,
+                driver_pool=self._driver_pool(),
+            ).refresh()
+        finally:
+            sessions.release(session)
+
+    def _session_pool(self):
+        with self._lock:
+            if self._sessions is None:
+                self._sessions = ResourcePool(
+                    CBOEDownloader.create_session, self.max_workers, close=lambda session: session.close()
+                )
+        return self._sessions
+
+    def _driver_pool(self):
+        # Drivers are only launched when a refresh falls back to Selenium; each run redirects its downloads
+        with self._lock:
+            if self._drivers is None:
+                self._drivers = ResourcePool(lambda: CBOEDownloader.create_driver(os.path.join(self.root, "cboe_csvs")),
+                                             self.max_workers, close=lambda driver: driver.quit())
+        return self._drivers
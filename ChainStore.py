@@ -0,0 +1,200 @@
+import hashlib
+import json
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.ipc as ipc
+
+CHAIN_SCHEMA = pa.schema([
+    ("Expiration Date", pa.date32()),
+    ("Last Sale", pa.float64()),
+    ("Net", pa.float64()),
+    ("Bid", pa.float64()),
+    ("Ask", pa.float64()),
+    ("Volume", pa.int64()),
+    ("IV", pa.float64()),
+    ("Delta", pa.float64()),
+    ("Gamma", pa.float64()),
+    ("Open Interest", pa.int64()),
+    ("Strike", pa.float64()),
+    ("Type", pa.dictionary(pa.int8(), pa.string())),
+    ("Index Spot", pa.float64()),
+])
+
+PARTITION_FILE = "chain.arrow"
+HASH_FILE = "hashes.json"
+
+
+def to_chain_table(df):
+    """
+    Coerce a combined-chain DataFrame to CHAIN_SCHEMA.
+
+    Missing columns are filled with nulls and extra columns are dropped, so both
+    downloaders produce identical tables.
+
+    Parameters:
+    df : DataFrame : Combined chain in the CBOE column layout
+
+    Returns:
+    pa.Table : Table with exactly the CHAIN_SCHEMA columns and types
+    """
+    df = df.reindex(columns=CHAIN_SCHEMA.names)
+    df["Expiration Date"] = pd.to_datetime(df["Expiration Date"]).dt.date
+    for field in CHAIN_SCHEMA:
+        if pa.types.is_integer(field.type):
+            df[field.name] = pd.to_numeric(df[field.name], errors="coerce").fillna(0).astype("int64")
+        elif pa.types.is_floating(field.type):
+            df[field.name] = pd.to_numeric(df[field.name], errors="coerce")
+    # Fixed category order keeps the Type dictionary (and so partition bytes) stable between downloads
+    df["Type"] = pd.Categorical(df["Type"], categories=sorted(df["Type"].dropna().unique()))
+    return pa.Table.from_pandas(df, schema=CHAIN_SCHEMA, preserve_index=False)
+
+
+class ChainStore:
+    """
+    Combined option chain stored as one Arrow IPC file per expiration date.
+
+    Partitions are uncompressed IPC files so readers memory-map them: opening a
+    snapshot costs no parsing, pages are shared between processes reading the
+    same files, and loading one expiry never touches the others.
+
+    A SHA-256 of each partition's bytes is kept in hashes.json; partitions whose
+    content has not changed since the last write are left untouched.
+    """
+
+    def __init__(self, root="./chain_store"):
+        self.root = root
+        os.makedirs(self.root, exist_ok=True)
+        self.hash_path = os.path.join(self.root, HASH_FILE)
+        self.hashes = {}
+        if os.path.exists(self.hash_path):
+            with open(self.hash_path) as f:
+                self.hashes = json.load(f)
+        # Expiries whose partition was unchanged by the last write()
+        self.unchanged = []
+
+    def write(self, df):
+        """
+        Replace the stored snapshot with a new combined chain.
+
+        Parameters:
+        df : DataFrame : Combined chain in the CBOE column layout
+
+        Returns:
+        list : Expiration dates written
+        """
+        table = to_chain_table(df)
+        # Sorting on Type's dictionary codes (categories are sorted) makes row order independent of input order
+        keys = pa.table({
+            "expiry": table["Expiration Date"], "strike": table["Strike"],
+            "type": table.column("Type").combine_chunks().indices,
+        })
+        table = table.take(pc.sort_indices(keys, sort_keys=[(name, "ascending") for name in keys.column_names]))
+        # Sorted by expiry, so each partition is a zero-copy slice of the table
+        unique, starts, counts = np.unique(
+            table.column("Expiration Date").to_numpy(), return_index=True, return_counts=True
+        )
+        expiries = [pd.Timestamp(expiry).date() for expiry in unique]
+        self.unchanged = [
+            expiry for expiry, start, count in zip(expiries, starts, counts)
+            if not self._write_partition(expiry, table.slice(start, count))
+        ]
+
+        stale = set(self.expiries()) - set(expiries)
+        for expiry in stale:
+            shutil.rmtree(self._partition_dir(expiry), ignore_errors=True)
+            self.hashes.pop(expiry.isoformat(), None)
+        with open(f"{self.hash_path}.tmp", "w") as f:
+            json.dump(self.hashes, f, indent=2)
+        os.replace(f"{self.hash_path}.tmp", self.hash_path)
+        return expiries
+
+    def read_table(self, expiries=None, columns=None):
+        """
+        Memory-map the requested partitions as an Arrow table.
+
+        Parameters:
+        expiries : iterable : Expiration dates to load; defaults to all stored expiries
+        columns : list : Column subset to return
+
+        Returns:
+        pa.Table : Concatenated partitions in expiry order
+        """
+        expiries = self.expiries() if expiries is None else sorted(pd.to_datetime(list(expiries)).date)
+        tables = []
+        for expiry in expiries:
+            path = self._partition_path(expiry)
+            if not os.path.exists(path):
+                continue
+            with pa.memory_map(path, "r") as source:
+                table = ipc.open_file(source).read_all()
+            tables.append(table.select(columns) if columns else table)
+        if not tables:
+            schema = CHAIN_SCHEMA if not columns else pa.schema([CHAIN_SCHEMA.field(c) for c in columns])
+            return schema.empty_table()
+        return pa.concat_tables(tables)
+
+    def read(self, expiries=None, columns=None):
+        """
+        Load the requested partitions as a DataFrame.
+
+        Parameters:
+        expiries : iterable : Expiration dates to load; defaults to all stored expiries
+        columns : list : Column subset to return
+
+        Returns:
+        DataFrame : Combined chain with 'Expiration Date' as datetime64
+        """
+        return self.read_table(expiries, columns).to_pandas(date_as_object=False)
+
+    def expiries(self):
+        """
+        List the stored expiration dates in ascending order.
+        """
+        expiries = []
+        for name in os.listdir(self.root):
+            if name.startswith("expiry=") and os.path.exists(os.path.join(self.root, name, PARTITION_FILE)):
+                expiries.append(pd.Timestamp(name[len("expiry="):]).date())
+        return sorted(expiries)
+
+    def import_csv(self, csv_path):
+        """
+        Load a combined CSV written by either downloader into the store.
+        """
+        return self.write(pd.read_csv(csv_path))
+
+    def export_csv(self, csv_path, expiries=None):
+        """
+        Write stored partitions out in the combined CSV layout.
+        """
+        self.read(expiries).to_csv(csv_path, index=False)
+        print(f"Data saved to {csv_path}")
+
+    def _write_partition(self, expiry, table):
+        sink = pa.BufferOutputStream()
+        with ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+        data = sink.getvalue()
+        digest = hashlib.sha256(data).hexdigest()
+        path = self._partition_path(expiry)
+        if self.hashes.get(expiry.isoformat()) == digest and os.path.exists(path):
+            return False
+
+        os.makedirs(self._partition_dir(expiry), exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with pa.OSFile(tmp_path, "wb") as f:
+            f.write(data)
+        # Readers holding a map of the old file keep their view until they reopen
+        os.replace(tmp_path, path)
+        self.hashes[expiry.isoformat()] = digest
+        return True
+
+    def _partition_dir(self, expiry):
+        return os.path.join(self.root, f"expiry={pd.Timestamp(expiry).date().isoformat()}")
+
+    def _partition_path(self, expiry):
+        return os.path.join(self._partition_dir(expiry), PARTITION_FILE)
@@ -0,0 +1,217 @@
+import numpy as np
+import pandas as pd
+from NormalizedChain import NormalizedChain
+from Profiler import profiler
+from SliceCache import slice_hash
+
+CURVE_COLUMNS = ["T", "forward", "discount", "rate", "pairs", "rmse", "success"]
+
+
+class ForwardCurve:
+    """
+    Implied forwards and discount factors for every expiry from put-call parity.
+
+    For a European call and put at the same strike, C - P = D * (F - K), so
+    regressing C - P on K gives the discount factor D (minus the slope) and the
+    forward F (where the line crosses zero). Each expiry uses the call/put pairs
+    nearest its at-the-money strike, where both quotes are tight and liquid.
+    The regression is weighted by inverse squared bid/ask spread and made robust
+    with Huber weights on MAD-scaled residuals, so a few stale or crossed quotes
+    do not tilt the line.
+
+    All expiries are solved together: the weighted sums of every iteration are
+    grouped per expiry with bincount, so there is no Python loop over expiries.
+    The slope is poorly determined for the shortest expiries, where D is within
+    a few basis points of one, so below min_rate_T the discount factor is taken
+    from the rates of the longer expiries and only the forward is solved.
+    Expiries with too few pairs fall back to the rate and carry interpolated
+    from the expiries that were solved. With a SliceCache, a snapshot's curve
+    is memoized against a hash of its paired quotes, spots and settings, so
+    every calculator that asks for the same snapshot reuses one solve; with a
+    persistent SliceCache (main.py keeps one in the chain store) so do later runs.
+
+    The result feeds the other calculators directly: pass curve["forward"] as
+    their forwards and curve["rate"] as RNDCalculator's or GreeksCalculator's r.
+    """
+
+    def __init__(self, pairs=20, min_pairs=4, min_rate_T=0.05, huber=1.345, max_iter=10, min_spread=0.05,
+                 cache=None):
+        """
+        Parameters:
+        pairs : int : Call/put pairs per expiry used in the regression, nearest the at-the-money strike first
+        min_pairs : int : Expiries with fewer usable pairs are not solved but interpolated
+        min_rate_T : float : Shorter expiries reuse the rate of the longer ones and solve only the forward
+        huber : float : Huber threshold in robust standard deviations of the residuals
+        max_iter : int : Reweighting iterations
+        min_spread : float : Floor on the combined call + put spread used for the weights
+        cache : SliceCache : Optional memo of whole-snapshot curves
+        """
+        self.pairs = pairs
+        self.min_pairs = min_pairs
+        self.min_rate_T = min_rate_T
+        self.huber = huber
+        self.max_iter = max_iter
+        self.min_spread = min_spread
+        self.cache = cache
+
+    def fit(self, chain, valuation_date=None, iv_column="IV"):
+        """
+        Solve the forward and discount factor of every expiry in one snapshot.
+
+        Parameters:
+        chain : DataFrame or NormalizedChain : Combined chain in the CBOE column layout
+        valuation_date : Timestamp : Date the quotes were taken; defaults to today
+        iv_column : str : Column holding implied volatilities (only carried through normalization)
+
+        Returns:
+        DataFrame : CURVE_COLUMNS indexed by expiry; rate is the continuously compounded -ln(D) / T,
+                    and rows with success False hold interpolated values
+        """
+        with profiler.stage("forward_curve", rows=len(chain)) as event:
+            if not isinstance(chain, NormalizedChain):
+                chain = NormalizedChain(chain, iv_column=iv_column)
+            n = len(chain.expiries)
+            T = chain.time_to_expiry(valuation_date)
+            block, K, y, spread = self._pairs(chain)
+            spot = chain.spot[chain.offsets[:-1]] if n else np.empty(0)
+
+            key = None
+            if self.cache is not None:
+                key = slice_hash(block, K, y, spread, T, spot, self.pairs, self.min_pairs, self.min_rate_T,
+                                 self.huber, self.max_iter, self.min_spread)
+                hit = self.cache.get("parity", key)
+                if hit is not None:
+                    event["cached"] = True
+                    return hit.copy()
+
+            forward, discount, counts, rmse = self._regress(n, block, K, y, spread)
+            success = self._solved(T, forward, discount, counts)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                rate = np.where(success, -np.log(discount) / T, np.nan)
+
+            # Short expiries: fix D from the longer expiries' rates and refit the forward alone
+            long = success & (T >= self.min_rate_T)
+            short = (counts >= self.min_pairs) & (T > 0) & (T < self.min_rate_T)
+            if long.any() and short.any():
+                rate[short] = np.interp(T[short], T[long], rate[long])
+                fixed = np.where(short, np.exp(-rate * T), np.nan)
+                refit, _, _, refit_rmse = self._regress(n, block, K, y, spread, fixed)
+                forward[short], discount[short], rmse[short] = refit[short], fixed[short], refit_rmse[short]
+                success = self._solved(T, forward, discount, counts)
+            event["solved"] = int(success.sum())
+            forward, discount, rate = self._fill(T, spot, forward, discount, rate, success)
+            curve = pd.DataFrame({
+                "T": T,
+                "forward": forward,
+                "discount": discount,
+                "rate": rate,
+                "pairs": counts,
+                "rmse": rmse,
+                "success": success,
+            }, index=chain.expiries)
+            if self.cache is not None:
+                self.cache.put("parity", key, curve.copy())
+            return curve
+
+    def _pairs(self, chain):
+        # Duplicate listings (e.g. SPX and SPXW) are averaged per strike by smile(), then calls and
+        # puts are matched on a packed (expiry, strike) key
+        quoted = (chain.bid > 0) & (chain.ask >= chain.bid)
+        sides = []
+        for side in (chain.is_call, ~chain.is_call):
+            mask = quoted & side
+            mid = chain.smile(mask, chain.mid)
+            spread = chain.smile(mask, chain.ask - chain.bid)
+            block = np.repeat(np.arange(len(chain.expiries)), np.diff(mid.offsets))
+            sides.append((block, mid.strikes, mid.values, spread.values))
+        (call_block, call_K, call_mid, call_spread), (put_block, put_K, put_mid, put_spread) = sides
+
+        span = max(np.max(call_K, initial=0.0), np.max(put_K, initial=0.0)) + 1.0
+        call_key, put_key = call_block * span + call_K, put_block * span + put_K
+        at = np.clip(np.searchsorted(call_key, put_key), 0, max(len(call_key) - 1, 0))
+        matched = np.flatnonzero(call_key[at] == put_key) if len(call_key) else np.empty(0, dtype=np.intp)
+        at = at[matched]
+        return (put_block[matched], put_K[matched], call_mid[at] - put_mid[matched],
+                call_spread[at] + put_spread[matched])
+
+    def _solved(self, T, forward, discount, counts):
+        return (counts >= self.min_pairs) & (T > 0) & np.isfinite(forward) & (forward > 0) & (discount > 0)
+
+    def _regress(self, n, block, K, y, spread, fixed=None):
+        forward, discount, rmse = (np.full(n, np.nan) for _ in range(3))
+        counts = np.zeros(n, dtype=int)
+        if len(K) == 0:
+            return forward, discount, counts, rmse
+
+        # At-the-money strike per expiry: where |C - P| is smallest (pairs are sorted by expiry)
+        starts = np.searchsorted(block, np.arange(n + 1))
+        present = np.flatnonzero(np.diff(starts) > 0)
+        order = np.lexsort((np.abs(y), block))
+        atm = np.full(n, np.nan)
+        atm[present] = K[order[starts[present]]]
+
+        # Keep the pairs closest to it in log-strike
+        distance = np.abs(np.log(K / atm[block]))
+        order = np.lexsort((distance, block))
+        rank = np.arange(len(order)) - starts[block[order]]
+        keep = np.sort(order[rank < self.pairs])
+        block, y, base = block[keep], y[keep], np.maximum(spread[keep], self.min_spread) ** -2.0
+        x = K[keep] - atm[block]
+        counts = np.bincount(block, minlength=n)
+        starts = np.searchsorted(block, np.arange(n + 1))
+
+        weight = base
+        for _ in range(self.max_iter):
+            slope, intercept = self._weighted_line(n, block, x, y, weight, fixed)
+            residual = y - intercept[block] - slope[block] * x
+            # Huber weights on residuals in units of each quote's spread, scaled by the per-expiry MAD
+            z = np.abs(residual) * np.sqrt(base)
+            order = np.lexsort((z, block))
+            median = np.zeros(n)
+            median[present] = z[order[starts[present] + (counts[present] - 1) // 2]]
+            scale = 1.4826 * median[block]
+            with np.errstate(divide="ignore", invalid="ignore"):
+                robust = np.where(z > self.huber * scale, self.huber * scale / z, 1.0)
+            updated = base * robust
+            if np.allclose(updated, weight, rtol=1e-6, atol=0.0):
+                break
+            weight = updated
+
+        slope, intercept = self._weighted_line(n, block, x, y, weight, fixed)
+        residual = y - intercept[block] - slope[block] * x
+        with np.errstate(divide="ignore", invalid="ignore"):
+            discount = -slope
+            forward = atm + intercept / discount
+            rmse = np.sqrt(np.bincount(block, residual * residual, minlength=n) / counts)
+        return forward, discount, counts, rmse
+
+    @staticmethod
+    def _weighted_line(n, block, x, y, weight, fixed=None):
+        # Closed-form weighted least squares per expiry from grouped sums; the slope is -fixed where given
+        sw, sx, sy, sxx, sxy = (np.bincount(block, values, minlength=n)
+                                for values in (weight, weight * x, weight * y, weight * x * x, weight * x * y))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            slope = (sw * sxy - sx * sy) / (sw * sxx - sx * sx)
+            if fixed is not None:
+                slope = np.where(np.isnan(fixed), slope, -fixed)
+            intercept = (sy - slope * sx) / sw
+        return slope, intercept
+
+    @staticmethod
+    def _fill(T, spot, forward, discount, rate, success):
+        # Unsolved expiries take the rate and carry ln(F / S) / T interpolated in T from solved ones
+        if success.all():
+            return forward, discount, rate
+        forward, discount, rate = forward.copy(), discount.copy(), rate.copy()
+        missing = ~success
+        if success.any():
+            with np.errstate(divide="ignore", invalid="ignore"):
+                carry = np.log(forward[success] / spot[success]) / T[success]
+            rate[missing] = np.interp(T[missing], T[success], rate[success])
+            carry = np.interp(T[missing], T[success], carry)
+        else:
+            rate[missing] = 0.0
+            carry = np.zeros(missing.sum())
+        forward[missing] = spot[missing] * np.exp(carry * np.maximum(T[missing], 0.0))
+        discount[missing] = np.exp(-rate[missing] * np.maximum(T[missing], 0.0))
+        return forward, discount, rate
@@ -0,0 +1,187 @@
+import numpy as np
+import pandas as pd
+from BlackScholesPricer import BlackScholesPricer
+from ImpliedVolSolver import ImpliedVolSolver
+from NormalizedChain import NormalizedChain
+from Profiler import profiler
+
+CHAIN_GREEKS = ("delta", "gamma", "vega", "theta", "vanna", "volga")
+# Columns carried next to the Greeks so results can be aggregated without joining back to the chain
+ROW_COLUMNS = ["Expiration Date", "Strike", "Type", "Open Interest", "Forward", "T", "IV"]
+
+
+class GreeksCalculator:
+    """
+    Black-76 Greeks for every row of a combined chain in one vectorized pass.
+
+    Greeks come from IVs solved from the chain's mid prices with the same forwards
+    and rates they are evaluated at, rather than the IV/Delta/Gamma columns
+    supplied by the data source, which are zero for some quotes and were computed
+    against the source's own forward. A vendor IV column can still be used by
+    naming it explicitly. Rows are evaluated in chunks
+    of chunk_size into preallocated output arrays, so multi-snapshot histories
+    stay within a bounded working set, and float32 halves memory and bandwidth
+    when full precision is not needed. Theta is per year of calendar time.
+    """
+
+    def __init__(self, r=0.01, dtype=np.float64, greeks=CHAIN_GREEKS, chunk_size=500_000):
+        """
+        Parameters:
+        r : float or Series : Risk-free rate; a Series indexed by expiry (e.g. ForwardCurve's rate column)
+            gives compute() a rate per expiry
+        dtype : dtype : Floating-point precision of the outputs
+        greeks : iterable : Greeks to compute
+        chunk_size : int : Rows evaluated per pass
+        """
+        self.r = r
+        self.pricer = BlackScholesPricer(dtype)
+        self.dtype = self.pricer.dtype
+        self.solver = ImpliedVolSolver(dtype)
+        self.greeks = tuple(greeks)
+        self.chunk_size = chunk_size
+
+    def compute(self, chain, forwards=None, valuation_date=None, iv_column=None):
+        """
+        Greeks for every quote of one snapshot.
+
+        Parameters:
+        chain : DataFrame or NormalizedChain : Combined chain with 'Expiration Date', 'Strike', 'Type',
+                'Bid', 'Ask' and 'Index Spot'
+        forwards : float, array_like or Series : Forward per expiry (Series indexed by expiry, or aligned
+                   with the sorted expiries); defaults to the index spot
+        valuation_date : Timestamp : Date the quotes were taken; defaults to today
+        iv_column : str : Use this column's implied volatilities (for a NormalizedChain, the IVs it carries)
+                    instead of solving them from the mid prices
+
+        Returns:
+        DataFrame : ROW_COLUMNS plus one column per Greek, indexed by the chain's index labels and
+                    ordered by (expiry, type, strike); NaN where the IV cannot be solved or the time to
+                    expiry is not positive
+        """
+        with profiler.stage("greeks", rows=len(chain)):
+            if isinstance(chain, NormalizedChain):
+                chain = chain.with_forwards(forwards)
+            else:
+                chain = NormalizedChain(chain, forwards, iv_column)
+            T = np.repeat(chain.time_to_expiry(valuation_date), chain.counts)
+            r = np.repeat(chain.per_expiry(self.r), chain.counts) if isinstance(self.r, pd.Series) else None
+            iv = chain.iv if iv_column is not None else self._solve(chain.mid, chain.forward, chain.strike, T,
+                                                                     chain.is_call, r)
+            greeks = self.evaluate(chain.forward, chain.strike, T, iv, chain.is_call, r)
+            return pd.DataFrame({
+                "Expiration Date": chain.expiry,
+                "Strike": chain.strike,
+                "Type": self._types(chain.is_call),
+                "Open Interest": chain.open_interest,
+                "Forward": chain.forward,
+                "T": T,
+                "IV": iv,
+                **greeks,
+            }, index=chain.index)
+
+    def compute_history(self, history, iv_column=None, forward_column="Index Spot"):
+        """
+        Greeks for a multi-snapshot history, each row valued at its own snapshot date.
+
+        Parameters:
+        history : DataFrame : Rows with a 'Snapshot Time' column, as returned by SnapshotStore.query
+        iv_column : str : Use this column's implied volatilities instead of solving them from Bid/Ask mids
+        forward_column : str : Column used as each row's forward
+
+        Returns:
+        DataFrame : 'Snapshot Time', ROW_COLUMNS and one column per Greek, aligned with history's index
+        """
+        with profiler.stage("greeks_history", rows=len(history)) as event:
+            snapshot = pd.to_datetime(history["Snapshot Time"]).dt.normalize()
+            expiry = pd.to_datetime(history["Expiration Date"])
+            T = ((expiry - snapshot).dt.days / 365).to_numpy()
+            is_call = (history["Type"] == "Call").to_numpy(dtype=bool)
+            forward = pd.to_numeric(history[forward_column], errors="coerce").to_numpy(dtype=float)
+            strike = history["Strike"].to_numpy(dtype=float)
+            r = None
+            if isinstance(self.r, pd.Series):
+                r = self.r.set_axis(pd.to_datetime(self.r.index)).reindex(expiry).to_numpy(dtype=float)
+            if iv_column is not None:
+                iv = pd.to_numeric(history[iv_column], errors="coerce").to_numpy(dtype=float)
+            else:
+                mid = 0.5 * (pd.to_numeric(history["Bid"], errors="coerce").to_numpy(dtype=float)
+                             + pd.to_numeric(history["Ask"], errors="coerce").to_numpy(dtype=float))
+                iv = self._solve(mid, forward, strike, T, is_call, r)
+            greeks = self.evaluate(forward, strike, T, iv, is_call, r)
+            event["snapshots"] = history["Snapshot Time"].nunique()
+            return pd.DataFrame({
+                "Snapshot Time": history["Snapshot Time"].to_numpy(),
+                "Expiration Date": expiry.to_numpy(),
+                "Strike": strike,
+                "Type": self._types(is_call),
+                "Open Interest": pd.to_numeric(history["Open Interest"], errors="coerce").to_numpy(dtype=float),
+                "Forward": forward,
+                "T": T,
+                "IV": iv,
+                **greeks,
+            }, index=history.index)
+
+    def evaluate(self, F, K, T, sigma, is_call, r=None):
+        """
+        Greeks for flat per-row arrays, evaluated chunk by chunk into preallocated outputs.
+
+        Parameters:
+        F, K, T, sigma : ndarray : Per-row forward, strike, time to expiry and implied volatility
+        is_call : ndarray : Per-row booleans, True for calls
+        r : float or ndarray : Rate, per row if an array; defaults to self.r
+
+        Returns:
+        dict : {<greek>: ndarray of self.dtype}, NaN where sigma or T is not positive
+        """
+        sigma = np.where(np.asarray(sigma) > 0, sigma, np.nan).astype(self.dtype)
+        T = np.where(np.asarray(T) > 0, T, np.nan).astype(self.dtype)
+        F, K = np.asarray(F, dtype=self.dtype), np.asarray(K, dtype=self.dtype)
+        is_call = np.asarray(is_call, dtype=bool)
+        r = self.r if r is None else r
+        n = len(K)
+        results = {name: np.empty(n, dtype=self.dtype) for name in self.greeks}
+        # The price is not returned, but evaluate() always fills it; one buffer is reused across chunks
+        price = np.empty(min(n, self.chunk_size), dtype=self.dtype)
+        for start in range(0, n, self.chunk_size):
+            rows = slice(start, min(start + self.chunk_size, n))
+            out = {name: buf[rows] for name, buf in results.items()}
+            out["price"] = price[:rows.stop - rows.start]
+            rate = r[rows] if np.ndim(r) else r
+            self.pricer.evaluate(F[rows], K[rows], T[rows], rate, sigma[rows], is_call[rows],
+                                 greeks=self.greeks, out=out)
+        return results
+
+    def _solve(self, price, F, K, T, is_call, r=None):
+        # Implied volatilities at the same forwards and rates the Greeks are evaluated at
+        with profiler.stage("iv", rows=len(K)):
+            return self.solver.solve(price, F, K, T, self.r if r is None else r, is_call)
+
+    @staticmethod
+    def _types(is_call):
+        # A categorical built from codes avoids materializing one string object per row
+        return pd.Categorical.from_codes((~is_call).astype(np.int8), categories=["Call", "Put"])
+
+    @staticmethod
+    def dealer_gamma(greeks, contract_size=100, by=("Strike",)):
+        """
+        Dealer gamma exposure per 1% move in the underlying, aggregated over rows.
+
+        Uses the common convention that dealers are long the calls and short the
+        puts that customers hold: each row contributes
+        sign * gamma * open interest * contract_size * F^2 * 0.01, with sign +1
+        for calls and -1 for puts.
+
+        Parameters:
+        greeks : DataFrame : Output of compute() or compute_history()
+        contract_size : float : Underlying units per contract
+        by : iterable : Columns to aggregate by, e.g. ("Snapshot Time", "Strike") for a history
+
+        Returns:
+        Series : Gamma exposure in underlying currency per 1% move, indexed by the `by` columns
+        """
+        sign = np.where((greeks["Type"] == "Call").to_numpy(dtype=bool), 1.0, -1.0)
+        forward = greeks["Forward"].to_numpy(dtype=float)
+        exposure = (sign * greeks["gamma"].to_numpy(dtype=float) * greeks["Open Interest"].to_numpy(dtype=float)
+                    * contract_size * forward * forward * 0.01)
+        keys = [greeks[column] for column in by]
+        return pd.Series(exposure, index=greeks.index, name="Dealer Gamma").groupby(keys).sum()
@@ -0,0 +1,163 @@
+import numpy as np
+import pandas as pd
+from BlackScholesPricer import BlackScholesPricer
+from Profiler import profiler
+
+_SQRT_2PI = 2.5066282746310002
+
+
+class ImpliedVolSolver:
+    """
+    Batched implied-volatility inversion.
+
+    Prices are mapped to their out-of-the-money equivalent via put-call parity,
+    seeded with the Corrado-Miller closed-form guess and refined with Halley
+    (second-order Householder) steps. Rows drop out of the iteration as soon as
+    they converge, so the work shrinks with every step and there is no Python
+    loop over options.
+    """
+
+    def __init__(self, dtype=np.float64, tol=1e-8, max_iter=30, min_vol=1e-4, max_vol=10.0):
+        self.pricer = BlackScholesPricer(dtype)
+        self.dtype = self.pricer.dtype
+        self.tol = tol
+        self.max_iter = max_iter
+        self.min_vol = min_vol
+        self.max_vol = max_vol
+
+    def solve(self, price, F, K, T, r, option_type="call"):
+        """
+        Invert Black-Scholes prices to implied volatilities.
+
+        Parameters:
+        price : array_like : Discounted option prices
+        F : array_like : Forward price of the underlying
+        K : array_like : Strike price
+        T : array_like : Time to expiration in years
+        r : array_like : Risk-free interest rate
+        option_type : str or array_like : 'call'/'put', or a per-option array of types or booleans (True = call)
+
+        Returns:
+        ndarray : Implied volatilities, NaN where the price is outside the no-arbitrage bounds
+        """
+        is_call = self.pricer._sign(option_type) > 0
+        price, F, K, T, r, is_call = np.broadcast_arrays(
+            *(np.asarray(x, dtype=self.dtype) for x in (price, F, K, T, r)), is_call
+        )
+        shape = price.shape
+        price, F, K, T, r, is_call = (np.ravel(x) for x in (price, F, K, T, r, is_call))
+
+        with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+            undiscounted = price * np.exp(r * T)
+            call_price = np.where(is_call, undiscounted, undiscounted + F - K)
+            otm_call = K >= F
+            target = np.where(otm_call, call_price, call_price - F + K)
+            upper = np.where(otm_call, F, K)
+            valid = (T > 0) & (F > 0) & (K > 0) & (target > 0) & (target < upper)
+
+        sigma = np.full(price.shape, np.nan, dtype=self.dtype)
+        idx = np.flatnonzero(valid)
+        if idx.size:
+            F, K, T, target, otm_call = F[idx], K[idx], T[idx], target[idx], otm_call[idx]
+            guess = self._initial_guess(call_price[idx], F, K, T)
+            sigma[idx] = self._refine(guess, target, F, K, T, otm_call)
+        return sigma.reshape(shape)
+
+    def solve_chain(self, chain, price_column="Mid", forward=None, r=0.01, valuation_date=None):
+        """
+        Recompute implied volatilities for every row of a combined chain.
+
+        Parameters:
+        chain : DataFrame : Combined chain with 'Expiration Date', 'Strike', 'Type', 'Bid', 'Ask' and 'Index Spot'
+        price_column : str : 'Mid', 'Bid' or 'Ask'; 'Mid' is derived from Bid/Ask when not present
+        forward : array_like or Series : Per-row forward, or a Series indexed by expiry (e.g. ForwardCurve's
+                  forward column); defaults to the 'Index Spot' column
+        r : float, array_like or Series : Risk-free interest rate, per row or per expiry as for forward
+        valuation_date : Timestamp : Date the quotes were taken; defaults to today
+
+        Returns:
+        Series : Implied volatilities aligned with the chain's index
+        """
+        if price_column == "Mid" and "Mid" not in chain:
+            price = (chain["Bid"].to_numpy(dtype=self.dtype) + chain["Ask"].to_numpy(dtype=self.dtype)) / 2
+        else:
+            price = chain[price_column].to_numpy(dtype=self.dtype)
+        if forward is None:
+            forward = chain["Index Spot"].to_numpy(dtype=self.dtype)
+        forward, r = (self._per_row(chain, x) for x in (forward, r))
+        T = time_to_expiry(chain["Expiration Date"], valuation_date)
+        with profiler.stage("iv", rows=len(chain)):
+            iv = self.solve(price, forward, chain["Strike"].to_numpy(dtype=self.dtype), T, r, chain["Type"].to_numpy())
+        return pd.Series(iv, index=chain.index, name="IV")
+
+    @staticmethod
+    def _per_row(chain, values):
+        if not isinstance(values, pd.Series) or values.index.equals(chain.index):
+            return values
+        expiry = pd.to_datetime(chain["Expiration Date"])
+        return values.set_axis(pd.to_datetime(values.index)).reindex(expiry).to_numpy(dtype=float)
+
+    def _initial_guess(self, call_price, F, K, T):
+        # Corrado-Miller on the undiscounted call; fall back to the inflection-point
+        # vol sqrt(2|ln(F/K)|/T) where the radicand goes negative (far wings).
+        half_moneyness = 0.5 * (F - K)
+        excess = call_price - half_moneyness
+        radicand = excess * excess - (F - K) * (F - K) / np.pi
+        with np.errstate(invalid="ignore", divide="ignore"):
+            total_vol = _SQRT_2PI / (F + K) * (excess + np.sqrt(radicand))
+            inflection = np.sqrt(2.0 * np.abs(np.log(F / K)))
+        total_vol = np.where((radicand > 0) & (total_vol > 0), total_vol, inflection)
+        return np.clip(total_vol / np.sqrt(T), self.min_vol, self.max_vol)
+
+    def _refine(self, sigma, target, F, K, T, otm_call):
+        result = sigma.copy()
+        active = np.arange(sigma.size)
+        lower = np.full_like(sigma, self.min_vol)
+        upper = np.full_like(sigma, self.max_vol)
+        for _ in range(self.max_iter):
+            res = self.pricer.evaluate(F, K, T, 0.0, sigma, otm_call, greeks=("vega", "volga"))
+            price = res["price"]
+            # Prices are increasing in vol, so every evaluation tightens a bracket
+            # that catches Halley steps overshooting into the flat far wings.
+            above = price > target
+            upper = np.where(above, sigma, upper)
+            lower = np.where(above, lower, sigma)
+
+            # Iterate on log-price: far-wing prices span many orders of magnitude
+            # and the log objective keeps the Halley step well-scaled there.
+            with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+                slope = res["vega"] / price
+                curvature = res["volga"] / price - slope * slope
+                newton = np.log(price / target) / slope
+                denom = 1.0 - 0.5 * newton * curvature / slope
+                step = np.where(np.isfinite(denom) & (denom > 0.5), newton / denom, newton)
+                updated = sigma - step
+            inside = np.isfinite(updated) & (updated > lower) & (updated < upper)
+            updated = np.where(inside, updated, np.sqrt(lower * upper))
+            result[active] = updated
+
+            pending = np.abs(updated - sigma) > self.tol * np.maximum(updated, 1.0)
+            if not pending.any():
+                break
+            active = active[pending]
+            sigma, target, F, K, T, otm_call, lower, upper = (
+                x[pending] for x in (updated, target, F, K, T, otm_call, lower, upper)
+            )
+        return result
+
+
+def time_to_expiry(expiration_dates, valuation_date=None):
+    """
+    Calculate year fractions to expiry using the repo's days/365 convention.
+
+    Parameters:
+    expiration_dates : array_like : Expiration dates (strings or datetimes)
+    valuation_date : Timestamp : Date the quotes were taken; defaults to today
+
+    Returns:
+    ndarray : Time to expiration in years
+    """
+    valuation_date = pd.Timestamp.today() if valuation_date is None else pd.Timestamp(valuation_date)
+    valuation_date = valuation_date.normalize()
+    expiries = pd.to_datetime(pd.Series(expiration_dates))
+    return ((expiries - valuation_date).dt.days / 365).to_numpy()
@@ -0,0 +1,229 @@
+import copy
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+from ImpliedVolSolver import time_to_expiry
+
+# Per-expiry runs of (strike, value) pairs; rows offsets[i]:offsets[i + 1] belong to expiry i
+Smiles = namedtuple("Smiles", ["offsets", "strikes", "values", "counts"])
+
+
+class NormalizedChain:
+    """
+    A combined chain sorted once into contiguous per-expiry blocks of flat arrays.
+
+    Rows are ordered by (expiry, type, strike) with calls before puts, and
+    offsets[i]:offsets[i + 1] is the block of expiry i, so a slice is an O(1)
+    view instead of a boolean filter over the whole chain. Mid prices, forwards,
+    OTM flags and liquidity filters are computed for every row in bulk, and
+    smile() averages duplicate strikes with a single reduceat pass.
+
+    RNDCalculator and VolSurfaceCalculator accept either a DataFrame or a
+    NormalizedChain, so a snapshot can be normalized once and shared.
+    """
+
+    def __init__(self, chain, forwards=None, iv_column="IV"):
+        """
+        Parameters:
+        chain : DataFrame : Combined chain in the CBOE column layout
+        forwards : float, array_like or Series : Forward per expiry (Series indexed by expiry, or aligned
+                   with the sorted expiries); defaults to each expiry's index spot
+        iv_column : str : Column holding implied volatilities
+        """
+        expiry = chain["Expiration Date"]
+        # to_datetime probes already-parsed columns element by element, so only parse when needed
+        if not pd.api.types.is_datetime64_dtype(expiry):
+            expiry = pd.to_datetime(expiry)
+        expiry = expiry.to_numpy().astype("datetime64[ns]")
+        is_call = (chain["Type"] == "Call").to_numpy(dtype=bool)
+        strike = chain["Strike"].to_numpy(dtype=float)
+        order = np.lexsort((strike, ~is_call, expiry))
+
+        unique, starts, counts = np.unique(expiry[order], return_index=True, return_counts=True)
+        self.expiries = pd.DatetimeIndex(unique, name="Expiration Date")
+        self.offsets = np.append(starts, len(order))
+        self.counts = counts
+
+        # Original index labels, for mapping results back onto the input frame
+        self.index = chain.index.to_numpy()[order]
+        self.expiry = expiry[order]
+        self.is_call = is_call[order]
+        self.strike = strike[order]
+        self.bid, self.ask, self.iv, self.volume, self.open_interest, self.spot = (
+            self._column(chain, column, order)
+            for column in ["Bid", "Ask", iv_column, "Volume", "Open Interest", "Index Spot"]
+        )
+        self.mid = 0.5 * (self.bid + self.ask)
+        self._set_forwards(self.spot[self.offsets[:-1]] if forwards is None else self.expiry_forwards(forwards))
+
+    def __len__(self):
+        return len(self.strike)
+
+    def expiry_forwards(self, forwards=None):
+        """
+        Forward per expiry, aligned with self.expiries.
+
+        Parameters:
+        forwards : float, array_like or Series : As for the constructor; None keeps the chain's forwards
+
+        Returns:
+        ndarray : One forward per expiry
+        """
+        if forwards is None:
+            return self.forwards
+        return self.per_expiry(forwards)
+
+    def per_expiry(self, values):
+        """
+        Align a per-expiry quantity (e.g. forwards or rates from ForwardCurve) with self.expiries.
+
+        Parameters:
+        values : float, array_like or Series : A scalar, an array aligned with the sorted expiries,
+                 or a Series indexed by expiry (missing expiries become NaN)
+
+        Returns:
+        ndarray : One value per expiry
+        """
+        if isinstance(values, pd.Series):
+            return values.set_axis(pd.to_datetime(values.index)).reindex(self.expiries).to_numpy(dtype=float)
+        return np.broadcast_to(np.asarray(values, dtype=float), (len(self.expiries),)).copy()
+
+    def with_forwards(self, forwards=None):
+        """
+        The same chain with other forwards (and so other OTM flags); arrays are shared, not copied.
+
+        Parameters:
+        forwards : float, array_like or Series : As for the constructor; None returns self
+        """
+        if forwards is None:
+            return self
+        chain = copy.copy(self)
+        chain._set_forwards(self.expiry_forwards(forwards))
+        return chain
+
+    def take(self, mask):
+        """
+        The chain restricted to some rows, keeping every expiry (blocks may become empty).
+
+        Parameters:
+        mask : ndarray : Boolean mask aligned with the normalized rows
+
+        Returns:
+        NormalizedChain : Filtered copy; rows stay in (expiry, type, strike) order
+        """
+        mask = np.asarray(mask, dtype=bool)
+        chain = copy.copy(self)
+        block = np.repeat(np.arange(len(self.expiries)), self.counts)
+        chain.counts = np.bincount(block[mask], minlength=len(self.expiries))
+        chain.offsets = np.concatenate([[0], np.cumsum(chain.counts)])
+        for name in ["index", "expiry", "is_call", "strike", "bid", "ask", "iv", "volume", "open_interest", "spot",
+                     "mid"]:
+            setattr(chain, name, getattr(self, name)[mask])
+        chain._set_forwards(self.forwards)
+        return chain
+
+    def time_to_expiry(self, valuation_date=None):
+        """
+        Year fraction to each expiry (days/365), aligned with self.expiries.
+        """
+        return time_to_expiry(self.expiries, valuation_date)
+
+    def position(self, expiry):
+        """
+        Block number of an expiry, or None if it is not in the chain.
+        """
+        try:
+            return self.expiries.get_loc(pd.Timestamp(expiry))
+        except KeyError:
+            return None
+
+    def rows(self, expiry):
+        """
+        Row slice of one expiry's block (calls, then puts, each by strike).
+
+        Parameters:
+        expiry : int or Timestamp : Block number or expiration date
+        """
+        i = expiry if isinstance(expiry, (int, np.integer)) else self.position(expiry)
+        if i is None:
+            return slice(0, 0)
+        return slice(self.offsets[i], self.offsets[i + 1])
+
+    def frame(self, expiry):
+        """
+        One expiry's block as a DataFrame in the combined column layout, plus Mid, Forward and OTM.
+        """
+        rows = self.rows(expiry)
+        return pd.DataFrame({
+            "Expiration Date": self.expiry[rows],
+            "Strike": self.strike[rows],
+            "Type": np.where(self.is_call[rows], "Call", "Put"),
+            "Bid": self.bid[rows],
+            "Ask": self.ask[rows],
+            "Mid": self.mid[rows],
+            "IV": self.iv[rows],
+            "Volume": self.volume[rows],
+            "Open Interest": self.open_interest[rows],
+            "Index Spot": self.spot[rows],
+            "Forward": self.forward[rows],
+            "OTM": self.otm[rows],
+        }, index=self.index[rows])
+
+    def liquid(self, min_volume=0, min_open_interest=0, max_spread=None):
+        """
+        Liquidity filter over every row.
+
+        Parameters:
+        min_volume : float : Keep rows with Volume >= min_volume
+        min_open_interest : float : Keep rows with Open Interest >= min_open_interest
+        max_spread : float : Keep rows whose (Ask - Bid) / Mid is at most this; None disables the check
+
+        Returns:
+        ndarray : Boolean mask aligned with the normalized rows
+        """
+        mask = (self.volume >= min_volume) & (self.open_interest >= min_open_interest)
+        if max_spread is not None:
+            with np.errstate(divide="ignore", invalid="ignore"):
+                mask &= (self.bid > 0) & ((self.ask - self.bid) / self.mid <= max_spread)
+        return mask
+
+    def smile(self, mask=None, values=None):
+        """
+        Average values over duplicate strikes within each expiry (e.g. calls and puts, or SPX and SPXW listings).
+
+        Parameters:
+        mask : ndarray : Rows to include; defaults to rows with a positive IV
+        values : ndarray : Per-row values to average; defaults to the IVs
+
+        Returns:
+        Smiles : offsets (len(expiries) + 1), and strikes / mean values / quote counts sorted by strike
+                 within each expiry
+        """
+        values = self.iv if values is None else values
+        mask = self.iv > 0 if mask is None else mask
+        block = np.repeat(np.arange(len(self.expiries)), self.counts)[mask]
+        strike, values = self.strike[mask], values[mask]
+        # Rows are already grouped by expiry, so one sort on (block, strike) packed into a float key suffices
+        span = np.max(strike, initial=0.0) - np.min(strike, initial=0.0) + 1.0
+        order = np.argsort(block * span + (strike - np.min(strike, initial=0.0)), kind="stable")
+        block, strike, values = block[order], strike[order], values[order]
+
+        first = np.ones(len(strike), dtype=bool)
+        first[1:] = (block[1:] != block[:-1]) | (strike[1:] != strike[:-1])
+        starts = np.flatnonzero(first)
+        counts = np.diff(np.append(starts, len(strike)))
+        means = np.add.reduceat(values, starts) / counts if len(starts) else values[:0]
+        offsets = np.searchsorted(block[starts], np.arange(len(self.expiries) + 1))
+        return Smiles(offsets, strike[starts], means, counts)
+
+    def _set_forwards(self, forwards):
+        self.forwards = forwards
+        self.forward = np.repeat(forwards, self.counts)
+        self.otm = np.where(self.is_call, self.strike > self.forward, self.strike < self.forward)
+
+    @staticmethod
+    def _column(chain, column, order):
+        if column not in chain:
+            return np.full(len(order), np.nan)
+        return pd.to_numeric(chain[column], errors="coerce").to_numpy(dtype=float)[order]
@@ -0,0 +1,172 @@
+import cProfile
+import itertools
+import json
+import os
+import sys
+import threading
+import time
+import tracemalloc
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Environment variables configure the shared profiler, so worker processes inherit the settings
+LOG_ENV = "CHAIN_PROFILE_LOG"
+STAGES_ENV = "CHAIN_PROFILE_STAGES"
+PROFILE_DIR_ENV = "CHAIN_PROFILE_DIR"
+TRACEMALLOC_ENV = "CHAIN_TRACEMALLOC"
+
+
+class _DisabledStage:
+    def __enter__(self):
+        return {}
+
+    def __exit__(self, *exc):
+        return False
+
+
+_DISABLED = _DisabledStage()
+
+
+class Profiler:
+    """
+    Structured timing for pipeline stages.
+
+    Each `with profiler.stage(name, **fields) as event:` block emits one JSON line
+    with wall and CPU seconds, the row count the block sets on event["rows"],
+    peak memory and any extra fields. Stages listed in profile_stages ("*" for
+    all) also run under cProfile, with the stats dumped to profile_dir. With
+    trace_memory the peak comes from tracemalloc and covers only the stage;
+    otherwise it is the process's max RSS so far. When disabled, stage() returns a
+    shared no-op context manager.
+
+    The module-level `profiler` is configured from CHAIN_PROFILE_LOG (a file
+    path, or "-" for stderr), CHAIN_PROFILE_STAGES, CHAIN_PROFILE_DIR and
+    CHAIN_TRACEMALLOC. configure() exports the same variables so that process
+    pool workers log to the same file.
+    """
+
+    def __init__(self, log=None, profile_stages=(), profile_dir=".", trace_memory=False):
+        self.configure(log, profile_stages, profile_dir, trace_memory, export=False)
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            log=os.environ.get(LOG_ENV) or None,
+            profile_stages=[s for s in os.environ.get(STAGES_ENV, "").split(",") if s],
+            profile_dir=os.environ.get(PROFILE_DIR_ENV, "."),
+            trace_memory=os.environ.get(TRACEMALLOC_ENV) == "1",
+        )
+
+    def configure(self, log=None, profile_stages=(), profile_dir=".", trace_memory=False, export=True):
+        """
+        (Re)configure the profiler.
+
+        Parameters:
+        log : str : JSON-lines event file, or "-" for stderr; None disables the profiler
+        profile_stages : iterable : Stage names to run under cProfile, or ["*"] for every stage
+        profile_dir : str : Directory for the .prof files
+        trace_memory : bool : Measure per-stage peak memory with tracemalloc
+        export : bool : Also set the environment variables read by worker processes
+        """
+        self.log = log
+        self.enabled = log is not None
+        self.profile_stages = set(profile_stages)
+        self.profile_dir = profile_dir
+        self.trace_memory = trace_memory
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._profiling = False
+        self._counter = itertools.count()
+        if export:
+            for name, value in [(LOG_ENV, log or ""), (STAGES_ENV, ",".join(self.profile_stages)),
+                                (PROFILE_DIR_ENV, profile_dir), (TRACEMALLOC_ENV, "1" if trace_memory else "")]:
+                os.environ[name] = value
+        if self.enabled and trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    def stage(self, name, **fields):
+        """
+        Context manager timing one stage; yields the event dict so the block can add rows or fields.
+        """
+        if not self.enabled:
+            return _DISABLED
+        return _Stage(self, name, fields)
+
+    def emit(self, event):
+        line = json.dumps(event, default=str)
+        with self._lock:
+            if self.log == "-":
+                print(line, file=sys.stderr)
+            else:
+                with open(self.log, "a") as f:
+                    f.write(line + "\n")
+
+    def _stack(self):
+        if not hasattr(self._local, "stack"):
+            self._local.stack = []
+        return self._local.stack
+
+
+class _Stage:
+    def __init__(self, profiler, name, fields):
+        self.profiler = profiler
+        self.event = {"stage": name, **fields}
+        self.peak = 0
+        self.cprofile = None
+
+    def __enter__(self):
+        profiler = self.profiler
+        stack = profiler._stack()
+        if profiler.trace_memory:
+            # Fold the running peak into the enclosing stage before resetting it for this one
+            if stack:
+                stack[-1].peak = max(stack[-1].peak, tracemalloc.get_traced_memory()[1])
+            tracemalloc.reset_peak()
+        stack.append(self)
+        name = self.event["stage"]
+        if "*" in profiler.profile_stages or name in profiler.profile_stages:
+            # Only one cProfile can be active at a time: nested or concurrent stages are not profiled
+            with profiler._lock:
+                if not profiler._profiling:
+                    profiler._profiling = True
+                    self.cprofile = cProfile.Profile()
+            if self.cprofile is not None:
+                self.cprofile.enable()
+        self.event["start"] = time.time()
+        self._wall = time.perf_counter()
+        self._cpu = time.process_time()
+        return self.event
+
+    def __exit__(self, exc_type, exc, tb):
+        wall = time.perf_counter() - self._wall
+        cpu = time.process_time() - self._cpu
+        profiler = self.profiler
+        if self.cprofile is not None:
+            self.cprofile.disable()
+            os.makedirs(profiler.profile_dir, exist_ok=True)
+            path = os.path.join(profiler.profile_dir,
+                                f"{self.event['stage']}-{os.getpid()}-{next(profiler._counter)}.prof")
+            self.cprofile.dump_stats(path)
+            profiler._profiling = False
+            self.event["profile"] = path
+        profiler._stack().pop()
+
+        self.event.update({"wall_s": round(wall, 6), "cpu_s": round(cpu, 6), "pid": os.getpid(),
+                           "thread": threading.current_thread().name})
+        if profiler.trace_memory:
+            self.peak = max(self.peak, tracemalloc.get_traced_memory()[1])
+            self.event["peak_mb"] = round(self.peak / 2 ** 20, 3)
+        elif resource is not None:
+            # ru_maxrss is in KiB on Linux and bytes on macOS
+            scale = 2 ** 20 if sys.platform == "darwin" else 2 ** 10
+            self.event["max_rss_mb"] = round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale, 3)
+        if exc_type is not None:
+            self.event["error"] = repr(exc)
+        profiler.emit(self.event)
+        return False
+
+
+profiler = Profiler.from_env()
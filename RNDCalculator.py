@@ -0,0 +1,294 @@
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+from scipy.interpolate import CubicSpline
+from scipy.special import ndtr
+from BlackScholesPricer import _INV_SQRT_2PI, BlackScholesPricer
+from NormalizedChain import NormalizedChain
+from Profiler import profiler
+from SABRCalculator import SABR_PARAMS, sabr_strike_derivatives
+from SliceCache import slice_hash
+from VolSurfaceCalculator import SVI_PARAMS, svi_strike_derivatives
+
+RNDResult = namedtuple("RNDResult", ["expiries", "T", "forwards", "strikes", "density", "cdf"])
+# Coarse per-expiry CDF table that seeds quantiles(): at-the-money standard deviations, plus fixed
+# log-moneyness nodes that reach into fat smile wings
+_QUANTILE_DEVIATIONS = np.linspace(-20.0, 20.0, 161)
+_QUANTILE_MONEYNESS = np.linspace(-10.0, 3.0, 53)
+
+
+class RNDCalculator:
+    """
+    Risk-neutral densities for every expiry of a combined chain in one call.
+
+    Each expiry's smile is interpolated with a cubic spline in strike, and the
+    Breeden-Litzenberger derivatives dC/dK and d2C/dK2 are taken in closed form
+    through the chain rule on sigma(K) rather than by differencing a price grid.
+    With a SliceCache, each expiry's strike grid, density and CDF are memoized
+    against a hash of its smile, T, forward and rate, so only changed expiries
+    are re-derived.
+
+    From fitted SVI / SSVI / SABR parameters the density, CDF and quantiles are
+    instead exact functions of the smile: no spline, no price grid, and any
+    set of query strikes. compute_from_params() places its grid at equally
+    spaced probabilities by default, so points concentrate where the mass is
+    and resolution is chosen per call.
+    """
+
+    def __init__(self, r=0.01, n_points=500, dtype=np.float64, cache=None):
+        """
+        Parameters:
+        r : float, array_like or Series : Risk-free rate, per expiry if a Series indexed by expiry
+            (e.g. ForwardCurve's rate column)
+        n_points : int : Strike grid points per expiry
+        dtype : dtype : Floating-point precision of the pricing
+        cache : SliceCache : Optional memo of per-expiry results
+        """
+        self.r = r
+        self.n_points = n_points
+        self.pricer = BlackScholesPricer(dtype)
+        self.cache = cache
+
+    def compute(self, chain, forwards=None, valuation_date=None, iv_column="IV"):
+        """
+        Compute risk-neutral densities and CDFs for all expiries.
+
+        Parameters:
+        chain : DataFrame or NormalizedChain : Combined chain with 'Expiration Date', 'Strike', 'Type',
+                'Index Spot' and an IV column
+        forwards : float, array_like or Series : Forward per expiry (Series indexed by expiry, or aligned
+                   with the sorted expiries); defaults to the index spot
+        valuation_date : Timestamp : Date the quotes were taken; defaults to today
+        iv_column : str : Column holding implied volatilities (a NormalizedChain already carries its IVs)
+
+        Returns:
+        RNDResult : expiries, T and forwards of length n_expiries, and (n_expiries, n_points)
+                    arrays of strikes, density and cdf. Rows without enough quotes are NaN.
+        """
+        with profiler.stage("rnd", rows=len(chain)) as event:
+            if isinstance(chain, NormalizedChain):
+                chain = chain.with_forwards(forwards)
+            else:
+                chain = NormalizedChain(chain, forwards, iv_column)
+            smiles = chain.smile()
+            expiries = chain.expiries
+            event["expiries"] = len(expiries)
+            T = chain.time_to_expiry(valuation_date)
+            forwards = chain.forwards
+            r = chain.per_expiry(self.r)
+
+            shape = (len(expiries), self.n_points)
+            strikes, density, cdf = (np.full(shape, np.nan) for _ in range(3))
+            sigma, dsigma, d2sigma = (np.full(shape, np.nan) for _ in range(3))
+            keys, pending = {}, []
+            for i in range(len(expiries)):
+                rows = slice(smiles.offsets[i], smiles.offsets[i + 1])
+                k = smiles.strikes[rows]
+                if len(k) < 4 or T[i] <= 0:
+                    continue
+                if self.cache is not None:
+                    keys[i] = slice_hash(k, smiles.values[rows], T[i], forwards[i], r[i], self.n_points)
+                    hit = self.cache.get("rnd", keys[i])
+                    if hit is not None:
+                        strikes[i], density[i], cdf[i] = hit
+                        continue
+                spline = CubicSpline(k, smiles.values[rows])
+                grid = np.linspace(k[0], k[-1], self.n_points)
+                strikes[i] = grid
+                sigma[i] = spline(grid)
+                dsigma[i] = spline(grid, 1)
+                d2sigma[i] = spline(grid, 2)
+                pending.append(i)
+
+            # Densities are evaluated in one batch over the expiries that were not cached
+            event["recomputed"] = len(pending)
+            if pending:
+                density[pending], cdf[pending] = self.density_from_smile(
+                    forwards[pending, None], strikes[pending], T[pending, None], r[pending, None],
+                    sigma[pending], dsigma[pending], d2sigma[pending]
+                )
+            if self.cache is not None:
+                for i in pending:
+                    self.cache.put("rnd", keys[i], (strikes[i].copy(), density[i].copy(), cdf[i].copy()))
+            return RNDResult(expiries, T, forwards, strikes, density, cdf)
+
+    def density_from_smile(self, F, K, T, r, sigma, dsigma, d2sigma):
+        """
+        Breeden-Litzenberger density and CDF from a smile and its strike derivatives.
+
+        Parameters:
+        F, K, T, r : array_like : Forward, strike, time to expiry and rate (broadcastable)
+        sigma : array_like : Implied volatility at K
+        dsigma : array_like : dsigma/dK at K
+        d2sigma : array_like : d2sigma/dK2 at K
+
+        Returns:
+        tuple : (density, cdf) with the broadcast shape of the inputs
+        """
+        res = self.pricer.evaluate(
+            F, K, T, r, sigma, "call", greeks=("vega", "volga", "dual_delta", "dual_gamma", "dual_vanna")
+        )
+        growth = np.exp(np.asarray(r) * T)
+        cdf = 1.0 + growth * (res["dual_delta"] + res["vega"] * dsigma)
+        d2C_dK2 = (
+            res["dual_gamma"]
+            + 2.0 * res["dual_vanna"] * dsigma
+            + res["volga"] * dsigma * dsigma
+            + res["vega"] * d2sigma
+        )
+        return growth * d2C_dK2, cdf
+
+    def compute_from_params(self, params, n_points=None, adaptive=True, tail=1e-4):
+        """
+        Risk-neutral densities and CDFs derived in closed form from fitted smile parameters.
+
+        Parameters:
+        params : DataFrame : Output of VolSurfaceCalculator.calibrate / calibrate_ssvi or SABRCalculator.calibrate
+        n_points : int : Grid points per expiry; defaults to self.n_points
+        adaptive : bool : Place the points at equally spaced probabilities, so they are dense where the mass
+                   is; otherwise space them uniformly in strike between the same tail quantiles
+        tail : float : Probability left out below the first and above the last point
+
+        Returns:
+        RNDResult : As for compute(), one row per row of params; rows of unsuccessful fits, and tail
+                    points of smiles whose CDF never reaches the tail probability, are NaN
+        """
+        n_points = n_points or self.n_points
+        with profiler.stage("rnd_analytic", expiries=len(params), points=n_points):
+            if adaptive:
+                strikes = self.quantiles(params, np.linspace(tail, 1.0 - tail, n_points))
+            else:
+                edges = self.quantiles(params, [tail, 1.0 - tail])
+                strikes = edges[:, :1] + (edges[:, 1:] - edges[:, :1]) * np.linspace(0.0, 1.0, n_points)
+            density, cdf = self.density_from_params(params, strikes)
+            return RNDResult(pd.DatetimeIndex(params.index, name="Expiration Date"),
+                             params["T"].to_numpy(dtype=float), params["forward"].to_numpy(dtype=float),
+                             strikes, density, cdf)
+
+    def density_from_params(self, params, strikes):
+        """
+        Closed-form Breeden-Litzenberger density and CDF of fitted smiles at arbitrary strikes.
+
+        With total variance w(k) and d2 = -k / sqrt(w) - sqrt(w) / 2, the density is
+        phi(d2) * g(k) / (K * sqrt(w)) with
+        g(k) = (1 - k w' / (2 w))^2 - w'^2 / 4 * (1 / w + 1 / 4) + w'' / 2, and the CDF is
+        N(-d2) + phi(d2) * w' / (2 sqrt(w)). Both are under the expiry's forward measure, so
+        no rate is involved.
+
+        Parameters:
+        params : DataFrame : Fitted parameters, as for compute_from_params()
+        strikes : array_like : Query strikes, (n_points,) shared by every expiry or (n_expiries, n_points)
+
+        Returns:
+        tuple : (density, cdf), each (n_expiries, n_points)
+        """
+        smile = _Smile(params)
+        strikes = np.broadcast_to(np.asarray(strikes, dtype=float), (len(params), np.shape(strikes)[-1]))
+        return smile.density(np.arange(len(params))[:, None], np.log(strikes / smile.forward[:, None]))
+
+    def quantiles(self, params, probabilities, tol=1e-10, max_iter=50):
+        """
+        Strikes at which the fitted risk-neutral CDFs reach the given probabilities.
+
+        Every (expiry, probability) point is solved at once by Newton steps in
+        log-moneyness on the closed-form CDF, safeguarded by a bisection bracket
+        taken from a coarse CDF table; points drop out of the iteration as they
+        converge. The table spans +-20 at-the-money standard deviations and
+        log-moneyness -10 to 3; probabilities the CDF does not reach there (a
+        smile whose wings leave mass at zero or infinity) have no quantile.
+
+        Parameters:
+        params : DataFrame : Fitted parameters, as for compute_from_params()
+        probabilities : array_like : Probabilities in (0, 1), (n,) shared by every expiry or (n_expiries, n)
+        tol : float : Convergence tolerance in log-moneyness
+        max_iter : int : Iteration limit
+
+        Returns:
+        ndarray : (n_expiries, n) strikes; NaN for unsuccessful fits and unreachable probabilities
+        """
+        smile = _Smile(params)
+        shape = (len(params), np.shape(probabilities)[-1])
+        p = np.broadcast_to(np.asarray(probabilities, dtype=float), shape).ravel()
+        row = np.repeat(np.arange(shape[0]), shape[1])
+
+        # A coarse CDF table per expiry brackets every point. Its running maximum is monotone and first
+        # reaches p where the CDF itself does, so one searchsorted on (row, cdf) packed keys finds the cells
+        expiries = np.arange(shape[0])
+        root = np.sqrt(smile.variance(expiries, np.zeros(shape[0]))[0])
+        table_k = np.concatenate([root[:, None] * _QUANTILE_DEVIATIONS,
+                                  np.broadcast_to(_QUANTILE_MONEYNESS, (shape[0], len(_QUANTILE_MONEYNESS)))], axis=1)
+        table_k.sort(axis=1)
+        size = table_k.shape[1]
+        table = smile.density(expiries[:, None], table_k)[1]
+        table = np.maximum.accumulate(np.clip(np.nan_to_num(table), 0.0, 1.0), axis=1)
+        cell = np.searchsorted((2.0 * expiries[:, None] + table).ravel(), 2.0 * row + p) - row * size
+        j = np.clip(cell, 1, size - 1)
+        lower, upper = table_k[row, j - 1], table_k[row, j]
+        low, high = table[row, j - 1], table[row, j]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            k = np.where(high > low, lower + (p - low) / (high - low) * (upper - lower), 0.5 * (lower + upper))
+
+        # Probabilities the CDF does not reach inside the table have no quantile
+        k[(cell <= 0) | (cell >= size)] = np.nan
+        result = k.copy()
+        active = np.flatnonzero(np.isfinite(k))
+        row, p, k, lower, upper = row[active], p[active], k[active], lower[active], upper[active]
+        for _ in range(max_iter):
+            density, cdf = smile.density(row, k)
+            above = cdf > p
+            upper = np.where(above, k, upper)
+            lower = np.where(above, lower, k)
+            # dCDF/dk is the density in strike times K
+            with np.errstate(divide="ignore", invalid="ignore"):
+                updated = k - (cdf - p) / (density * smile.forward[row] * np.exp(k))
+            inside = np.isfinite(updated) & (updated > lower) & (updated < upper)
+            updated = np.where(inside, updated, 0.5 * (lower + upper))
+            result[active] = updated
+
+            pending = np.abs(updated - k) > tol
+            if not pending.any():
+                break
+            active = active[pending]
+            row, p, k, lower, upper = (x[pending] for x in (row, p, updated, lower, upper))
+        return smile.forward[:, None] * np.exp(result.reshape(shape))
+
+
+class _Smile:
+    """
+    Per-expiry SVI (SVI layout, including SSVI) or SABR parameters evaluated at
+    (expiry row, log-moneyness) points, with total variance derivatives in k.
+    """
+
+    def __init__(self, params):
+        self.sabr = "alpha" in params
+        self.forward = params["forward"].to_numpy(dtype=float)
+        self.T = params["T"].to_numpy(dtype=float)
+        self.coefficients = params[SABR_PARAMS if self.sabr else SVI_PARAMS].to_numpy(dtype=float, copy=True)
+        # Unsuccessful fits evaluate to NaN
+        self.coefficients[~(params["success"].to_numpy(dtype=bool) & (self.T > 0))] = np.nan
+
+    def variance(self, row, k):
+        """
+        Total variance w and its first two log-moneyness derivatives at points of expiry `row`.
+        """
+        coefficients = self.coefficients[row]
+        if not self.sabr:
+            return svi_strike_derivatives(coefficients, k)
+        F, T = self.forward[row], self.T[row]
+        alpha, beta, rho, nu = np.moveaxis(coefficients, -1, 0)
+        vol, dvol, d2vol = sabr_strike_derivatives(F, F * np.exp(k), T, alpha, beta, rho, nu)
+        return vol * vol * T, 2.0 * T * vol * dvol, 2.0 * T * (dvol * dvol + vol * d2vol)
+
+    def density(self, row, k):
+        """
+        Closed-form density in strike and CDF at points of expiry `row` (see density_from_params).
+        """
+        with np.errstate(divide="ignore", invalid="ignore"):
+            w, dw, d2w = self.variance(row, k)
+            root = np.sqrt(w)
+            d2 = -k / root - 0.5 * root
+            pdf = _INV_SQRT_2PI * np.exp(-0.5 * d2 * d2)
+            g = (1.0 - 0.5 * k * dw / w) ** 2 - 0.25 * dw * dw * (1.0 / w + 0.25) + 0.5 * d2w
+            strike = self.forward[row] * np.exp(k)
+            return pdf * g / (strike * root), ndtr(-d2) + pdf * dw / (2.0 * root)
@@ -0,0 +1,50 @@
+import random
+import threading
+import time
+
+
+class RateLimiter:
+    """
+    Thread-safe limiter spacing calls at least 1 / rate seconds apart.
+    """
+
+    def __init__(self, rate=None):
+        self.interval = 1.0 / rate if rate else 0.0
+        self._lock = threading.Lock()
+        self._next = 0.0
+
+    def wait(self):
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next)
+            self._next = start + self.interval
+        if start > now:
+            time.sleep(start - now)
+
+
+def with_retries(fn, *args, attempts=3, backoff=0.5, limiter=None, **kwargs):
+    """
+    Call fn, retrying failures with jittered exponential backoff.
+
+    Parameters:
+    fn : callable : Function to call
+    attempts : int : Total number of attempts before the last error is raised
+    backoff : float : Base delay in seconds, doubled after each failure
+    limiter : RateLimiter : Optional limiter consulted before every attempt
+
+    Returns:
+    object : Whatever fn returns
+    """
+    for attempt in range(attempts):
+        if limiter is not None:
+            limiter.wait()
+        try:
+            return fn(*args, **kwargs)
+        except Exception as e:
+            if attempt == attempts - 1:
+                raise
+            delay = backoff * 2 ** attempt * (1 + random.random())
+            print(f"Attempt {attempt + 1} of {getattr(fn, '__name__', fn)} failed ({e}); retrying in {delay:.1f}s")
+            time.sleep(delay)
@@ -0,0 +1,340 @@
+import numpy as np
+import pandas as pd
+from Profiler import profiler
+from SliceCache import slice_hash
+from VolSurfaceCalculator import smile_slices
+
+SABR_PARAMS = ["alpha", "beta", "rho", "nu"]
+# Per-slice parameters fitted by the calibrator; beta is shared and held fixed
+SABR_LOWER = np.array([1e-4, -0.999, 1e-4])
+SABR_UPPER = np.array([np.inf, 0.999, 100.0])
+# Below this |z| the z / x(z) factor and its derivatives use their Taylor series
+_Z_SERIES = 1e-5
+# The second strike derivative cancels more severely, so its series runs further out (to fourth order)
+_Z_SERIES_STRIKE = 3e-3
+
+
+def sabr_implied_vol(F, K, T, alpha, beta, rho, nu):
+    """
+    Hagan et al. (2002) lognormal SABR implied volatility.
+
+    Every input is broadcast against the others. The at-the-money limit is taken
+    through a series expansion of z / x(z) selected elementwise, so strikes equal
+    to the forward need no special handling.
+
+    Parameters:
+    F : array_like : Forward price
+    K : array_like : Strike price
+    T : array_like : Time to expiry in years
+    alpha, beta, rho, nu : array_like : SABR parameters
+
+    Returns:
+    ndarray : Black implied volatilities
+    """
+    return _hagan(F, K, T, alpha, beta, rho, nu)[0]
+
+
+def sabr_jacobian(F, K, T, alpha, beta, rho, nu):
+    """
+    Hagan implied volatility and its analytic derivatives with respect to (alpha, rho, nu).
+
+    Parameters:
+    F, K, T, alpha, beta, rho, nu : array_like : As for sabr_implied_vol
+
+    Returns:
+    tuple : (vol, jac) where jac has the broadcast shape plus a trailing axis of length 3
+    """
+    vol, d_alpha, d_rho, d_nu = _hagan(F, K, T, alpha, beta, rho, nu, jacobian=True)
+    return vol, np.stack([d_alpha, d_rho, d_nu], axis=-1)
+
+
+def sabr_strike_derivatives(F, K, T, alpha, beta, rho, nu):
+    """
+    Hagan implied volatility and its first two analytic derivatives in log-strike.
+
+    Derivatives are taken with respect to ln K (equivalently log-moneyness k) by
+    the chain rule through each factor of vol = A * zeta(z) * E, which is what
+    the closed-form Breeden-Litzenberger density needs.
+
+    Parameters:
+    F, K, T, alpha, beta, rho, nu : array_like : As for sabr_implied_vol
+
+    Returns:
+    tuple : (vol, dvol/dk, d2vol/dk2) with the broadcast shape of the inputs
+    """
+    F, K, T, alpha, beta, rho, nu = np.broadcast_arrays(
+        *(np.asarray(x, dtype=float) for x in (F, K, T, alpha, beta, rho, nu))
+    )
+    c = 0.5 * (1.0 - beta)
+    q = (1.0 - beta) * (1.0 - beta)
+    L = np.log(F / K)
+    L2 = L * L
+    P = np.exp(c * np.log(F * K))
+    # A = alpha / (P * D) with D = 1 + q L^2 / 24 + q^2 L^4 / 1920, and dL/dk = -1, dP/dk = c P.
+    # Powers are written as products: numpy's pow is very slow for negative bases
+    D = 1.0 + q * L2 / 24.0 + q * q * L2 * L2 / 1920.0
+    dD = -q * L / 12.0 - q * q * L2 * L / 480.0
+    d2D = q / 12.0 + q * q * L2 / 160.0
+    A = alpha / (P * D)
+    dlogA = -c - dD / D
+    d2logA = -(d2D / D - (dD / D) * (dD / D))
+
+    scale = nu / alpha * P
+    z = scale * L
+    dz = scale * (c * L - 1.0)
+    d2z = scale * c * (c * L - 2.0)
+    series = np.abs(z) < _Z_SERIES_STRIKE
+    z_exact = np.where(series, 1.0, z)
+    S = np.sqrt(1.0 - 2.0 * rho * z_exact + z_exact * z_exact)
+    x = np.log((S + z_exact - rho) / (1.0 - rho))
+    # zeta = z / x, zeta' = N / x^2 with N = x - z / S, and N' = z (z - rho) / S^3
+    N = x - z_exact / S
+    rho2 = rho * rho
+    c2 = (2.0 - 3.0 * rho2) / 12.0
+    c3 = rho * (5.0 - 6.0 * rho2) / 24.0
+    c4 = -5.0 * rho2 * rho2 / 16.0 + rho2 / 3.0 - 17.0 / 360.0
+    z2 = z * z
+    x2 = x * x
+    zeta = np.where(series, 1.0 - 0.5 * rho * z + c2 * z2 + c3 * z2 * z + c4 * z2 * z2, z_exact / x)
+    dzeta = np.where(series, -0.5 * rho + 2.0 * c2 * z + 3.0 * c3 * z2 + 4.0 * c4 * z2 * z, N / x2)
+    d2zeta = np.where(series, 2.0 * c2 + 6.0 * c3 * z + 12.0 * c4 * z2,
+                      z_exact * (z_exact - rho) / (S * S * S * x2) - 2.0 * N / (S * x2 * x))
+
+    # E = 1 + T (E_alpha + E_rho + E_nu), where E_alpha ~ P^-2 and E_rho ~ P^-1
+    E_alpha = q * alpha * alpha / (24.0 * P * P)
+    E_rho = rho * beta * nu * alpha / (4.0 * P)
+    E = 1.0 + T * (E_alpha + E_rho + (2.0 - 3.0 * rho2) * nu * nu / 24.0)
+    dE = -T * c * (2.0 * E_alpha + E_rho)
+    d2E = T * c * c * (4.0 * E_alpha + E_rho)
+
+    # Derivatives of log vol = log A + log zeta + log E
+    zeta_k = dzeta * dz / zeta
+    zeta_kk = (d2zeta * dz * dz + dzeta * d2z) / zeta
+    slope = dlogA + zeta_k + dE / E
+    curvature = d2logA + zeta_kk - zeta_k * zeta_k + d2E / E - (dE / E) * (dE / E)
+    vol = A * zeta * E
+    return vol, vol * slope, vol * (curvature + slope * slope)
+
+
+def _hagan(F, K, T, alpha, beta, rho, nu, jacobian=False):
+    F, K, T, alpha, beta, rho, nu = np.broadcast_arrays(
+        *(np.asarray(x, dtype=float) for x in (F, K, T, alpha, beta, rho, nu))
+    )
+    one_minus_beta = 1.0 - beta
+    log_moneyness = np.log(F / K)
+    # P = (FK)^((1 - beta) / 2)
+    P = np.exp(0.5 * one_minus_beta * np.log(F * K))
+    b2L2 = (one_minus_beta * log_moneyness) ** 2
+    A = alpha / (P * (1.0 + b2L2 / 24.0 + b2L2 * b2L2 / 1920.0))
+
+    z = nu / alpha * P * log_moneyness
+    series = np.abs(z) < _Z_SERIES
+    # The exact branch runs on a dummy z where the series is used, so nothing divides by zero
+    z_exact = np.where(series, 1.0, z)
+    S = np.sqrt(1.0 - 2.0 * rho * z_exact + z_exact * z_exact)
+    x = np.log((S + z_exact - rho) / (1.0 - rho))
+    zeta = np.where(series, 1.0 - 0.5 * rho * z + (2.0 - 3.0 * rho * rho) * z * z / 12.0, z_exact / x)
+
+    E_alpha = one_minus_beta ** 2 * alpha * alpha / (24.0 * P * P)
+    E_rho = rho * beta * nu * alpha / (4.0 * P)
+    E_nu = (2.0 - 3.0 * rho * rho) * nu * nu / 24.0
+    E = 1.0 + T * (E_alpha + E_rho + E_nu)
+    vol = A * zeta * E
+    if not jacobian:
+        return (vol,)
+
+    # dzeta/dz = (x - z / S) / x^2 and dzeta/drho = -z * dx/drho / x^2, since dx/dz = 1 / S
+    dx_drho = (-z_exact / S - 1.0) / (S + z_exact - rho) + 1.0 / (1.0 - rho)
+    dzeta_dz = np.where(series, -0.5 * rho + (2.0 - 3.0 * rho * rho) * z / 6.0, (x - z_exact / S) / (x * x))
+    dzeta_drho = np.where(series, -0.5 * z - 0.5 * rho * z * z, -z_exact * dx_drho / (x * x))
+
+    d_alpha = (vol / alpha - A * E * dzeta_dz * z / alpha
+               + A * zeta * T * (2.0 * E_alpha + E_rho) / alpha)
+    d_rho = A * E * dzeta_drho + A * zeta * T * (beta * nu * alpha / (4.0 * P) - 0.25 * rho * nu * nu)
+    d_nu = A * E * dzeta_dz * z / nu + A * zeta * T * (E_rho + 2.0 * E_nu) / nu
+    return vol, d_alpha, d_rho, d_nu
+
+
+class SABRCalculator:
+    """
+    SABR calibration of every expiry slice in a single batched least-squares solve.
+
+    Slices are extracted exactly as for SVI by smile_slices (OTM quotes,
+    duplicate strikes averaged). beta is shared by all slices and held fixed,
+    and alpha, rho and nu are fitted per slice by a Levenberg-Marquardt
+    iteration that advances every slice together on the analytic Jacobian,
+    with no Python loop over expiries or quotes. Residuals are in
+    implied-volatility units. Previous fits warm-start the solve and the
+    optional SliceCache stores fits under the "sabr" model.
+    """
+
+    def __init__(self, beta=1.0, min_quotes=5, cache=None, tol=1e-10, max_iter=100):
+        self.min_quotes = min_quotes
+        self.cache = cache
+        self.beta = beta
+        self.tol = tol
+        self.max_iter = max_iter
+        self.params = pd.DataFrame(columns=["T", "forward"] + SABR_PARAMS + ["rmse", "success"])
+
+    def calibrate(self, chain, forwards=None, valuation_date=None, iv_column="IV", include_no_volume=True,
+                  previous=None):
+        """
+        Calibrate SABR (alpha, rho, nu) to every expiry of a combined chain at the shared beta.
+
+        Parameters:
+        chain : DataFrame or NormalizedChain : Combined chain with 'Expiration Date', 'Strike', 'Type',
+                'Index Spot' and an IV column
+        forwards : float, array_like or Series : Forward per expiry (Series indexed by expiry, or aligned
+                   with the sorted expiries); defaults to the index spot
+        valuation_date : Timestamp : Date the quotes were taken; defaults to today
+        iv_column : str : Column holding implied volatilities
+        include_no_volume : bool : Keep quotes with no volume / open interest
+        previous : DataFrame : Parameters from an earlier snapshot to warm-start from; defaults to
+                   the last calibration made by this instance
+
+        Returns:
+        DataFrame : One row per expiry with T, forward, alpha, beta, rho, nu, rmse and success
+        """
+        with profiler.stage("calibrate_sabr") as event:
+            slices = self.slices(chain, forwards, valuation_date, iv_column, include_no_volume)
+            event["expiries"] = len(slices)
+            event["rows"] = sum(len(k) for _, _, _, k, _ in slices)
+            if not slices:
+                return self.params.iloc[0:0]
+
+            keys, fitted = self._cached_fits(slices)
+            pending = [entry for entry in slices if entry[0] not in fitted]
+            event["refit"] = len(pending)
+            if pending:
+                previous = self.params if previous is None else previous
+                for expiry, params, rmse, success in self._fit_batch(pending, previous):
+                    fitted[expiry] = (params, rmse, success)
+                    if self.cache is not None:
+                        self.cache.put("sabr", keys[expiry], (params, rmse, success))
+
+            params = pd.DataFrame(
+                [[T, F, fitted[expiry][0][0], self.beta, *fitted[expiry][0][1:], *fitted[expiry][1:]]
+                 for expiry, T, F, _, _ in slices],
+                index=pd.DatetimeIndex([expiry for expiry, _, _, _, _ in slices], name="Expiration Date"),
+                columns=self.params.columns,
+            )
+            self.params = params
+            return params
+
+    def slices(self, chain, forwards=None, valuation_date=None, iv_column="IV", include_no_volume=True):
+        """
+        Extract OTM (log-moneyness, total variance) slices per expiry, as for VolSurfaceCalculator.
+
+        Returns:
+        list : (expiry, T, forward, k, w) tuples in expiry order
+        """
+        return smile_slices(chain, forwards, valuation_date, iv_column, include_no_volume, self.min_quotes)
+
+    def implied_vol(self, k, params=None):
+        """
+        Evaluate fitted implied volatilities on a log-moneyness grid.
+
+        Parameters:
+        k : array_like : Log-moneyness grid, broadcast against every expiry
+        params : DataFrame : Calibrated parameters; defaults to the last calibration
+
+        Returns:
+        ndarray : (n_expiries, len(k)) implied volatilities
+        """
+        params = self.params if params is None else params
+        column = {name: params[name].to_numpy(dtype=float)[:, None] for name in ["T", "forward"] + SABR_PARAMS}
+        F = column["forward"]
+        return sabr_implied_vol(F, F * np.exp(np.asarray(k))[None, :], column["T"],
+                                column["alpha"], column["beta"], column["rho"], column["nu"])
+
+    def _cached_fits(self, slices):
+        if self.cache is None:
+            return {}, {}
+        keys = {expiry: slice_hash(k, w, self.beta) for expiry, _, _, k, w in slices}
+        fitted = {}
+        for expiry, key in keys.items():
+            hit = self.cache.get("sabr", key)
+            if hit is not None:
+                fitted[expiry] = hit
+        return keys, fitted
+
+    def _fit_batch(self, slices, previous):
+        sizes = np.array([len(k) for _, _, _, k, _ in slices])
+        block = np.repeat(np.arange(len(slices)), sizes)
+        F = np.repeat([forward for _, _, forward, _, _ in slices], sizes)
+        T = np.repeat([T for _, T, _, _, _ in slices], sizes)
+        K = F * np.exp(np.concatenate([k for _, _, _, k, _ in slices]))
+        vol = np.sqrt(np.concatenate([w for _, _, _, _, w in slices]) / T)
+        initial = np.array([self._initial(previous, expiry, T, forward, k, w) for expiry, T, forward, k, w in slices])
+
+        params, sse, converged = self._levenberg_marquardt(initial, F, K, T, vol, block, len(slices))
+        rmse = np.sqrt(sse / sizes)
+        success = converged & np.isfinite(rmse)
+        return [(expiry, params[i], rmse[i], bool(success[i])) for i, (expiry, _, _, _, _) in enumerate(slices)]
+
+    def _levenberg_marquardt(self, x, F, K, T, vol, block, n_slices):
+        """
+        Bounded Levenberg-Marquardt run on every slice at once.
+
+        Each iteration evaluates the analytic Jacobian over all quotes of the
+        slices still iterating, accumulates the 3x3 normal equations per slice
+        with bincount, and solves them as one stacked linear system. Damping is
+        adapted per slice, and a slice stops iterating once its improvement
+        falls below self.tol, so the remaining work shrinks as slices converge.
+
+        Returns:
+        tuple : (params (n_slices, 3), sum of squared residuals per slice, converged flags)
+        """
+        x = np.clip(x, SABR_LOWER, SABR_UPPER)
+        damping = np.full(n_slices, 1e-3)
+        converged = np.zeros(n_slices, dtype=bool)
+
+        def sse(x, rows, slices):
+            p = x[slices]
+            residual = sabr_implied_vol(F[rows], K[rows], T[rows], p[:, 0], self.beta, p[:, 1], p[:, 2]) - vol[rows]
+            return np.bincount(block[rows], weights=residual * residual, minlength=n_slices)
+
+        all_rows = np.arange(len(block))
+        cost = sse(x, all_rows, block)
+        for _ in range(self.max_iter):
+            active = ~converged
+            if not active.any():
+                break
+            rows = np.flatnonzero(active[block])
+            slices = block[rows]
+            p = x[slices]
+            model, jac = sabr_jacobian(F[rows], K[rows], T[rows], p[:, 0], self.beta, p[:, 1], p[:, 2])
+            residual = model - vol[rows]
+
+            normal = np.zeros((n_slices, 3, 3))
+            gradient = np.zeros((n_slices, 3))
+            for a in range(3):
+                gradient[:, a] = np.bincount(slices, weights=jac[:, a] * residual, minlength=n_slices)
+                for b in range(a, 3):
+                    normal[:, a, b] = normal[:, b, a] = np.bincount(slices, weights=jac[:, a] * jac[:, b],
+                                                                    minlength=n_slices)
+            diagonal = np.diagonal(normal, axis1=1, axis2=2)
+            damped = normal + (damping[:, None] * (diagonal + 1e-12))[:, :, None] * np.eye(3)
+            # Converged slices are left singular-free by solving an identity in their place
+            damped[converged] = np.eye(3)
+            step = np.linalg.solve(damped, -gradient[:, :, None])[:, :, 0]
+            trial = np.clip(x + step, SABR_LOWER, SABR_UPPER)
+
+            trial_cost = cost.copy()
+            trial_cost[active] = sse(trial, rows, slices)[active]
+            improved = active & np.isfinite(trial_cost) & (trial_cost < cost)
+            gain = np.where(improved, cost - trial_cost, 0.0)
+            small_step = np.abs(trial - x).max(axis=1) <= self.tol * (np.abs(x).max(axis=1) + self.tol)
+            x[improved] = trial[improved]
+            cost = np.where(improved, trial_cost, cost)
+            damping = np.where(improved, damping / 3.0, np.where(active, damping * 4.0, damping))
+            converged |= active & ((improved & (gain <= self.tol * (cost + self.tol))) | small_step
+                                   | (damping > 1e10))
+        return x, cost, converged
+
+    def _initial(self, previous, expiry, T, forward, k, w):
+        if expiry in previous.index and previous.at[expiry, "success"] and "alpha" in previous:
+            return previous.loc[expiry, ["alpha", "rho", "nu"]].to_numpy(dtype=float)
+        # alpha from the vol nearest the money: sigma_ATM ~ alpha / F^(1 - beta)
+        atm_vol = np.sqrt(w[np.argmin(np.abs(k))] / T)
+        return np.array([atm_vol * forward ** (1.0 - self.beta), -0.5, 1.0])
@@ -0,0 +1,123 @@
+import hashlib
+import os
+import pickle
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+
+def slice_hash(*parts):
+    """
+    Content hash of one expiry slice's normalized inputs.
+
+    Parameters:
+    parts : ndarray or scalar : Arrays and settings the result depends on, e.g. strikes, IVs, T and forward
+
+    Returns:
+    str : SHA-256 hex digest; equal inputs (to the bit) give equal digests
+    """
+    digest = hashlib.sha256()
+    for part in parts:
+        array = np.ascontiguousarray(part, dtype=float)
+        digest.update(str(array.shape).encode())
+        digest.update(array.tobytes())
+    return digest.hexdigest()
+
+
+class SliceCache:
+    """
+    Bounded LRU memo of per-slice results keyed by (model, slice_hash).
+
+    VolSurfaceCalculator stores fitted parameters and RNDCalculator stores
+    density rows here, so on a new snapshot only the expiries whose quotes
+    changed are refitted or re-derived. One cache can be shared by several
+    calculators because keys are namespaced by model. Access is thread-safe.
+
+    With a path, every entry is also pickled to <path>/<model>-<key>.pkl, so
+    later processes (e.g. successive CLI runs on the same stored snapshot)
+    reuse it; beyond maxsize files the least recently written are removed.
+    """
+
+    def __init__(self, maxsize=512, path=None):
+        """
+        Parameters:
+        maxsize : int : Entries kept in memory, and files kept under path
+        path : str : Optional directory the entries are persisted to
+        """
+        self.maxsize = maxsize
+        self.path = path
+        if path is not None:
+            os.makedirs(path, exist_ok=True)
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, model, key):
+        """
+        Cached result for a slice, or None; a hit marks the entry most recently used.
+        """
+        with self._lock:
+            value = self._entries.get((model, key))
+            if value is None and self.path is not None:
+                value = self._load(model, key)
+                if value is not None:
+                    self._entries[(model, key)] = value
+                    self._evict()
+            if value is None:
+                self.stats["misses"] += 1
+                return None
+            self._entries.move_to_end((model, key))
+            self.stats["hits"] += 1
+            return value
+
+    def put(self, model, key, value):
+        """
+        Store a slice result, evicting the least recently used entries beyond maxsize.
+        """
+        with self._lock:
+            self._entries[(model, key)] = value
+            self._entries.move_to_end((model, key))
+            self._evict()
+            if self.path is not None:
+                self._save(model, key, value)
+
+    def _evict(self):
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self.stats["evictions"] += 1
+
+    def _file(self, model, key):
+        return os.path.join(self.path, f"{model}-{key}.pkl")
+
+    def _load(self, model, key):
+        try:
+            with open(self._file(model, key), "rb") as f:
+                return pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            return None
+
+    def _save(self, model, key, value):
+        # Write then rename, so a concurrent reader never sees a partial file
+        path = self._file(model, key)
+        with open(path + ".tmp", "wb") as f:
+            pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(path + ".tmp", path)
+        files = [os.path.join(self.path, name) for name in os.listdir(self.path) if name.endswith(".pkl")]
+        if len(files) > self.maxsize:
+            for stale in sorted(files, key=os.path.getmtime)[:len(files) - self.maxsize]:
+                os.remove(stale)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def report(self):
+        """
+        Print hit / miss counts since the cache was created.
+        """
+        print(f"Slice cache: {self.stats['hits']} hits, {self.stats['misses']} misses, "
+              f"{self.stats['evictions']} evictions, {len(self)}/{self.maxsize} entries")
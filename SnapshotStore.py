@@ -0,0 +1,234 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.ipc as ipc
+from ChainStore import CHAIN_SCHEMA, to_chain_table
+
+# Occurrence disambiguates repeated strikes within an expiry (e.g. SPX and SPXW listings)
+KEY_COLUMNS = ["Type", "Strike", "Occurrence"]
+QUOTE_COLUMNS = ["Last Sale", "Net", "Bid", "Ask", "Volume", "IV", "Delta", "Gamma", "Open Interest"]
+# Type is a plain string here: IPC files allow only one dictionary per field across batches
+HISTORY_SCHEMA = pa.schema(
+    [field.with_type(pa.string()) if field.name == "Type" else field
+     for field in CHAIN_SCHEMA if field.name != "Index Spot"]
+    + [("Occurrence", pa.int32()), ("Removed", pa.bool_())]
+)
+INDEX_COLUMNS = ["Snapshot Time", "Expiration Date", "File", "Batch", "Rows", "Keyframe", "Index Spot"]
+
+
+class SnapshotStore:
+    """
+    Append-only history of combined-chain snapshots.
+
+    Each download becomes one Arrow IPC file holding a record batch per expiry.
+    Batches are delta-encoded against the previous snapshot of the same expiry:
+    only new or changed quotes are written, plus tombstone rows for quotes that
+    disappeared, with a full keyframe every `keyframe_interval` snapshots to
+    bound replay. An expiry with no changes gets an empty batch, so every
+    (snapshot, expiry) has an index row carrying that snapshot's index spot.
+    Batches are zstd-compressed. index.csv maps (snapshot time, expiry) to its file and batch so
+    range queries open only the batches they need.
+    """
+
+    def __init__(self, root="./snapshot_store", keyframe_interval=24):
+        self.root = root
+        self.keyframe_interval = keyframe_interval
+        self.index_path = os.path.join(self.root, "index.csv")
+        os.makedirs(os.path.join(self.root, "snapshots"), exist_ok=True)
+        self._index = None
+        self._latest = {}
+
+    def append(self, df, snapshot_time=None):
+        """
+        Append a combined chain as a new snapshot.
+
+        Parameters:
+        df : DataFrame : Combined chain in the CBOE column layout
+        snapshot_time : Timestamp : Time the quotes were taken; defaults to now
+
+        Returns:
+        DataFrame : Index rows written for this snapshot
+        """
+        snapshot_time = pd.Timestamp.now() if snapshot_time is None else pd.Timestamp(snapshot_time)
+        index = self.index()
+        if (index["Snapshot Time"] == snapshot_time).any():
+            raise ValueError(f"Snapshot {snapshot_time} already stored")
+
+        chain = to_chain_table(df).to_pandas(date_as_object=False)
+        chain["Type"] = chain["Type"].astype(str)
+        chain = chain.sort_values(["Expiration Date", "Type", "Strike"], kind="stable")
+        chain["Occurrence"] = chain.groupby(["Expiration Date", "Type", "Strike"]).cumcount()
+        current = chain.drop(columns="Index Spot").assign(Removed=False)
+        file_name = f"{snapshot_time.strftime('%Y%m%dT%H%M%S%f')}.arrow"
+
+        expiries = chain["Expiration Date"].unique()
+        keyframes = {expiry: self._needs_keyframe(index, expiry) for expiry in expiries}
+        incremental = [expiry for expiry in expiries if not keyframes[expiry]]
+        is_incremental = current["Expiration Date"].isin(incremental)
+        if incremental:
+            previous = pd.concat([self._latest_state(expiry) for expiry in incremental], ignore_index=True)
+            changes = self._delta(previous, current[is_incremental])
+            delta = pd.concat([current[~is_incremental], changes], ignore_index=True)
+            delta = delta.sort_values(["Expiration Date"] + KEY_COLUMNS, kind="stable")
+        else:
+            delta = current
+
+        spots = chain.groupby("Expiration Date", sort=True)["Index Spot"].first()
+        changes = dict(list(delta.groupby("Expiration Date", sort=True)))
+        batches, rows = [], []
+        for expiry in sorted(expiries):
+            # Unchanged expiries still get an (empty) batch, so the snapshot lists them and records the spot
+            quotes = changes.get(expiry, delta.iloc[0:0])
+            batches.append(pa.RecordBatch.from_pandas(quotes, schema=HISTORY_SCHEMA, preserve_index=False))
+            rows.append([snapshot_time, expiry, file_name, len(rows), len(quotes), keyframes[expiry], spots[expiry]])
+        for expiry, quotes in current.groupby("Expiration Date", sort=True):
+            self._latest[expiry] = quotes.reset_index(drop=True)
+
+        path = os.path.join(self.root, "snapshots", file_name)
+        with pa.OSFile(f"{path}.tmp", "wb") as sink:
+            with ipc.new_file(sink, HISTORY_SCHEMA, options=ipc.IpcWriteOptions(compression="zstd")) as writer:
+                for batch in batches:
+                    writer.write_batch(batch)
+        os.replace(f"{path}.tmp", path)
+
+        new_rows = pd.DataFrame(rows, columns=INDEX_COLUMNS)
+        new_rows.to_csv(self.index_path, mode="a", header=not os.path.exists(self.index_path), index=False)
+        self._index = pd.concat([index, new_rows], ignore_index=True)
+        return new_rows
+
+    def index(self):
+        """
+        Load the (snapshot time, expiry) -> (file, batch) index.
+        """
+        if self._index is None:
+            if os.path.exists(self.index_path):
+                self._index = pd.read_csv(self.index_path, parse_dates=["Snapshot Time", "Expiration Date"])
+            else:
+                self._index = pd.DataFrame(columns=INDEX_COLUMNS).astype(
+                    {"Snapshot Time": "datetime64[ns]", "Expiration Date": "datetime64[ns]", "Keyframe": bool}
+                )
+        return self._index
+
+    def snapshot_times(self):
+        """
+        List stored snapshot times in ascending order.
+        """
+        return sorted(self.index()["Snapshot Time"].unique())
+
+    def query(self, expiry, start=None, end=None):
+        """
+        Reconstruct every stored snapshot of one expiry within a time range.
+
+        Parameters:
+        expiry : str or Timestamp : Expiration date
+        start : Timestamp : Earliest snapshot time (inclusive); defaults to the first snapshot
+        end : Timestamp : Latest snapshot time (inclusive); defaults to the last snapshot
+
+        Returns:
+        DataFrame : Full quote state of the expiry at each snapshot, with a 'Snapshot Time' column
+        """
+        index = self.index()
+        expiry = pd.Timestamp(expiry)
+        own = index[index["Expiration Date"] == expiry].sort_values("Snapshot Time")
+        if own.empty:
+            return pd.DataFrame(columns=["Snapshot Time"] + CHAIN_SCHEMA.names)
+        # Every snapshot that lists the expiry; stores written before unchanged expiries got a row have
+        # gaps, which carry the previous state forward with that snapshot's spot
+        spots = index.groupby("Snapshot Time")["Index Spot"].first()
+        listed = spots.index[self._listed(spots.index, own["Snapshot Time"], expiry)]
+        history = pd.DataFrame({"Snapshot Time": listed}).merge(own, on="Snapshot Time", how="left")
+        history["Index Spot"] = spots[listed].to_numpy()
+        times = history["Snapshot Time"]
+        in_range = np.ones(len(history), dtype=bool)
+        if start is not None:
+            in_range &= (times >= pd.Timestamp(start)).to_numpy()
+        if end is not None:
+            in_range &= (times <= pd.Timestamp(end)).to_numpy()
+        if not in_range.any():
+            return pd.DataFrame(columns=["Snapshot Time"] + CHAIN_SCHEMA.names)
+
+        first, last = np.flatnonzero(in_range)[[0, -1]]
+        keyframes = np.flatnonzero(history["Keyframe"].eq(True).to_numpy()[:first + 1])
+        replay = history.iloc[keyframes[-1]:last + 1]
+
+        frames = []
+        state = None
+        for position, entry in enumerate(replay.to_dict("records"), start=keyframes[-1]):
+            if not pd.isna(entry["File"]):
+                delta = self._read_batch(entry["File"], entry["Batch"])
+                state = delta if entry["Keyframe"] else self._apply(state, delta)
+            if in_range[position]:
+                frames.append(state.drop(columns="Removed").assign(
+                    **{"Snapshot Time": entry["Snapshot Time"], "Index Spot": entry["Index Spot"]}
+                ))
+        result = pd.concat(frames, ignore_index=True)
+        return result[["Snapshot Time"] + CHAIN_SCHEMA.names]
+
+    def snapshot(self, snapshot_time):
+        """
+        Reconstruct the full combined chain as of one snapshot.
+
+        Parameters:
+        snapshot_time : Timestamp : Snapshot time as listed by snapshot_times()
+
+        Returns:
+        DataFrame : Combined chain in the CBOE column layout
+        """
+        snapshot_time = pd.Timestamp(snapshot_time)
+        index = self.index()
+        if not (index["Snapshot Time"] == snapshot_time).any():
+            return pd.DataFrame(columns=CHAIN_SCHEMA.names)
+        expiries = [expiry for expiry, own in index.groupby("Expiration Date")
+                    if self._listed(pd.DatetimeIndex([snapshot_time]), own["Snapshot Time"], expiry)[0]]
+        frames = [self.query(expiry, snapshot_time, snapshot_time) for expiry in expiries]
+        if not frames:
+            return pd.DataFrame(columns=CHAIN_SCHEMA.names)
+        return pd.concat(frames, ignore_index=True).drop(columns="Snapshot Time")
+
+    @staticmethod
+    def _listed(times, own_times, expiry):
+        # An expiry is part of every snapshot from its first row on, until its last row or, if it has not
+        # been written since, until it expires
+        first, last = own_times.min(), own_times.max()
+        return np.asarray((times >= first) & ((times <= last) | (times.normalize() <= expiry)))
+
+    def _needs_keyframe(self, index, expiry):
+        keyframes = index.loc[index["Expiration Date"] == expiry, "Keyframe"].to_numpy(dtype=bool)
+        if not keyframes.any():
+            return True
+        return len(keyframes) - np.flatnonzero(keyframes)[-1] >= self.keyframe_interval
+
+    def _latest_state(self, expiry):
+        if expiry not in self._latest:
+            times = self.index().loc[self.index()["Expiration Date"] == expiry, "Snapshot Time"]
+            latest = self.query(expiry, times.max(), times.max())
+            latest = latest.drop(columns=["Snapshot Time", "Index Spot"]).assign(Removed=False)
+            latest["Occurrence"] = latest.groupby(["Type", "Strike"]).cumcount()
+            self._latest[expiry] = latest
+        return self._latest[expiry]
+
+    def _read_batch(self, file_name, batch):
+        with pa.memory_map(os.path.join(self.root, "snapshots", file_name), "r") as source:
+            return ipc.open_file(source).get_batch(int(batch)).to_pandas(date_as_object=False)
+
+    @staticmethod
+    def _delta(previous, current):
+        keys = ["Expiration Date"] + KEY_COLUMNS
+        merged = current.merge(previous, on=keys, how="outer", suffixes=("", "_prev"), indicator=True)
+        changed = merged["_merge"] == "left_only"
+        for column in QUOTE_COLUMNS:
+            new, old = merged[column], merged[f"{column}_prev"]
+            changed |= (merged["_merge"] == "both") & (new != old) & ~(new.isna() & old.isna())
+
+        tombstones = merged.loc[merged["_merge"] == "right_only", keys].assign(Removed=True)
+        delta = pd.concat([merged.loc[changed, current.columns], tombstones], ignore_index=True)
+        return delta.reindex(columns=current.columns)
+
+    @staticmethod
+    def _apply(state, delta):
+        combined = pd.concat([state, delta], ignore_index=True)
+        combined = combined.drop_duplicates(KEY_COLUMNS, keep="last")
+        combined = combined[~combined["Removed"].astype(bool)]
+        return combined.sort_values(KEY_COLUMNS, kind="stable").reset_index(drop=True)
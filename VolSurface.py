@@ -0,0 +1,193 @@
+import bisect
+import math
+import os
+
+import numpy as np
+import pandas as pd
+from SABRCalculator import SABRCalculator
+from VolSurfaceCalculator import SVI_PARAMS, svi_total_variance
+
+
+class VolSurface:
+    """
+    A fitted volatility surface precomputed once per snapshot for fast lookups.
+
+    Total implied variance is tabulated on a uniform log-moneyness grid at every
+    calibrated expiry. Queries interpolate bilinearly in (k, w): linearly in k
+    between grid points and linearly in total variance between expiries, with
+    w = 0 at T = 0 and constant volatility beyond the last expiry. Log-moneyness
+    outside the grid is clamped to its edges. Forwards are interpolated linearly
+    in log space between expiries.
+
+    Because the grid is uniform, locating k is arithmetic rather than a search,
+    so a batch query is a handful of array operations and a scalar vol(K, T)
+    call runs in pure Python. save() / load() write the tables to an .npz file so
+    other processes can query the surface without refitting.
+    """
+
+    def __init__(self, k, T, w, forwards, expiries=None):
+        """
+        Parameters:
+        k : array_like : Uniform, increasing log-moneyness grid
+        T : array_like : Increasing, positive times to expiry in years
+        w : array_like : (len(T), len(k)) total implied variance
+        forwards : array_like : Forward per expiry
+        expiries : array_like : Expiration dates aligned with T (optional, for reference only)
+        """
+        self.k = np.asarray(k, dtype=float)
+        self.T = np.asarray(T, dtype=float)
+        self.w = np.asarray(w, dtype=float)
+        self.forwards = np.asarray(forwards, dtype=float)
+        self.expiries = pd.DatetimeIndex([] if expiries is None else expiries, name="Expiration Date")
+        if self.w.shape != (len(self.T), len(self.k)) or len(self.k) < 2 or len(self.T) < 1:
+            raise ValueError(f"Surface tables do not match: w {self.w.shape}, T {len(self.T)}, k {len(self.k)}")
+        if np.any(np.diff(self.T) <= 0) or self.T[0] <= 0:
+            raise ValueError("Expiry times must be positive and strictly increasing")
+
+        self.k_min = float(self.k[0])
+        self.dk = float(self.k[1] - self.k[0])
+        # Row 0 is T = 0 with no variance, so every query interpolates between two rows
+        self._T = np.concatenate([[0.0], self.T])
+        self._w = np.vstack([np.zeros(len(self.k)), self.w])
+        self._log_forwards = np.log(self.forwards)
+        # Plain lists for the scalar path, which avoids numpy's per-call overhead
+        self._T_list = self._T.tolist()
+        self._w_list = self._w.tolist()
+        self._log_forward_list = self._log_forwards.tolist()
+
+    @classmethod
+    def from_params(cls, params, k_min=-1.0, k_max=0.5, n_k=601):
+        """
+        Tabulate a VolSurfaceCalculator (SVI) or SABRCalculator calibration.
+
+        Slices that failed to converge are dropped; the remaining slices are
+        tabulated as fitted, so the surface reproduces them exactly at grid points.
+
+        Parameters:
+        params : DataFrame : Output of VolSurfaceCalculator.calibrate or SABRCalculator.calibrate
+        k_min, k_max : float : Log-moneyness range of the grid
+        n_k : int : Grid points in log-moneyness
+
+        Returns:
+        VolSurface
+        """
+        params = params[params["success"].astype(bool) & (params["T"] > 0)].sort_values("T")
+        if params.empty:
+            raise ValueError("No successfully calibrated slices to build a surface from")
+        k = np.linspace(k_min, k_max, n_k)
+        T = params["T"].to_numpy(dtype=float)[:, None]
+        if "alpha" in params:
+            w = SABRCalculator().implied_vol(k, params) ** 2 * T
+        else:
+            w = svi_total_variance(params[SVI_PARAMS].to_numpy(dtype=float)[:, None, :], k[None, :])
+        return cls(k, params["T"].to_numpy(dtype=float), np.maximum(w, 0.0), params["forward"].to_numpy(dtype=float),
+                   params.index)
+
+    def forward(self, T):
+        """
+        Forward at arbitrary times to expiry (flat outside the calibrated expiries).
+        """
+        return np.exp(np.interp(T, self.T, self._log_forwards))
+
+    def total_variance(self, k, T):
+        """
+        Total implied variance at (log-moneyness, time to expiry) points.
+
+        Parameters:
+        k : array_like : Log-moneyness ln(K / F)
+        T : array_like : Time to expiry in years (broadcast against k)
+
+        Returns:
+        ndarray : Total implied variance
+        """
+        k, T = np.broadcast_arrays(np.asarray(k, dtype=float), np.asarray(T, dtype=float))
+        n_k = len(self.k)
+        x = np.clip((k - self.k_min) / self.dk, 0.0, n_k - 1.0)
+        i = np.minimum(x.astype(np.intp), n_k - 2)
+        f = x - i
+
+        T_last = self._T[-1]
+        j = np.clip(np.searchsorted(self._T, T, side="right") - 1, 0, len(self._T) - 2)
+        g = np.clip((T - self._T[j]) / (self._T[j + 1] - self._T[j]), 0.0, 1.0)
+
+        flat = self._w.ravel()
+        lower = j * n_k + i
+        upper = lower + n_k
+        w_lower = flat[lower] + f * (flat[lower + 1] - flat[lower])
+        w_upper = flat[upper] + f * (flat[upper + 1] - flat[upper])
+        w = w_lower + g * (w_upper - w_lower)
+        # Constant volatility beyond the last expiry
+        return np.where(T > T_last, w * T / T_last, w)
+
+    def implied_vol(self, k, T):
+        """
+        Implied volatility at (log-moneyness, time to expiry) points; NaN where T <= 0.
+        """
+        T = np.asarray(T, dtype=float)
+        w = self.total_variance(k, T)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return np.where(T > 0, np.sqrt(np.maximum(w, 0.0) / T), np.nan)
+
+    def vol(self, K, T):
+        """
+        Implied volatility at strikes and times to expiry.
+
+        Parameters:
+        K : float or array_like : Strike price
+        T : float or array_like : Time to expiry in years (broadcast against K)
+
+        Returns:
+        float or ndarray : Implied volatility; NaN where T <= 0
+        """
+        if np.ndim(K) == 0 and np.ndim(T) == 0:
+            return self._vol_scalar(float(K), float(T))
+        T = np.asarray(T, dtype=float)
+        return self.implied_vol(np.log(np.asarray(K, dtype=float) / self.forward(T)), T)
+
+    def save(self, path):
+        """
+        Write the surface tables to an .npz file (atomically).
+        """
+        tmp = f"{path}.tmp"
+        with open(tmp, "wb") as f:
+            np.savez(f, k=self.k, T=self.T, w=self.w, forwards=self.forwards,
+                     expiries=self.expiries.to_numpy(dtype="datetime64[ns]"))
+        os.replace(tmp, path)
+        print(f"Surface saved to {path}")
+
+    @classmethod
+    def load(cls, path):
+        """
+        Read a surface written by save().
+        """
+        with np.load(path, allow_pickle=False) as data:
+            return cls(data["k"], data["T"], data["w"], data["forwards"], data["expiries"])
+
+    def _vol_scalar(self, K, T):
+        if T <= 0 or K <= 0:
+            return math.nan
+        T_nodes = self._T_list
+        n_T = len(T_nodes)
+        j = min(max(bisect.bisect_right(T_nodes, T) - 1, 0), n_T - 2)
+        g = min((T - T_nodes[j]) / (T_nodes[j + 1] - T_nodes[j]), 1.0)
+
+        # Log-forward interpolation over the calibrated expiries (row 0 of T_nodes is T = 0)
+        log_forwards = self._log_forward_list
+        if T <= T_nodes[1]:
+            log_forward = log_forwards[0]
+        elif T >= T_nodes[-1]:
+            log_forward = log_forwards[-1]
+        else:
+            log_forward = log_forwards[j - 1] + g * (log_forwards[j] - log_forwards[j - 1])
+
+        n_k = len(self._w_list[0])
+        x = min(max((math.log(K) - log_forward - self.k_min) / self.dk, 0.0), n_k - 1.0)
+        i = min(int(x), n_k - 2)
+        f = x - i
+        lower, upper = self._w_list[j], self._w_list[j + 1]
+        w_lower = lower[i] + f * (lower[i + 1] - lower[i])
+        w_upper = upper[i] + f * (upper[i + 1] - upper[i])
+        w = w_lower + g * (w_upper - w_lower)
+        if T > T_nodes[-1]:
+            w *= T / T_nodes[-1]
+        return math.sqrt(max(w, 0.0) / T)
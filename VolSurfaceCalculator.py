@@ -0,0 +1,637 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from scipy.optimize import least_squares
+from NormalizedChain import NormalizedChain
+from Profiler import profiler
+from SliceCache import slice_hash
+
+SVI_PARAMS = ["a", "b", "rho", "m", "sigma"]
+SVI_LOWER = np.array([-0.5, 0.0, -0.999, -1.0, 1e-3])
+SVI_UPPER = np.array([1.0, 5.0, 0.999, 1.0, 1.0])
+SVI_COLD_START = np.array([0.1, 0.1, -0.5, 0.0, 0.1])
+SSVI_PARAMS = ["rho0", "rho1", "eta", "gamma"]
+# Weight of the eSSVI calendar-spread hinge residuals relative to a 1-vol-point quote error
+SSVI_CALENDAR_WEIGHT = 100.0
+# Largest calendar violation (in psi) accepted; the hinge weight is raised tenfold per refit until it holds
+SSVI_CALENDAR_TOL = 1e-6
+SSVI_CALENDAR_ROUNDS = 4
+
+
+def svi_total_variance(params, k):
+    """
+    Raw SVI total implied variance w(k) = a + b * (rho * (k - m) + sqrt((k - m)^2 + sigma^2)).
+
+    Parameters:
+    params : array_like : (a, b, rho, m, sigma), trailing axis of length 5
+    k : array_like : Log-moneyness ln(K / F)
+
+    Returns:
+    ndarray : Total implied variance
+    """
+    a, b, rho, m, sigma = np.moveaxis(np.asarray(params, dtype=float), -1, 0)
+    d = k - m
+    return a + b * (rho * d + np.sqrt(d * d + sigma * sigma))
+
+
+def svi_strike_derivatives(params, k):
+    """
+    Raw SVI total variance and its first two derivatives in log-moneyness.
+
+    Parameters:
+    params : array_like : (a, b, rho, m, sigma), trailing axis of length 5
+    k : array_like : Log-moneyness ln(K / F)
+
+    Returns:
+    tuple : (w, dw/dk, d2w/dk2) with the broadcast shape of params and k
+    """
+    a, b, rho, m, sigma = np.moveaxis(np.asarray(params, dtype=float), -1, 0)
+    d = k - m
+    root = np.sqrt(d * d + sigma * sigma)
+    return a + b * (rho * d + root), b * (rho + d / root), b * sigma * sigma / root ** 3
+
+
+def svi_jacobian(params, k):
+    """
+    Analytic Jacobian of svi_total_variance with respect to (a, b, rho, m, sigma).
+
+    Parameters:
+    params : array_like : (a, b, rho, m, sigma)
+    k : ndarray : Log-moneyness
+
+    Returns:
+    ndarray : (len(k), 5) matrix of partial derivatives
+    """
+    a, b, rho, m, sigma = params
+    d = k - m
+    root = np.sqrt(d * d + sigma * sigma)
+    jac = np.empty((k.size, 5))
+    jac[:, 0] = 1.0
+    jac[:, 1] = rho * d + root
+    jac[:, 2] = b * d
+    jac[:, 3] = -b * (rho + d / root)
+    jac[:, 4] = b * sigma / root
+    return jac
+
+
+def ssvi_total_variance(theta, k, rho, eta, gamma):
+    """
+    SSVI total variance w(k, theta) = theta / 2 * (1 + rho * phi * k + sqrt((phi * k + rho)^2 + 1 - rho^2))
+    with the power-law curvature phi(theta) = eta / (theta^gamma * (1 + theta)^(1 - gamma)).
+
+    Parameters:
+    theta : array_like : ATM total variance of the slice
+    k : array_like : Log-moneyness ln(K / F)
+    rho : array_like : Skew (per slice for eSSVI)
+    eta, gamma : float : Curvature level and decay
+
+    Returns:
+    ndarray : Total implied variance
+    """
+    phi = ssvi_phi(theta, eta, gamma)
+    p = phi * k
+    return 0.5 * theta * (1.0 + rho * p + np.sqrt((p + rho) ** 2 + 1.0 - rho * rho))
+
+
+def ssvi_phi(theta, eta, gamma):
+    return eta * np.exp(-gamma * np.log(theta) + (gamma - 1.0) * np.log1p(theta))
+
+
+def ssvi_to_svi(theta, rho, phi):
+    """
+    Raw SVI parameters (a, b, rho, m, sigma) of SSVI slices, which are exactly SVI.
+
+    Returns:
+    ndarray : (len(theta), 5) parameters in SVI_PARAMS order
+    """
+    theta, rho, phi = np.broadcast_arrays(*(np.asarray(x, dtype=float) for x in (theta, rho, phi)))
+    root = np.sqrt(1.0 - rho * rho)
+    return np.stack([0.5 * theta * root * root, 0.5 * theta * phi, rho, -rho / phi, root / phi], axis=-1)
+
+
+def smile_slices(chain, forwards=None, valuation_date=None, iv_column="IV", include_no_volume=True, min_quotes=5):
+    """
+    OTM (log-moneyness, total variance) slices per expiry, averaging duplicate strikes.
+
+    Parameters:
+    chain : DataFrame or NormalizedChain : Combined chain with 'Expiration Date', 'Strike', 'Type',
+            'Index Spot' and an IV column
+    forwards : float, array_like or Series : Forward per expiry; defaults to the index spot
+    valuation_date : Timestamp : Date the quotes were taken; defaults to today
+    iv_column : str : Column holding implied volatilities
+    include_no_volume : bool : Keep quotes with no volume / open interest
+    min_quotes : int : Expiries with fewer usable quotes (or already expired) are skipped
+
+    Returns:
+    list : (expiry, T, forward, k, w) tuples in expiry order
+    """
+    if isinstance(chain, NormalizedChain):
+        chain = chain.with_forwards(forwards)
+    else:
+        chain = NormalizedChain(chain, forwards, iv_column)
+    T = chain.time_to_expiry(valuation_date)
+    mask = chain.otm & (chain.iv > 0)
+    if not include_no_volume:
+        mask &= chain.liquid(min_volume=1, min_open_interest=1)
+    smiles = chain.smile(mask)
+
+    slices = []
+    for i, expiry in enumerate(chain.expiries):
+        rows = slice(smiles.offsets[i], smiles.offsets[i + 1])
+        forward = chain.forwards[i]
+        if T[i] <= 0 or rows.stop - rows.start < min_quotes:
+            continue
+        k = np.log(smiles.strikes[rows] / forward)
+        w = smiles.values[rows] ** 2 * T[i]
+        slices.append((expiry, T[i], forward, k, w))
+    return slices
+
+
+def _svi_residuals(params, k, w):
+    return svi_total_variance(params, k) - w
+
+
+def _svi_residuals_jac(params, k, w):
+    return svi_jacobian(params, k)
+
+
+def _fit_svi_slice(k, w, initial):
+    initial = np.clip(initial, SVI_LOWER + 1e-9, SVI_UPPER - 1e-9)
+    result = least_squares(
+        _svi_residuals, initial, jac=_svi_residuals_jac, bounds=(SVI_LOWER, SVI_UPPER),
+        args=(k, w), method="trf", x_scale="jac",
+    )
+    rmse = np.sqrt(np.mean(result.fun ** 2))
+    return result.x, rmse, result.success
+
+
+def _calibrate_chunk(slices):
+    """
+    Fit a run of neighbouring slices in expiry order, warm-starting each slice from
+    the one before it unless it already carries a start from the previous snapshot.
+    """
+    fitted = []
+    neighbour = None
+    for expiry, T, k, w, initial in slices:
+        if initial is None and neighbour is not None:
+            prev_T, prev_params = neighbour
+            # Total variance grows roughly linearly in T, so rescale the level terms
+            initial = prev_params.copy()
+            initial[:2] *= T / prev_T
+        if initial is None:
+            initial = SVI_COLD_START.copy()
+            initial[0] = 0.5 * np.min(w)
+        with profiler.stage("calibrate_expiry", expiry=expiry, rows=len(k)) as event:
+            params, rmse, success = _fit_svi_slice(k, w, initial)
+            event["rmse"] = rmse
+        fitted.append((expiry, params, rmse, success))
+        neighbour = (T, params)
+    return fitted
+
+
+def _essvi_psi_cap(phi, rho, after):
+    """
+    Largest psi = theta * phi an eSSVI slice may take, with its gradient in (phi, rho).
+
+    The butterfly bounds psi (1 + |rho|) <= 4 and psi phi (1 + |rho|) <= 4 are the
+    Gatheral-Jacquier sufficient conditions. Against the fitted slice after it,
+    (theta', rho', psi'), the slices do not cross when phi >= phi' and
+    |rho' psi' - rho psi| <= psi' - psi, which holds exactly when
+    psi <= psi' * min((1 - rho') / (1 - rho), (1 + rho') / (1 + rho)); theta <= theta' follows.
+
+    Returns:
+    tuple : (cap, d cap / d phi, d cap / d rho) of the binding bound
+    """
+    sign = np.sign(rho)
+    top = 1.0 + abs(rho)
+    scale = max(phi, 1.0)
+    butterfly = 4.0 / (top * scale)
+    caps = [(butterfly, -butterfly / phi if phi > 1.0 else 0.0, -butterfly * sign / top)]
+    if after is not None:
+        _, rho_after, psi_after = after
+        down = psi_after * (1.0 - rho_after) / (1.0 - rho)
+        up = psi_after * (1.0 + rho_after) / (1.0 + rho)
+        caps += [(down, 0.0, down / (1.0 - rho)), (up, 0.0, -up / (1.0 + rho))]
+    return min(caps, key=lambda cap: cap[0])
+
+
+def _essvi_slice_point(x, after):
+    # x = (phi, rho, c) with psi = c * cap and theta = psi / phi, so every c in (0, 1] is free of arbitrage
+    phi, rho, c = x
+    psi = c * _essvi_psi_cap(phi, rho, after)[0]
+    return psi / phi, rho, psi
+
+
+def _essvi_slice_variance(x, k, after):
+    phi, rho, c = x
+    cap, d_phi, d_rho = _essvi_psi_cap(phi, rho, after)
+    psi = c * cap
+    theta = psi / phi
+    # w = (theta + rho psi k + sqrt(psi^2 k^2 + 2 rho theta psi k + theta^2)) / 2
+    root = np.sqrt(psi * psi * k * k + 2.0 * rho * theta * psi * k + theta * theta)
+    w = 0.5 * (theta + rho * psi * k + root)
+    dw_dtheta = 0.5 * (1.0 + (rho * psi * k + theta) / root)
+    dw_dpsi = 0.5 * k * (rho + (psi * k + rho * theta) / root)
+    dw_drho = 0.5 * psi * k * (1.0 + theta / root)
+    # (theta, psi) move with x through psi = c * cap(phi, rho) and theta = psi / phi
+    dpsi = np.array([c * d_phi, c * d_rho, cap])
+    dtheta = dpsi / phi
+    dtheta[0] -= theta / phi
+    jac = dw_dtheta[:, None] * dtheta + dw_dpsi[:, None] * dpsi
+    jac[:, 1] += dw_drho
+    return w, jac
+
+
+def _essvi_slice_residuals(x, k, vol, T, after):
+    w, _ = _essvi_slice_variance(x, k, after)
+    return np.sqrt(w / T) - vol
+
+
+def _essvi_slice_jac(x, k, vol, T, after):
+    w, jac = _essvi_slice_variance(x, k, after)
+    return jac / (2.0 * np.sqrt(w * T))[:, None]
+
+
+def _fit_essvi_slices(slices, seeds):
+    """
+    Refit every slice of a global eSSVI fit with its own (theta, rho, psi), longest expiry first.
+
+    Each slice is bounded by the one after it, so calendar and butterfly conditions hold by
+    construction and a feasible point (psi -> 0) always exists. Every slice is started from
+    both its global fit and the slice after it, keeping the better solution.
+
+    Parameters:
+    slices : list : (expiry, T, forward, k, w) tuples in expiry order
+    seeds : ndarray : (n_slices, 3) global (theta, rho, psi) per slice
+
+    Returns:
+    tuple : (theta, rho, psi, vol_rmse, converged) arrays in expiry order
+    """
+    fitted = np.empty((len(slices), 3))
+    vol_rmse = np.empty(len(slices))
+    converged = np.empty(len(slices), dtype=bool)
+    after = None
+    for i in range(len(slices) - 1, -1, -1):
+        expiry, T, _, k, w = slices[i]
+        lower = np.array([1e-6 if after is None else after[2] / after[0], -0.999, 1e-6])
+        upper = np.array([np.inf, 0.999, 1.0])
+        best = None
+        with profiler.stage("calibrate_essvi_slice", expiry=expiry, rows=len(k)) as event:
+            for theta, rho, psi in [seeds[i]] + ([] if after is None else [after]):
+                phi, rho = np.clip([psi / theta, rho], lower[:2], upper[:2])
+                start = np.array([phi, rho, np.clip(psi / _essvi_psi_cap(phi, rho, after)[0], lower[2], 1.0)])
+                result = least_squares(_essvi_slice_residuals, start, jac=_essvi_slice_jac, bounds=(lower, upper),
+                                       args=(k, np.sqrt(w / T), T, after), method="trf", x_scale="jac")
+                if best is None or result.cost < best.cost:
+                    best = result
+            after = _essvi_slice_point(best.x, after)
+            fitted[i] = after
+            vol_rmse[i] = np.sqrt(np.mean(best.fun ** 2))
+            converged[i] = best.success
+            event["rmse"] = vol_rmse[i]
+    return fitted[:, 0], fitted[:, 1], fitted[:, 2], vol_rmse, converged
+
+
+class VolSurfaceCalculator:
+    """
+    Per-expiry SVI calibration run concurrently on a process pool.
+
+    Expiries are split into contiguous runs, one per worker, and each run is
+    fitted in order so every slice starts from its neighbour's solution. Fitted
+    parameters are kept on the instance and used as starting points the next time
+    the same expiry is calibrated. With a SliceCache, each slice's fit is memoized
+    against a hash of its (k, w) points, so a refresh only refits the expiries
+    whose quotes moved.
+    """
+
+    def __init__(self, max_workers=None, min_quotes=5, cache=None):
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.min_quotes = min_quotes
+        self.cache = cache
+        self.params = pd.DataFrame(columns=["T", "forward"] + SVI_PARAMS + ["rmse", "success"])
+
+    def calibrate(self, chain, forwards=None, valuation_date=None, iv_column="IV", include_no_volume=True,
+                  previous=None):
+        """
+        Calibrate a raw SVI slice to every expiry of a combined chain.
+
+        Parameters:
+        chain : DataFrame or NormalizedChain : Combined chain with 'Expiration Date', 'Strike', 'Type',
+                'Index Spot' and an IV column
+        forwards : float, array_like or Series : Forward per expiry (Series indexed by expiry, or aligned
+                   with the sorted expiries); defaults to the index spot
+        valuation_date : Timestamp : Date the quotes were taken; defaults to today
+        iv_column : str : Column holding implied volatilities
+        include_no_volume : bool : Keep quotes with no volume / open interest
+        previous : DataFrame : Parameters from an earlier snapshot to warm-start from; defaults to
+                   the last calibration made by this instance
+
+        Returns:
+        DataFrame : One row per expiry with T, forward, a, b, rho, m, sigma, rmse and success
+        """
+        with profiler.stage("calibrate") as event:
+            slices = self.slices(chain, forwards, valuation_date, iv_column, include_no_volume)
+            event["expiries"] = len(slices)
+            event["rows"] = sum(len(k) for _, _, _, k, _ in slices)
+            if not slices:
+                return self.params.iloc[0:0]
+
+            keys, fitted = self._cached_fits(slices)
+            pending = [entry for entry in slices if entry[0] not in fitted]
+            event["refit"] = len(pending)
+            if pending:
+                for expiry, params, rmse, success in self._fit(pending, previous):
+                    fitted[expiry] = (params, rmse, success)
+                    if self.cache is not None:
+                        self.cache.put("svi", keys[expiry], (params, rmse, success))
+
+            params = pd.DataFrame(
+                [[T, F, *fitted[expiry][0], *fitted[expiry][1:]] for expiry, T, F, _, _ in slices],
+                index=pd.DatetimeIndex([expiry for expiry, _, _, _, _ in slices], name="Expiration Date"),
+                columns=self.params.columns,
+            )
+            self.params = params
+            return params
+
+    def calibrate_ssvi(self, chain, forwards=None, valuation_date=None, iv_column="IV", include_no_volume=True,
+                       extended=False, max_vol_rmse=0.05):
+        """
+        Fit one SSVI (or eSSVI) surface to every quote of the chain in a single optimization.
+
+        The ATM total variance curve is parameterized by non-negative increments
+        theta_i = theta_(i-1) + d_i, so it is non-decreasing in T by construction.
+        Curvature is the power law phi(theta) = eta / (theta^gamma (1 + theta)^(1 - gamma))
+        with gamma in (0, 1/2] and eta = e * 2 / (1 + max|rho|), e in (0, 1], which
+        is the Gatheral-Jacquier sufficient condition for no butterfly arbitrage.
+        With extended=True (eSSVI) rho moves linearly in T from rho0 to rho1, and the
+        calendar condition |rho_(i+1) psi_(i+1) - rho_i psi_i| <= psi_(i+1) - psi_i
+        on psi = theta * phi is added as hinge residuals; for SSVI it always holds.
+        The hinge weight is raised and the fit repeated until the largest violation
+        is within SSVI_CALENDAR_TOL. That condition only fixes the wings, so the
+        global fit then seeds a refit of each slice with its own (theta, rho, psi),
+        from the longest expiry back, where each slice is bounded by the one after
+        it (phi = psi / theta non-increasing in T as well) so adjacent slices cannot
+        cross and the butterfly conditions hold by construction. Slices on either
+        side of a pair that still violates the calendar conditions are marked
+        success False.
+
+        Residuals are implied-volatility errors over all quotes, with the analytic
+        Jacobian. A slice is marked success False when its implied-volatility RMSE
+        exceeds max_vol_rmse. This is expected for the front expiries: the butterfly
+        bound keeps psi below about 2 * sqrt(theta), so the wings of a short-dated
+        slice are far flatter than the quoted ones. For plain SSVI the steep wings
+        also pull theta up, and with theta non-decreasing it stays flat over the
+        first expiries, well above their market ATM variance.
+
+        Parameters:
+        chain, forwards, valuation_date, iv_column, include_no_volume : As for calibrate()
+        extended : bool : Fit eSSVI (maturity-dependent rho) instead of SSVI
+        max_vol_rmse : float : Largest per-slice implied-volatility RMSE counted as a successful fit
+
+        Returns:
+        DataFrame : The equivalent raw SVI parameters per expiry in the calibrate() layout, so
+                    implied_vol() and VolSurface work unchanged; the global parameters (rho0,
+                    rho1, eta, gamma), theta, rho and psi per expiry and the largest calendar
+                    violation are in params.attrs["ssvi"]
+        """
+        with profiler.stage("calibrate_ssvi", extended=extended) as event:
+            slices = self.slices(chain, forwards, valuation_date, iv_column, include_no_volume)
+            event["expiries"] = len(slices)
+            event["rows"] = sum(len(k) for _, _, _, k, _ in slices)
+            if not slices:
+                return self.params.iloc[0:0]
+
+            sizes = np.array([len(k) for _, _, _, k, _ in slices])
+            block = np.repeat(np.arange(len(slices)), sizes)
+            T = np.array([T for _, T, _, _, _ in slices])
+            k = np.concatenate([k for _, _, _, k, _ in slices])
+            w = np.concatenate([w for _, _, _, _, w in slices])
+            fit = _SSVIFit(T, block, k, w, extended)
+            x = fit.initial()
+            for rounds in range(1, SSVI_CALENDAR_ROUNDS + 1):
+                result = least_squares(fit.residuals, x, jac=fit.jacobian, bounds=fit.bounds(),
+                                       method="trf", tr_solver="lsmr", x_scale="jac")
+                x = result.x
+                if not extended or np.max(fit.calendar_gap(x), initial=0.0) <= SSVI_CALENDAR_TOL:
+                    break
+                fit.calendar_weight *= 10.0
+            event["rounds"] = rounds
+
+            rho0, rho1, eta, gamma, theta = fit.unpack(result.x)
+            rho = fit.rho(rho0, rho1)
+            psi = theta * ssvi_phi(theta, eta, gamma)
+            if extended:
+                theta, rho, psi, vol_rmse, converged = _fit_essvi_slices(slices, np.stack([theta, rho, psi], axis=1))
+            else:
+                vol_error = fit.residuals(result.x)
+                vol_rmse = np.sqrt(np.bincount(block, weights=vol_error * vol_error) / sizes)
+                converged = np.full(len(slices), result.success)
+            svi = ssvi_to_svi(theta, rho, psi / theta)
+            error = svi_total_variance(svi[block], k) - w
+            rmse = np.sqrt(np.bincount(block, weights=error * error) / sizes)
+            success = converged & (vol_rmse <= max_vol_rmse)
+            # Adjacent slices cannot cross when phi = psi / theta does not rise and the psi condition holds
+            gap = np.maximum(np.abs(np.diff(rho * psi)) - np.diff(psi), psi[1:] * theta[:-1] / theta[1:] - psi[:-1])
+            arbitrage = gap > SSVI_CALENDAR_TOL
+            success[:-1] &= ~arbitrage
+            success[1:] &= ~arbitrage
+            violation = float(np.max(gap, initial=0.0))
+            event["violation"] = violation
+
+            params = pd.DataFrame(
+                [[T_i, F, *svi[i], rmse[i], bool(success[i])]
+                 for i, (_, T_i, F, _, _) in enumerate(slices)],
+                index=pd.DatetimeIndex([expiry for expiry, _, _, _, _ in slices], name="Expiration Date"),
+                columns=self.params.columns,
+            )
+            params.attrs["ssvi"] = {"rho0": rho0, "rho1": rho1, "eta": eta, "gamma": gamma,
+                                    "theta": theta.tolist(), "rho": rho.tolist(), "psi": psi.tolist(),
+                                    "calendar_violation": violation}
+            self.params = params
+            return params
+
+    def _cached_fits(self, slices):
+        if self.cache is None:
+            return {}, {}
+        keys = {expiry: slice_hash(k, w) for expiry, _, _, k, w in slices}
+        fitted = {}
+        for expiry, key in keys.items():
+            hit = self.cache.get("svi", key)
+            if hit is not None:
+                fitted[expiry] = hit
+        return keys, fitted
+
+    def _fit(self, slices, previous):
+        n_chunks = min(self.max_workers, len(slices))
+        chunks = [list(chunk) for chunk in np.array_split(np.arange(len(slices)), n_chunks)]
+        previous = self.params if previous is None else previous
+        jobs = [
+            [(expiry, T, k, w, self._warm_start(previous, expiry))
+             for expiry, T, _, k, w in (slices[i] for i in chunk)]
+            for chunk in chunks
+        ]
+        if len(jobs) == 1:
+            return _calibrate_chunk(jobs[0])
+        with ProcessPoolExecutor(max_workers=len(jobs)) as executor:
+            return [row for rows in executor.map(_calibrate_chunk, jobs) for row in rows]
+
+    def slices(self, chain, forwards=None, valuation_date=None, iv_column="IV", include_no_volume=True):
+        """
+        Extract OTM (log-moneyness, total variance) slices per expiry, averaging duplicate strikes.
+
+        Returns:
+        list : (expiry, T, forward, k, w) tuples in expiry order
+        """
+        return smile_slices(chain, forwards, valuation_date, iv_column, include_no_volume, self.min_quotes)
+
+    def implied_vol(self, k, params=None):
+        """
+        Evaluate fitted implied volatilities on a log-moneyness grid.
+
+        Parameters:
+        k : array_like : Log-moneyness grid, broadcast against every expiry
+        params : DataFrame : Calibrated parameters; defaults to the last calibration
+
+        Returns:
+        ndarray : (n_expiries, len(k)) implied volatilities
+        """
+        params = self.params if params is None else params
+        w = svi_total_variance(params[SVI_PARAMS].to_numpy(dtype=float)[:, None, :], np.asarray(k)[None, :])
+        return np.sqrt(np.maximum(w, 0.0) / params["T"].to_numpy(dtype=float)[:, None])
+
+    def _warm_start(self, previous, expiry):
+        if expiry in previous.index and previous.at[expiry, "success"]:
+            return previous.loc[expiry, SVI_PARAMS].to_numpy(dtype=float)
+        return None
+
+
+class _SSVIFit:
+    """
+    Residuals and analytic Jacobian of a global SSVI / eSSVI fit.
+
+    The full parameter vector is (rho0, rho1, e, gamma, d_1..d_n). For plain SSVI
+    rho1 is tied to rho0 through the projection matrix `tie`, so the solver sees
+    (rho, e, gamma, d_1..d_n).
+    """
+
+    def __init__(self, T, block, k, w, extended):
+        self.T, self.block, self.k, self.w, self.extended = T, block, k, w, extended
+        self.calendar_weight = SSVI_CALENDAR_WEIGHT
+        self.n = len(T)
+        self.T_row = T[block]
+        self.vol = np.sqrt(w / self.T_row)
+        # rho moves linearly in T between rho0 (first expiry) and rho1 (last expiry)
+        self.s = (T - T[0]) / (T[-1] - T[0]) if self.n > 1 else np.zeros(1)
+        # Column l of the theta Jacobian applies to every slice at or after l
+        self.after = np.arange(self.n)[None, :] <= block[:, None]
+        n_full = 4 + self.n
+        self.tie = np.eye(n_full) if extended else np.delete(np.eye(n_full), 1, axis=1)
+        if not extended:
+            self.tie[1, 0] = 1.0
+
+    def initial(self):
+        # Market ATM total variance per slice, made non-decreasing
+        theta = np.array([np.interp(0.0, self.k[self.block == i], self.w[self.block == i]) for i in range(self.n)])
+        theta = np.maximum.accumulate(np.maximum(theta, 1e-6))
+        full = np.concatenate([[-0.5, -0.5, 0.5, 0.4], np.diff(theta, prepend=0.0)])
+        return np.clip(self._reduce(full), *self.bounds())
+
+    def bounds(self):
+        lower = np.concatenate([[-0.999, -0.999, 1e-4, 0.01], [1e-8], np.zeros(self.n - 1)])
+        upper = np.concatenate([[0.999, 0.999, 1.0, 0.5], np.full(self.n, np.inf)])
+        return self._reduce(lower), self._reduce(upper)
+
+    def unpack(self, x):
+        full = self.tie @ x
+        rho0, rho1, e, gamma = full[:4]
+        eta = e * 2.0 / (1.0 + max(abs(rho0), abs(rho1)))
+        return rho0, rho1, eta, gamma, np.cumsum(full[4:])
+
+    def rho(self, rho0, rho1):
+        return rho0 + (rho1 - rho0) * self.s
+
+    def residuals(self, x):
+        rho0, rho1, eta, gamma, theta = self.unpack(x)
+        w = ssvi_total_variance(theta[self.block], self.k, self.rho(rho0, rho1)[self.block], eta, gamma)
+        quotes = np.sqrt(w / self.T_row) - self.vol
+        if not self.extended:
+            return quotes
+        return np.concatenate([quotes, self.calendar_weight * np.maximum(self.calendar_gap(x), 0.0)])
+
+    def jacobian(self, x):
+        full = self.tie @ x
+        rho0, rho1, e, gamma = full[:4]
+        _, _, eta, _, theta = self.unpack(x)
+        rho = self.rho(rho0, rho1)
+        dEta = self._eta_gradient(rho0, rho1, e)
+
+        t, r, k = theta[self.block], rho[self.block], self.k
+        phi = ssvi_phi(t, eta, gamma)
+        p = phi * k
+        R = np.sqrt((p + r) ** 2 + 1.0 - r * r)
+        w = 0.5 * t * (1.0 + r * p + R)
+        dw_dp = 0.5 * t * (r + (p + r) / R)
+        dw_drho = 0.5 * t * (p + p / R)
+        dw_dtheta = w / t + dw_dp * p * (-gamma / t + (gamma - 1.0) / (1.0 + t))
+        dw_deta = dw_dp * p / eta
+        dw_dgamma = dw_dp * p * np.log1p(1.0 / t)
+
+        jac = np.empty((len(k), 4 + self.n))
+        s = self.s[self.block]
+        jac[:, 0] = dw_drho * (1.0 - s) + dw_deta * dEta[0]
+        jac[:, 1] = dw_drho * s + dw_deta * dEta[1]
+        jac[:, 2] = dw_deta * dEta[2]
+        jac[:, 3] = dw_dgamma
+        jac[:, 4:] = dw_dtheta[:, None] * self.after
+        # Chain rule from total variance to the implied-volatility residual
+        jac *= (0.5 / np.sqrt(w * self.T_row))[:, None]
+        if self.extended:
+            jac = np.vstack([jac, self.calendar_weight * self._calendar_jacobian(x)])
+        return jac @ self.tie
+
+    def calendar_gap(self, x):
+        """
+        |rho_(i+1) psi_(i+1) - rho_i psi_i| - (psi_(i+1) - psi_i) per adjacent pair; positive is arbitrage.
+        """
+        rho0, rho1, eta, gamma, theta = self.unpack(x)
+        psi = theta * ssvi_phi(theta, eta, gamma)
+        rho_psi = self.rho(rho0, rho1) * psi
+        return np.abs(np.diff(rho_psi)) - np.diff(psi)
+
+    def _calendar_jacobian(self, x):
+        full = self.tie @ x
+        rho0, rho1, e, gamma = full[:4]
+        _, _, eta, _, theta = self.unpack(x)
+        rho = self.rho(rho0, rho1)
+        psi = theta * ssvi_phi(theta, eta, gamma)
+        dEta = self._eta_gradient(rho0, rho1, e)
+
+        # d psi_i / d(full parameters), one row per slice
+        dpsi = np.zeros((self.n, 4 + self.n))
+        dpsi[:, :3] = (psi / eta)[:, None] * dEta[None, :]
+        dpsi[:, 3] = psi * np.log1p(1.0 / theta)
+        dpsi[:, 4:] = (psi * (1.0 - gamma) / (theta * (1.0 + theta)))[:, None] * np.tri(self.n)
+        drho_psi = rho[:, None] * dpsi
+        drho_psi[:, 0] += (1.0 - self.s) * psi
+        drho_psi[:, 1] += self.s * psi
+
+        gap = np.abs(np.diff(rho * psi)) - np.diff(psi)
+        sign = np.sign(np.diff(rho * psi))[:, None]
+        jac = sign * np.diff(drho_psi, axis=0) - np.diff(dpsi, axis=0)
+        return np.where((gap > 0)[:, None], jac, 0.0)
+
+    @staticmethod
+    def _eta_gradient(rho0, rho1, e):
+        # eta = 2e / (1 + max|rho|): gradient with respect to (rho0, rho1, e)
+        top = max(abs(rho0), abs(rho1))
+        scale = 2.0 / (1.0 + top)
+        d_top = -e * scale / (1.0 + top)
+        grad = np.array([0.0, 0.0, scale])
+        grad[0 if abs(rho0) >= abs(rho1) else 1] = d_top * np.sign(rho0 if abs(rho0) >= abs(rho1) else rho1)
+        return grad
+
+    def _reduce(self, full):
+        # Full parameter vector -> solver vector (drops the tied rho1 for plain SSVI)
+        return full if self.extended else np.delete(full, 1)
@@ -1,43 +1,103 @@
-import yfinance as yf
+import threading
 import pandas as pd
-import os
+from concurrent.futures import ThreadPoolExecutor
+from ChainStore import ChainStore
+from SnapshotStore import SnapshotStore
+from RateLimiter import RateLimiter, with_retries
+from Profiler import profiler
+
+# yfinance column names mapped onto the combined CBOE layout
+COLUMN_MAP = {
+    'lastPrice': 'Last Sale',
+    'change': 'Net',
+    'bid': 'Bid',
+    'ask': 'Ask',
+    'volume': 'Volume',
+    'impliedVolatility': 'IV',
+    'openInterest': 'Open Interest',
+    'strike': 'Strike',
+}
 
 
 class YFinanceDownloader:
-    def __init__(self, ticker="SPY"):
+    def __init__(self, ticker="SPY", store_dir="./chain_store", history_dir="./snapshot_store", export_csv=False,
+                 max_workers=8, rate_limit=None, max_attempts=3, backoff=0.5, client=None):
         self.ticker = ticker
+        self.store = ChainStore(store_dir)
+        self.history = SnapshotStore(history_dir)
+        self.export_csv = export_csv
+        # Concurrency settings; client is anything exposing yfinance's Ticker API (e.g. a local stub).
+        # yfinance itself is only imported when no client is given
+        if client is None:
+            import yfinance as client
+        self.max_workers = max_workers
+        self.limiter = RateLimiter(rate_limit)
+        # Never set: yfinance has no conditional requests, so an unchanged chain is not detected up front
+        self.unchanged = False
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.client = client
+
+    def refresh(self):
+        """
+        Download and store a fresh combined chain (same interface as CBOEDownloader.refresh).
+
+        Returns:
+        bool : True if a snapshot was stored
+        """
+        return self.download_data()
 
     def download_data(self):
-        stock = yf.Ticker(self.ticker)
-        expirations = stock.options
-        all_data = pd.DataFrame()
+        expirations = self.client.Ticker(self.ticker).options
 
         if not expirations:
             raise ValueError("No options available for this stock")
 
-        # Iterate through expirations and concat to all_data
-        for expiry in expirations:
-            options_chain = stock.option_chain(expiry)
-            calls = options_chain.calls
-            puts = options_chain.puts
-
-            # Filter out options with no volume / open interest / bid / ask
-            calls = calls[(calls['volume'] > 0) & (calls['openInterest'] > 0) & (calls['bid'] > 0) & (calls['ask'] > 0)]
-            puts = puts[(puts['volume'] > 0) & (puts['openInterest'] > 0) & (puts['bid'] > 0) & (puts['ask'] > 0)]
-
-            options = pd.concat([calls, puts])
-            options['Expiration Date'] = pd.to_datetime(expiry)
-            all_data = pd.concat([all_data, options], ignore_index=True)
+        # Fetch every expiration (and the spot) concurrently, then concat once. yfinance's Ticker caches
+        # crumbs, cookies and expirations in mutable attributes, so each worker thread uses its own
+        tickers = threading.local()
+        with profiler.stage("download", symbol=self.ticker, expirations=len(expirations)) as event:
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                spot = executor.submit(lambda: self._fetch(self._stock(tickers).history, period="1d"))
+                frames = list(executor.map(lambda expiry: self._fetch_expiry(self._stock(tickers), expiry),
+                                           expirations))
+            all_data = pd.concat(frames, ignore_index=True)
+            event["rows"] = len(all_data)
 
         # Add index spot to all_data
-        all_data['Index Spot'] = stock.history(period="1d").iloc[-1]["Close"]
-        all_data = all_data.sort_values(by=['Expiration Date', 'strike'])
+        all_data['Index Spot'] = spot.result().iloc[-1]["Close"]
+        all_data = all_data.rename(columns=COLUMN_MAP).sort_values(by=['Expiration Date', 'Strike'])
 
         if len(all_data.index) != 0:
-            combined_csv_path = "spx_options_combined.csv"
-            if os.path.exists(combined_csv_path):
-                os.remove(combined_csv_path) # Remove existing file
-            all_data.to_csv(combined_csv_path, index=False)
-            print(f"Data saved to {combined_csv_path}")
-        else:
-            print("No valid data to save.")
\ No newline at end of file
+            self.store.write(all_data)
+            self.history.append(all_data)
+            print(f"Data saved to {self.store.root} ({len(self.store.unchanged)} unchanged expiries skipped) "
+                  f"and appended to {self.history.root}")
+            if self.export_csv:
+                self.store.export_csv("spx_options_combined.csv")
+            return True
+        print("No valid data to save.")
+        return False
+
+    def _stock(self, tickers):
+        # This thread's Ticker, created on its first use
+        if not hasattr(tickers, "stock"):
+            tickers.stock = self.client.Ticker(self.ticker)
+        return tickers.stock
+
+    def _fetch_expiry(self, stock, expiry):
+        with profiler.stage("download_expiry", symbol=self.ticker, expiration=expiry):
+            options_chain = self._fetch(stock.option_chain, expiry)
+        calls = options_chain.calls
+        puts = options_chain.puts
+
+        # Filter out options with no volume / open interest / bid / ask
+        calls = calls[(calls['volume'] > 0) & (calls['openInterest'] > 0) & (calls['bid'] > 0) & (calls['ask'] > 0)]
+        puts = puts[(puts['volume'] > 0) & (puts['openInterest'] > 0) & (puts['bid'] > 0) & (puts['ask'] > 0)]
+
+        options = pd.concat([calls.assign(Type='Call'), puts.assign(Type='Put')])
+        options['Expiration Date'] = pd.to_datetime(expiry)
+        return options
+
+    def _fetch(self, fn, *args, **kwargs):
+        return with_retries(fn, *args, attempts=self.max_attempts, backoff=self.backoff, limiter=self.limiter, **kwargs)
@@ -0,0 +1,210 @@
+import numpy as np
+
+import test
+from ArbitrageScanner import ArbitrageScanner
+from fixtures import VALUATION_DATE, load_chain
+from run import benchmark
+from ForwardCurve import ForwardCurve
+from GreeksCalculator import GreeksCalculator
+from NormalizedChain import NormalizedChain
+from ImpliedVolSolver import ImpliedVolSolver, time_to_expiry
+from RNDCalculator import RNDCalculator
+from SABRCalculator import SABRCalculator, sabr_jacobian
+from SliceCache import SliceCache
+from VolSurface import VolSurface
+from VolSurfaceCalculator import VolSurfaceCalculator
+
+R = 0.01
+
+
+def _bump_one_expiry(chain):
+    # A refresh in which a single expiry's quotes moved
+    bumped = chain.copy()
+    expiries = bumped["Expiration Date"].unique()
+    bumped.loc[bumped["Expiration Date"] == expiries[len(expiries) // 2], "IV"] *= 1.01
+    return bumped
+
+
+def _largest_expiry(chain):
+    expiry = chain["Expiration Date"].value_counts().idxmax()
+    return chain[chain["Expiration Date"] == expiry]
+
+
+@benchmark()
+def black_scholes_call(scale):
+    chain = load_chain(scale)
+    F = chain["Index Spot"].to_numpy()
+    K = chain["Strike"].to_numpy()
+    T = time_to_expiry(chain["Expiration Date"], VALUATION_DATE)
+    sigma = chain["IV"].to_numpy()
+    return lambda: test.black_scholes_call(F, K, T, R, sigma)
+
+
+@benchmark(scales=(1, 10))
+def remove_duplicates(scale):
+    chain = load_chain(scale)
+    strikes, vols = chain["Strike"].to_numpy(), chain["IV"].to_numpy()
+    return lambda: test.remove_duplicates(strikes, vols)
+
+
+@benchmark()
+def compute_rnd(scale):
+    quotes = _largest_expiry(load_chain(scale))
+    quotes = quotes[quotes["IV"] > 0]
+    F = float(quotes["Index Spot"].iloc[0])
+    T = float(time_to_expiry(quotes["Expiration Date"].iloc[:1], VALUATION_DATE)[0])
+    strikes, vols = quotes["Strike"].to_numpy(), quotes["IV"].to_numpy()
+    return lambda: test.compute_rnd(F, T, R, strikes, vols)
+
+
+@benchmark()
+def rnd_calculator(scale):
+    chain = load_chain(scale)
+    calculator = RNDCalculator(r=R)
+    return lambda: calculator.compute(chain, valuation_date=VALUATION_DATE)
+
+
+@benchmark(scales=(1, 10))
+def rnd_calculator_incremental(scale):
+    chain = load_chain(scale)
+    bumped = _bump_one_expiry(chain)
+    calculator = RNDCalculator(r=R, cache=SliceCache())
+
+    def prepare():
+        # Cache holds the unbumped densities; the timed call re-derives one expiry
+        calculator.cache.clear()
+        calculator.compute(chain, valuation_date=VALUATION_DATE)
+
+    return lambda: calculator.compute(bumped, valuation_date=VALUATION_DATE), prepare
+
+
+@benchmark()
+def rnd_from_params(scale):
+    # Closed-form densities from a fixed SVI fit; the scale multiplies the grid resolution, not the chain
+    params = VolSurfaceCalculator().calibrate(load_chain(1), valuation_date=VALUATION_DATE)
+    calculator = RNDCalculator(n_points=500 * scale)
+    return lambda: calculator.compute_from_params(params)
+
+
+@benchmark(scales=(1, 10))
+def rnd_from_sabr_params(scale):
+    params = SABRCalculator().calibrate(load_chain(1), valuation_date=VALUATION_DATE)
+    calculator = RNDCalculator(n_points=500 * scale)
+    return lambda: calculator.compute_from_params(params)
+
+
+@benchmark()
+def arbitrage_scan(scale):
+    chain = NormalizedChain(load_chain(scale))
+    scanner = ArbitrageScanner()
+    return lambda: scanner.scan(chain, valuation_date=VALUATION_DATE)
+
+
+@benchmark(scales=(1, 10))
+def arbitrage_repair(scale):
+    chain = NormalizedChain(load_chain(scale))
+    scanner = ArbitrageScanner(prices="iv")
+    return lambda: scanner.repair(chain, valuation_date=VALUATION_DATE)
+
+
+@benchmark()
+def forward_curve(scale):
+    chain = NormalizedChain(load_chain(scale))
+    curve = ForwardCurve()
+    return lambda: curve.fit(chain, valuation_date=VALUATION_DATE)
+
+
+@benchmark()
+def implied_vol_chain(scale):
+    chain = load_chain(scale)
+    solver = ImpliedVolSolver()
+    return lambda: solver.solve_chain(chain, r=R, valuation_date=VALUATION_DATE)
+
+
+@benchmark()
+def greeks_chain(scale):
+    chain = load_chain(scale)
+    calculator = GreeksCalculator(r=R)
+    return lambda: calculator.compute(chain, valuation_date=VALUATION_DATE)
+
+
+@benchmark()
+def dealer_gamma(scale):
+    greeks = GreeksCalculator(r=R).compute(load_chain(scale), valuation_date=VALUATION_DATE)
+    return lambda: GreeksCalculator.dealer_gamma(greeks)
+
+
+@benchmark(scales=(1, 10), repeat=3)
+def svi_calibration(scale):
+    chain = load_chain(scale)
+    # A fresh calculator per call, so every fit is a cold start
+    return lambda: VolSurfaceCalculator().calibrate(chain, valuation_date=VALUATION_DATE)
+
+
+@benchmark(scales=(1, 10), repeat=3)
+def svi_calibration_warm(scale):
+    chain = load_chain(scale)
+    calculator = VolSurfaceCalculator()
+    calculator.calibrate(chain, valuation_date=VALUATION_DATE)
+    return lambda: calculator.calibrate(chain, valuation_date=VALUATION_DATE)
+
+
+@benchmark(scales=(1, 10), repeat=3)
+def ssvi_calibration(scale):
+    chain = load_chain(scale)
+    return lambda: VolSurfaceCalculator().calibrate_ssvi(chain, valuation_date=VALUATION_DATE)
+
+
+@benchmark(scales=(1, 10), repeat=3)
+def svi_calibration_incremental(scale):
+    chain = load_chain(scale)
+    bumped = _bump_one_expiry(chain)
+
+    calculator = VolSurfaceCalculator(cache=SliceCache())
+
+    def prepare():
+        # Cache holds the unbumped fits; the timed call refits one expiry
+        calculator.cache.clear()
+        calculator.calibrate(chain, valuation_date=VALUATION_DATE)
+
+    return lambda: calculator.calibrate(bumped, valuation_date=VALUATION_DATE), prepare
+
+
+@benchmark(scales=(1, 10), repeat=3)
+def sabr_calibration(scale):
+    chain = load_chain(scale)
+    return lambda: SABRCalculator().calibrate(chain, valuation_date=VALUATION_DATE)
+
+
+@benchmark()
+def sabr_jacobian_chain(scale):
+    chain = load_chain(scale)
+    F = chain["Index Spot"].to_numpy()
+    K = chain["Strike"].to_numpy()
+    T = np.maximum(time_to_expiry(chain["Expiration Date"], VALUATION_DATE), 1e-3)
+    return lambda: sabr_jacobian(F, K, T, 0.2, 1.0, -0.6, 2.0)
+
+
+@benchmark()
+def surface_grid(scale):
+    # Grid points grow with scale; the calibration itself is not timed
+    calculator = VolSurfaceCalculator()
+    params = calculator.calibrate(load_chain(1), valuation_date=VALUATION_DATE)
+    k = np.linspace(-0.5, 0.3, 100 * scale)
+    return lambda: calculator.implied_vol(k, params)
+
+
+@benchmark()
+def surface_query(scale):
+    # 10k random (K, T) lookups per scale unit against a surface built once
+    surface = VolSurface.from_params(VolSurfaceCalculator().calibrate(load_chain(1), valuation_date=VALUATION_DATE))
+    rng = np.random.default_rng(0)
+    K = rng.uniform(4000.0, 7000.0, 10000 * scale)
+    T = rng.uniform(0.0, 2.0, 10000 * scale)
+    return lambda: surface.vol(K, T)
+
+
+@benchmark(scales=(1,))
+def surface_query_scalar(scale):
+    surface = VolSurface.from_params(VolSurfaceCalculator().calibrate(load_chain(1), valuation_date=VALUATION_DATE))
+    return lambda: surface.vol(6000.0, 0.25)
@@ -0,0 +1,26 @@
+import atexit
+import os
+import shutil
+import tempfile
+
+from fixtures import load_chain, write_cboe_csvs
+from run import benchmark
+from CBOEDownloader import CBOEDownloader
+
+
+@benchmark(scales=(1, 10), repeat=3)
+def combine_csv_files(scale):
+    root = tempfile.mkdtemp(prefix="bench_combine_")
+    atexit.register(shutil.rmtree, root, ignore_errors=True)
+    template = os.path.join(root, "template")
+    write_cboe_csvs(load_chain(scale), template)
+    downloader = CBOEDownloader(download_dir=os.path.join(root, "cboe_csvs"),
+                                store_dir=os.path.join(root, "chain_store"),
+                                history_dir=os.path.join(root, "snapshot_store"))
+
+    def prepare():
+        # combine_csv_files deletes its inputs, so restore them before every sample
+        for name in os.listdir(template):
+            shutil.copy(os.path.join(template, name), downloader.download_dir)
+
+    return downloader.combine_csv_files, prepare
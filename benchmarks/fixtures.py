@@ -0,0 +1,81 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CHAIN_CSV = os.path.join(REPO_ROOT, "spx_options_combined.csv")
+# Quote date of the checked-in chain (the 2025-01-29 close); the expiry of that day has T = 0 and drops out
+VALUATION_DATE = pd.Timestamp("2025-01-29")
+QUOTE_COLUMNS = ['Last Sale', 'Net', 'Bid', 'Ask', 'Volume', 'IV', 'Delta', 'Gamma', 'Open Interest']
+
+_chains = {}
+
+
+def load_chain(scale=1):
+    """
+    Checked-in SPX chain, optionally scaled up to a synthetic chain with about scale times the rows.
+
+    Parameters:
+    scale : int : Row multiplier. Duplicate listings are dropped, then each extra copy of an expiry
+                  is shifted by a fraction of the smallest strike spacing and its quotes
+                  re-interpolated along the smile, so strikes stay unique and smiles stay smooth
+
+    Returns:
+    DataFrame : Combined chain in the CBOE column layout (cached per scale; do not mutate)
+    """
+    if scale not in _chains:
+        chain = pd.read_csv(CHAIN_CSV, parse_dates=["Expiration Date"])
+        _chains[scale] = chain if scale == 1 else _scale_chain(chain, scale)
+    return _chains[scale]
+
+
+def _scale_chain(chain, scale):
+    chain = chain.drop_duplicates(["Expiration Date", "Type", "Strike"])
+    step = np.diff(np.unique(chain["Strike"])).min() / scale
+    offsets = np.arange(scale) * step
+    frames = []
+    for _, quotes in chain.groupby(["Expiration Date", "Type"], sort=True):
+        quotes = quotes.sort_values("Strike")
+        strikes = quotes["Strike"].to_numpy()
+        scaled = quotes.iloc[np.tile(np.arange(len(quotes)), scale)].reset_index(drop=True)
+        scaled["Strike"] = (strikes[None, :] + offsets[:, None]).ravel()
+        for column in ["IV", "Bid", "Ask", "Delta", "Gamma"]:
+            scaled[column] = np.interp(scaled["Strike"], strikes, quotes[column].to_numpy())
+        frames.append(scaled)
+    scaled = pd.concat(frames, ignore_index=True)
+    return scaled.sort_values(["Expiration Date", "Strike"], kind="stable", ignore_index=True)
+
+
+def write_cboe_csvs(chain, out_dir):
+    """
+    Write a combined chain out as per-expiry CBOE quote-table exports (calls and puts side by side).
+
+    Parameters:
+    chain : DataFrame : Combined chain in the CBOE column layout
+    out_dir : str : Directory to write the CSVs into
+
+    Returns:
+    list : Paths written
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    spot = float(chain["Index Spot"].iloc[0])
+    paths = []
+    for expiry, quotes in chain.groupby("Expiration Date", sort=True):
+        calls = quotes[quotes["Type"] == "Call"].sort_values("Strike").reset_index(drop=True)
+        puts = quotes[quotes["Type"] == "Put"].sort_values("Strike").reset_index(drop=True)
+        n = min(len(calls), len(puts))
+        label = pd.Timestamp(expiry).strftime("%a %b %d %Y")
+        wide = pd.DataFrame({"Expiration Date": label, "Calls": "SPXW" + calls["Strike"].iloc[:n].astype(str)})
+        for column in QUOTE_COLUMNS:
+            wide[column] = calls[column].iloc[:n]
+        wide["Strike"] = calls["Strike"].iloc[:n]
+        wide["Puts"] = "SPXW" + puts["Strike"].iloc[:n].astype(str)
+        for column in QUOTE_COLUMNS:
+            wide[f"{column}.1"] = puts[column].iloc[:n]
+        path = os.path.join(out_dir, f"{label.replace(' ', '_')}.csv")
+        with open(path, "w") as f:
+            f.write(f"SPX\nDate: {VALUATION_DATE:%B %d %Y},Bid: {spot:.2f},Ask: {spot:.2f}\n\n")
+            wide.to_csv(f, index=False, header=[c[:-2] if c.endswith(".1") else c for c in wide.columns])
+        paths.append(path)
+    return paths
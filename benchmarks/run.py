@@ -0,0 +1,177 @@
+"""
+Benchmark runner for the analytics and download paths.
+
+Benchmarks are registered with @benchmark in the bench_*.py modules next to this
+file. Each one is a setup function taking a scale (1 = the checked-in chain,
+10 / 100 = synthetic chains with that many times the rows) and returning the
+callable to time, or a (callable, prepare) pair where prepare runs untimed
+before every repeat.
+
+Results are saved as JSON under benchmarks/results/, keyed by git commit, so two
+commits can be compared:
+
+    python benchmarks/run.py                          # run everything and save
+    python benchmarks/run.py -k rnd --scales 1 10     # subset
+    python benchmarks/run.py --compare benchmarks/results/<commit>.json
+"""
+import argparse
+import contextlib
+import glob
+import importlib
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from collections import namedtuple
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+RESULTS_DIR = os.path.join(BENCHMARK_DIR, "results")
+sys.path[:0] = [os.path.dirname(BENCHMARK_DIR), BENCHMARK_DIR]
+
+Benchmark = namedtuple("Benchmark", ["name", "setup", "scales", "repeat"])
+BENCHMARKS = []
+# A single call shorter than this is looped so timer resolution does not dominate
+MIN_SAMPLE_SECONDS = 0.05
+
+
+def benchmark(scales=(1, 10, 100), repeat=5):
+    """
+    Register a benchmark setup function.
+
+    Parameters:
+    scales : tuple : Chain scales to run at
+    repeat : int : Timed samples per scale
+    """
+    def register(setup):
+        BENCHMARKS.append(Benchmark(setup.__name__, setup, tuple(scales), repeat))
+        return setup
+    return register
+
+
+def time_benchmark(bench, scale):
+    """
+    Time one benchmark at one scale.
+
+    Returns:
+    dict : min / median / max seconds per call, plus the repeat and loop counts used
+    """
+    # Status prints from the code under test are discarded rather than timed against the terminal
+    with contextlib.redirect_stdout(io.StringIO()):
+        return _time(bench, scale)
+
+
+def _time(bench, scale):
+    target = bench.setup(scale)
+    fn, prepare = target if isinstance(target, tuple) else (target, None)
+
+    if prepare is not None:
+        prepare()
+    start = time.perf_counter()
+    fn()
+    first = time.perf_counter() - start
+    # Benchmarks with per-repeat preparation must run exactly once per sample
+    number = 1 if prepare is not None else max(1, int(MIN_SAMPLE_SECONDS / max(first, 1e-9)))
+
+    samples = []
+    for _ in range(bench.repeat):
+        if prepare is not None:
+            prepare()
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        samples.append((time.perf_counter() - start) / number)
+    return {
+        "min": min(samples),
+        "median": statistics.median(samples),
+        "max": max(samples),
+        "repeat": bench.repeat,
+        "number": number,
+    }
+
+
+def git_commit():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                cwd=BENCHMARK_DIR, check=True).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], capture_output=True,
+                               text=True, cwd=BENCHMARK_DIR, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+    return f"{commit}-dirty" if dirty else commit
+
+
+def compare(results, baseline, threshold):
+    """
+    Print per-benchmark ratios against a baseline run.
+
+    Returns:
+    list : Keys whose minimum time grew by more than threshold (as a fraction)
+    """
+    regressions = []
+    print(f"\n{'benchmark':<40}{'baseline':>12}{'current':>12}{'ratio':>8}")
+    for key, result in results.items():
+        if key not in baseline:
+            continue
+        ratio = result["min"] / baseline[key]["min"]
+        flag = ""
+        if ratio > 1 + threshold:
+            regressions.append(key)
+            flag = "  REGRESSION"
+        print(f"{key:<40}{baseline[key]['min']:>12.6f}{result['min']:>12.6f}{ratio:>8.2f}{flag}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the benchmark suite.")
+    parser.add_argument("-k", dest="pattern", help="Only run benchmarks whose name contains this")
+    parser.add_argument("--scales", type=int, nargs="+", help="Only run these chain scales")
+    parser.add_argument("--output", help="Results file (default: benchmarks/results/<commit>.json)")
+    parser.add_argument("--no-save", action="store_true", help="Do not write a results file")
+    parser.add_argument("--compare", help="Baseline results file to compare against")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="Slowdown fraction reported as a regression (default 0.2)")
+    args = parser.parse_args(argv)
+
+    for path in sorted(glob.glob(os.path.join(BENCHMARK_DIR, "bench_*.py"))):
+        importlib.import_module(os.path.splitext(os.path.basename(path))[0])
+
+    # Run as a script this module is __main__; the bench modules registered with the importable `run`
+    results = {}
+    for bench in importlib.import_module("run").BENCHMARKS:
+        if args.pattern and args.pattern not in bench.name:
+            continue
+        for scale in bench.scales:
+            if args.scales and scale not in args.scales:
+                continue
+            key = f"{bench.name}[x{scale}]"
+            results[key] = time_benchmark(bench, scale)
+            print(f"{key:<40}{results[key]['min']:>12.6f} s  (median {results[key]['median']:.6f} s)")
+
+    commit = git_commit()
+    if not args.no_save:
+        output = args.output or os.path.join(RESULTS_DIR, f"{commit}.json")
+        os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+        with open(output, "w") as f:
+            json.dump({
+                "commit": commit,
+                "date": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "python": platform.python_version(),
+                "machine": platform.platform(),
+                "results": results,
+            }, f, indent=2)
+        print(f"Results saved to {output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(results, json.load(f)["results"], args.threshold)
+        if regressions:
+            print(f"{len(regressions)} regressions over {args.threshold:.0%}: {', '.join(regressions)}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,23 +1,294 @@
-from CBOEDownloader import CBOEDownloader
-from RNDCalculator import RNDCalculator
-from VolSurfaceCalculator import VolSurfaceCalculator
-from YFinanceDownloader import YFinanceDownloader
-import logging
-
-update_data = input("Update data (y/n): ")
-if update_data == "y":
-    data_source = input("Enter data source (cboe/yfinance): ")
-    if data_source == "cboe":
-        cboe_downloader = CBOEDownloader()
-        cboe_downloader.download_data()
-        cboe_downloader.combine_csv_files()
-
-    elif data_source == "yfinance":
-        yf_downloader = YFinanceDownloader()
-        yf_downloader.download_data()
+import argparse
+import os
+import sys
 
+# Every subcommand imports its own dependencies, so e.g. `rnd` never loads selenium, yfinance or plotly
+
+
+def download(args):
+    from ChainCache import ChainCache
+    if args.source == "cboe":
+        from CBOEDownloader import CBOEDownloader
+        downloader = CBOEDownloader(store_dir=args.store_dir, history_dir=args.history_dir, mode=args.mode,
+                                    symbol=args.symbol or "SPX", export_csv=args.export_csv)
+    else:
+        from YFinanceDownloader import YFinanceDownloader
+        downloader = YFinanceDownloader(ticker=args.symbol or "SPY", store_dir=args.store_dir,
+                                        history_dir=args.history_dir, export_csv=args.export_csv)
+    ChainCache(downloader, ttl=args.ttl).refresh(force=args.force)
+
+
+def combine(args):
+    from CBOEDownloader import CBOEDownloader
+    CBOEDownloader(download_dir=args.download_dir, store_dir=args.store_dir, history_dir=args.history_dir,
+                   export_csv=args.export_csv).combine_csv_files()
+
+
+def rnd(args):
+    write_frame(rnd_frame(rnd_result(args)), args.output)
+
+
+def surface(args):
+    _, params = fit_surface(args)
+    write_frame(params.reset_index(), args.output)
+    if args.surface_file:
+        from VolSurface import VolSurface
+        VolSurface.from_params(params).save(args.surface_file)
+
+
+def greeks(args):
+    import numpy as np
+    from GreeksCalculator import GreeksCalculator
+    chain, r = load_market(args)
+    calculator = GreeksCalculator(r=r, dtype=np.float32 if args.float32 else np.float64)
+    result = calculator.compute(chain, valuation_date=args.valuation_date)
+    if args.dealer_gamma:
+        write_frame(calculator.dealer_gamma(result).reset_index(), args.output)
+    else:
+        write_frame(result, args.output)
+
+
+def scan(args):
+    from ArbitrageScanner import ArbitrageScanner
+    chain, r = load_market(args)
+    scanner = ArbitrageScanner(r=r, prices=args.prices)
+    flags = scanner.scan(chain, valuation_date=args.valuation_date)
+    if args.output:
+        write_frame(flags.reset_index(names="Row"), args.output)
+    scanner.report(flags)
+
+
+def render(args):
+    from Profiler import profiler
+    with profiler.stage("render", what=args.what):
+        if args.what == "rnd":
+            render_rnd(args)
+        else:
+            render_surface(args)
+
+
+def render_rnd(args):
+    import matplotlib
+    if args.output:
+        matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    result = rnd_result(args)
+    plt.figure(figsize=(10, 6))
+    for expiry, strikes, density in zip(result.expiries, result.strikes, result.density):
+        plt.plot(strikes, density, label=f"{expiry:%Y-%m-%d}")
+    plt.title("Risk-Neutral Density")
+    plt.xlabel("Strike Price")
+    plt.ylabel("Density")
+    plt.legend()
+    plt.grid(True)
+    if args.output:
+        plt.savefig(args.output)
+        print(f"Plot saved to {args.output}")
+    else:
+        plt.show()
+
+
+def render_surface(args):
+    import numpy as np
+    import plotly.graph_objects as go
+
+    calculator, params = fit_surface(args)
+    k = np.linspace(args.min_k, args.max_k, args.points)
+    fig = go.Figure(go.Surface(
+        z=calculator.implied_vol(k, params),
+        x=np.exp(k),
+        y=params["T"].to_numpy(),
+        colorscale='Viridis',
+        colorbar=dict(title='Implied Volatility'),
+        name='Volatility Surface',
+    ))
+    fig.update_layout(
+        title=f'{args.model.upper()} Volatility Surface',
+        scene=dict(xaxis_title='Moneyness', yaxis_title='Time to Expiry', zaxis_title='Implied Volatility'),
+    )
+    output = args.output or "volatility_surface.html"
+    fig.write_html(output)
+    print(f"Surface saved to {output}")
+
+
+def rnd_result(args):
+    from RNDCalculator import RNDCalculator
+    if args.analytic:
+        _, params = fit_surface(args)
+        return RNDCalculator(n_points=args.points).compute_from_params(params, adaptive=not args.uniform_grid,
+                                                                       tail=args.tail)
+    chain, r = load_market(args)
+    return RNDCalculator(r=r, n_points=args.points).compute(chain, valuation_date=args.valuation_date)
+
+
+def fit_surface(args):
+    chain, _ = load_market(args)
+    if args.model == "sabr":
+        from SABRCalculator import SABRCalculator
+        calculator = SABRCalculator(beta=args.beta)
+        return calculator, calculator.calibrate(chain, valuation_date=args.valuation_date)
+    from VolSurfaceCalculator import VolSurfaceCalculator
+    calculator = VolSurfaceCalculator(max_workers=args.workers)
+    if args.model in ("ssvi", "essvi"):
+        return calculator, calculator.calibrate_ssvi(chain, valuation_date=args.valuation_date,
+                                                     extended=args.model == "essvi")
+    return calculator, calculator.calibrate(chain, valuation_date=args.valuation_date)
+
+
+def load_chain(args):
+    from ChainStore import ChainStore
+    store = ChainStore(args.store_dir)
+    if not store.expiries():
+        store.import_csv(args.csv)
+    chain = store.read(expiries=args.expiry)
+    if chain.empty:
+        sys.exit("No data available for the chosen expiries.")
+    return chain
+
+
+def load_market(args):
+    # The chain with the chosen forwards (repaired if asked), and --r or the per-expiry parity rates
+    chain = load_chain(args)
+    r = getattr(args, "r", None)
+    if args.forwards == "parity" or args.repair:
+        from NormalizedChain import NormalizedChain
+        chain = NormalizedChain(chain)
+    if args.forwards == "parity":
+        curve = forward_curve(args, chain)
+        chain, r = chain.with_forwards(curve["forward"]), curve["rate"]
+    if args.repair:
+        from ArbitrageScanner import ArbitrageScanner
+        scanner = ArbitrageScanner(r=0.0 if r is None else r, prices=args.repair)
+        chain = scanner.repair(chain, valuation_date=args.valuation_date)
+    return chain, r
+
+
+def forward_curve(args, chain):
+    # Curves are kept next to the stored chain, keyed by its paired quotes, so every run on an unchanged
+    # snapshot reuses one solve
+    from ForwardCurve import ForwardCurve
+    from SliceCache import SliceCache
+    cache = SliceCache(maxsize=64, path=os.path.join(args.store_dir, "curves"))
+    return ForwardCurve(cache=cache).fit(chain, valuation_date=args.valuation_date)
+
+
+def rnd_frame(result):
+    import numpy as np
+    import pandas as pd
+    n_points = result.strikes.shape[1]
+    return pd.DataFrame({
+        "Expiration Date": np.repeat(result.expiries, n_points),
+        "T": np.repeat(result.T, n_points),
+        "Forward": np.repeat(result.forwards, n_points),
+        "Strike": result.strikes.ravel(),
+        "Density": result.density.ravel(),
+        "CDF": result.cdf.ravel(),
+    }).dropna(subset=["Strike"])
+
+
+def write_frame(df, output):
+    if output:
+        df.to_csv(output, index=False)
+        print(f"Data saved to {output}")
     else:
-        logging.error("Invalid data source. Attempting to use yfinance as default.")
-        yf_downloader = YFinanceDownloader()
-        yf_downloader.download_data()
+        df.to_csv(sys.stdout, index=False)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Option chain downloads and risk-neutral analytics.")
+    parser.add_argument("--store-dir", default="./chain_store", help="Chain store directory")
+    parser.add_argument("--history-dir", default="./snapshot_store", help="Snapshot history directory")
+    parser.add_argument("--profile-log", help="Write per-stage timing events as JSON lines here ('-' for stderr)")
+    parser.add_argument("--profile", nargs="+", default=[], metavar="STAGE",
+                        help="Run these stages under cProfile ('*' for all); needs --profile-log")
+    parser.add_argument("--profile-dir", default="./profiles", help="Where cProfile .prof files are written")
+    parser.add_argument("--trace-memory", action="store_true", help="Per-stage peak memory via tracemalloc")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    analytics = argparse.ArgumentParser(add_help=False)
+    analytics.add_argument("--expiry", nargs="+", help="Expiration dates to use (default: all stored)")
+    analytics.add_argument("--valuation-date", help="Date the quotes were taken (default: today)")
+    analytics.add_argument("--csv", default="spx_options_combined.csv",
+                           help="Combined CSV imported when the store is empty")
+    analytics.add_argument("--output", "-o", help="Output file (default: stdout, or a plot window for render)")
+    analytics.add_argument("--forwards", choices=["spot", "parity"], default="spot",
+                           help="Index spot as every forward, or forwards and rates solved from put-call parity")
+    analytics.add_argument("--repair", choices=["quotes", "mid", "iv"],
+                           help="Drop static-arbitrage violations (checked on these prices) before the analytics")
+
+    models = argparse.ArgumentParser(add_help=False)
+    models.add_argument("--model", choices=["svi", "sabr", "ssvi", "essvi"], default="svi",
+                        help="Per-expiry SVI or SABR, or a global (e)SSVI surface")
+    models.add_argument("--workers", type=int, help="SVI calibration processes (default: CPU count)")
+    models.add_argument("--beta", type=float, default=1.0, help="Shared SABR beta")
+
+    densities = argparse.ArgumentParser(add_help=False)
+    densities.add_argument("--analytic", action="store_true",
+                           help="Densities in closed form from the --model fit instead of a spline through the IVs")
+    densities.add_argument("--uniform-grid", action="store_true",
+                           help="With --analytic, space points evenly in strike rather than in probability")
+    densities.add_argument("--tail", type=float, default=1e-4,
+                           help="With --analytic, probability left outside the grid in each tail")
+
+    sub = commands.add_parser("download", help="Refresh the stored chain unless it is still fresh")
+    sub.add_argument("--source", choices=["cboe", "yfinance"], default="cboe")
+    sub.add_argument("--symbol", help="Underlying (default: SPX for cboe, SPY for yfinance)")
+    sub.add_argument("--mode", choices=["http", "selenium"], default="http", help="CBOE fetch mode")
+    sub.add_argument("--ttl", type=float, default=900, help="Seconds a stored snapshot stays fresh")
+    sub.add_argument("--force", action="store_true", help="Download even if the stored snapshot is fresh")
+    sub.add_argument("--export-csv", action="store_true", help="Also write spx_options_combined.csv")
+    sub.set_defaults(func=download)
+
+    sub = commands.add_parser("combine", help="Combine downloaded CBOE CSVs into the store")
+    sub.add_argument("--download-dir", default="./cboe_csvs")
+    sub.add_argument("--export-csv", action="store_true", help="Also write spx_options_combined.csv")
+    sub.set_defaults(func=combine)
+
+    sub = commands.add_parser("rnd", parents=[analytics, models, densities], help="Risk-neutral densities as CSV")
+    sub.add_argument("--r", type=float, default=0.01,
+                     help="Risk-free rate (per-expiry parity rates with --forwards parity)")
+    sub.add_argument("--points", type=int, default=500, help="Strike grid points per expiry")
+    sub.set_defaults(func=rnd)
+
+    sub = commands.add_parser("surface", parents=[analytics, models], help="Smile parameters per expiry as CSV")
+    sub.add_argument("--surface-file", help="Also save the tabulated surface (.npz) for VolSurface.load")
+    sub.set_defaults(func=surface)
+
+    sub = commands.add_parser("greeks", parents=[analytics], help="Greeks for every quote as CSV")
+    sub.add_argument("--r", type=float, default=0.01,
+                     help="Risk-free rate (per-expiry parity rates with --forwards parity)")
+    sub.add_argument("--float32", action="store_true", help="Compute in single precision")
+    sub.add_argument("--dealer-gamma", action="store_true", help="Output dealer gamma exposure by strike instead")
+    sub.set_defaults(func=greeks)
+
+    sub = commands.add_parser("scan", parents=[analytics], help="Static-arbitrage check of the stored chain")
+    sub.add_argument("--r", type=float, default=0.0,
+                     help="Risk-free rate for the vertical-spread bound and IV repricing "
+                          "(per-expiry parity rates with --forwards parity)")
+    sub.add_argument("--prices", choices=["quotes", "mid", "iv"], default="quotes",
+                     help="Check tradable bid/ask, mid prices, or Black prices of the IVs")
+    sub.set_defaults(func=scan)
+
+    sub = commands.add_parser("render", parents=[analytics, models, densities],
+                              help="Plot densities or the volatility surface")
+    sub.add_argument("what", choices=["rnd", "surface"])
+    sub.add_argument("--r", type=float, default=0.01,
+                     help="Risk-free rate (per-expiry parity rates with --forwards parity)")
+    sub.add_argument("--points", type=int, default=500, help="Grid points per expiry")
+    sub.add_argument("--min-k", type=float, default=-0.5, help="Lowest log-moneyness on the surface grid")
+    sub.add_argument("--max-k", type=float, default=0.3, help="Highest log-moneyness on the surface grid")
+    sub.set_defaults(func=render)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.profile_log:
+        from Profiler import profiler
+        profiler.configure(args.profile_log, args.profile, args.profile_dir, args.trace_memory)
+    args.func(args)
+
 
+if __name__ == "__main__":
+    main()
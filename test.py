@@ -1,9 +1,14 @@
+import os
+import sys
 import numpy as np
 import pandas as pd
-from scipy.optimize import minimize
 from scipy.interpolate import interp1d
-import matplotlib.pyplot as plt
-from scipy.stats import norm
+from BlackScholesPricer import BlackScholesPricer
+from ChainStore import ChainStore
+from ForwardCurve import ForwardCurve
+from SliceCache import SliceCache
+
+pricer = BlackScholesPricer()
 
 # Black-Scholes Call Price Function
 def black_scholes_call(F, K, T, r, sigma):
@@ -20,9 +25,7 @@ def black_scholes_call(F, K, T, r, sigma):
     Returns:
     float : Call option price
     """
-    d1 = (np.log(F / K) + (0.5 * sigma**2) * T) / (sigma * np.sqrt(T))
-    d2 = d1 - sigma * np.sqrt(T)
-    return np.exp(-r * T) * (F * norm.cdf(d1) - K * norm.cdf(d2))
+    return pricer.price(F, K, T, r, sigma, "call")
 
 # Risk-Neutral Density Function
 def compute_rnd(F, T, r, strikes, implied_vols):
@@ -56,7 +59,7 @@ def compute_rnd(F, T, r, strikes, implied_vols):
     fine_vols = iv_interp(fine_strikes)
 
     # Compute option prices using Black-Scholes
-    call_prices = [black_scholes_call(F, K, T, r, sigma) for K, sigma in zip(fine_strikes, fine_vols)]
+    call_prices = pricer.price(F, fine_strikes, T, r, fine_vols, "call")
 
     # First derivative (risk-neutral CDF)
     dC_dK = np.gradient(call_prices, fine_strikes)
@@ -75,46 +78,43 @@ def remove_duplicates(strikes, implied_vols):
     implied_vols : array : Implied volatilities
 
     Returns:
-    tuple : (unique_strikes, unique_implied_vols)
+    tuple : (unique_strikes, unique_implied_vols), sorted by strike
     """
-    unique_strikes = {}
-    for strike, iv in zip(strikes, implied_vols):
-        if strike in unique_strikes:
-            unique_strikes[strike].append(iv)
-        else:
-            unique_strikes[strike] = [iv]
-
-    averaged_strikes = []
-    averaged_vols = []
-    for strike, ivs in unique_strikes.items():
-        averaged_strikes.append(strike)
-        averaged_vols.append(np.mean(ivs))
+    unique_strikes, inverse, counts = np.unique(strikes, return_inverse=True, return_counts=True)
+    averaged_vols = np.bincount(inverse, weights=implied_vols, minlength=len(unique_strikes)) / counts
 
-    return np.array(averaged_strikes), np.array(averaged_vols)
+    return unique_strikes, averaged_vols
 
 
 # Main Workflow
-def main():
+def main(expiry_choice=None):
+    # matplotlib is only needed for the plot, so importing this module's functions stays cheap
+    import matplotlib.pyplot as plt
+
     # Load the options data
-    options_data = pd.read_csv("spx_options_combined.csv")
-    idx_spot = float(options_data['Index Spot'].iloc[0])  # Underlying index spot price
-    r = 0.01  # Risk-free rate (adjust this as needed)
+    store = ChainStore()
+    if not store.expiries():
+        store.import_csv("spx_options_combined.csv")
 
-    # Choose expiry
-    expiry_choice = input(f"Enter the desired expiry (e.g., {options_data['Expiration Date'].iloc[0]}): ")
-    expiry_data = options_data[options_data['Expiration Date'] == expiry_choice]
+    # Choose expiry (first stored expiry unless given) and load only that partition
+    expiry_choice = expiry_choice or str(store.expiries()[0])
+    expiry_data = store.read(expiries=[expiry_choice])
 
     if expiry_data.empty:
         print("No data available for the chosen expiry.")
         return
+    # Forward and risk-free rate implied by put-call parity over the whole snapshot, rather than the index spot
+    # and a fixed rate; the curve is kept with the store, so reruns on the same snapshot reuse it
+    cache = SliceCache(maxsize=64, path=os.path.join(store.root, "curves"))
+    curve = ForwardCurve(cache=cache).fit(store.read()).loc[pd.Timestamp(expiry_choice)]
+    F, T, r = curve["forward"], curve["T"], curve["rate"]
 
     # Extract strikes and implied volatilities
     strikes = expiry_data['Strike'].to_numpy()
     implied_vols = expiry_data['IV'].to_numpy()
-    T = (pd.to_datetime(expiry_choice) - pd.Timestamp.today()).days / 365
 
     # Compute Risk-Neutral Density
-    fine_strikes, rnd = compute_rnd(idx_spot, T, r, strikes, implied_vols)
+    fine_strikes, rnd = compute_rnd(F, T, r, strikes, implied_vols)
 
     # Plot the RND
     plt.figure(figsize=(10, 6))
@@ -127,4 +127,4 @@ def main():
     plt.show()
 
 if __name__ == "__main__":
-    main()
+    main(sys.argv[1] if len(sys.argv) > 1 else None)
@@ -0,0 +1,7 @@
+import os
+import sys
+
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.dirname(TESTS_DIR)
+# Modules live at the repo root; the benchmark fixtures (checked-in chain, CSV writer) are shared
+sys.path[:0] = [REPO_ROOT, os.path.join(REPO_ROOT, "benchmarks")]
@@ -0,0 +1,45 @@
+import os
+
+import pytest
+import requests
+
+from CBOEDownloader import HTTP_CACHE_FILE, CBOEDownloader
+from CBOEReplayServer import CBOEReplayServer, write_fixture
+from fixtures import load_chain
+
+
+@pytest.fixture
+def server(tmp_path):
+    write_fixture(load_chain(), str(tmp_path / "fixtures"))
+    with CBOEReplayServer(str(tmp_path / "fixtures")) as server:
+        yield server
+
+
+def _downloader(tmp_path, server):
+    return CBOEDownloader(download_dir=str(tmp_path / "cboe_csvs"), store_dir=str(tmp_path / "chain_store"),
+                          history_dir=str(tmp_path / "snapshot_store"), base_url=server.url,
+                          session=requests.Session())
+
+
+def test_unchanged_payload_is_skipped(tmp_path, server):
+    assert _downloader(tmp_path, server).refresh()
+    assert not _downloader(tmp_path, server).refresh()
+    assert len(_downloader(tmp_path, server).history.snapshot_times()) == 1
+
+
+def test_failed_save_does_not_mark_the_payload_seen(tmp_path, server):
+    downloader = _downloader(tmp_path, server)
+
+    def fail(df, snapshot_time=None):
+        raise OSError("disk full")
+
+    downloader.history.append = fail
+    # The save error surfaces instead of being treated as an HTTP failure (which would try Selenium)
+    with pytest.raises(OSError, match="disk full"):
+        downloader.refresh()
+    assert not os.path.exists(os.path.join(downloader.store.root, HTTP_CACHE_FILE))
+
+    retry = _downloader(tmp_path, server)
+    assert retry.refresh()
+    assert len(retry.history.snapshot_times()) == 1
+    assert len(retry.store.read()) == len(load_chain())
@@ -0,0 +1,58 @@
+import pandas as pd
+
+from ChainCache import ChainCache
+from ChainStore import ChainStore
+from SnapshotStore import SnapshotStore
+from fixtures import load_chain
+
+OPEN = pd.Timestamp("2025-01-29 11:00", tz="America/New_York")
+
+
+class StubDownloader:
+    """
+    Downloader that stores the checked-in chain on its first refresh, and afterwards either stores
+    nothing while still reporting success (a swallowed Selenium failure) or reports unchanged quotes.
+    """
+
+    def __init__(self, root, later="nothing"):
+        self.store = ChainStore(str(root / "chain_store"))
+        self.history = SnapshotStore(str(root / "snapshot_store"))
+        self.later = later
+        self.refreshes = 0
+        self.unchanged = False
+
+    def refresh(self):
+        self.refreshes += 1
+        self.unchanged = False
+        if self.refreshes == 1:
+            self.store.write(load_chain())
+            self.history.append(load_chain(), pd.Timestamp("2025-01-29 10:00"))
+            return True
+        if self.later == "unchanged":
+            self.unchanged = True
+            return False
+        return True
+
+
+def test_refresh_that_stored_nothing_is_not_a_fresh_check(tmp_path):
+    downloader = StubDownloader(tmp_path)
+    cache = ChainCache(downloader, ttl=900)
+    cache.refresh(now=OPEN)
+    written = cache.stats["expiries_written"]
+    assert written == len(downloader.store.expiries())
+
+    cache.refresh(force=True, now=OPEN + pd.Timedelta(minutes=20))
+    assert cache.stats["expiries_written"] == written
+    # The check after the empty refresh was not recorded, so the stale snapshot is not a hit
+    assert not cache.refresh(now=OPEN + pd.Timedelta(minutes=25))
+    assert downloader.refreshes == 3
+
+
+def test_confirmed_unchanged_refresh_counts_as_fresh(tmp_path):
+    downloader = StubDownloader(tmp_path, later="unchanged")
+    cache = ChainCache(downloader, ttl=900)
+    cache.refresh(now=OPEN)
+    cache.refresh(now=OPEN + pd.Timedelta(minutes=20))
+    assert cache.stats["expiries_unchanged"] == len(downloader.store.expiries())
+    assert cache.refresh(now=OPEN + pd.Timedelta(minutes=25))
+    assert downloader.refreshes == 2
@@ -0,0 +1,31 @@
+import requests
+
+from CBOEDownloader import CBOEDownloader
+from CBOEReplayServer import CBOEReplayServer, write_fixture
+from ChainCollector import ChainCollector
+from SnapshotStore import SnapshotStore
+from fixtures import load_chain
+
+SYMBOLS = ["SPX", "NDX"]
+
+
+def test_collector_refreshes_through_the_downloader(tmp_path, monkeypatch):
+    # Plain sessions instead of the randomized browser headers, which need fake_useragent
+    monkeypatch.setattr(CBOEDownloader, "create_session", staticmethod(lambda pool_size=4: requests.Session()))
+    for symbol in SYMBOLS:
+        write_fixture(load_chain(), str(tmp_path / "fixtures"), symbol=symbol)
+
+    with CBOEReplayServer(str(tmp_path / "fixtures")) as server:
+        collector = ChainCollector(SYMBOLS, root=str(tmp_path / "collections"), base_url=server.url)
+        try:
+            assert collector.collect_once() == {symbol: None for symbol in SYMBOLS}
+            # Second cycle: unchanged payloads are skipped, so no new snapshots
+            assert collector.collect_once() == {symbol: None for symbol in SYMBOLS}
+        finally:
+            collector.close()
+
+    for symbol in SYMBOLS:
+        history = SnapshotStore(str(tmp_path / "collections" / symbol / "snapshot_store"))
+        assert len(history.snapshot_times()) == 1
+    # HTTP succeeded, so no WebDriver was ever launched
+    assert not collector._drivers._created
@@ -0,0 +1,12 @@
+from fixtures import VALUATION_DATE, load_chain
+from SABRCalculator import SABR_PARAMS, SABRCalculator
+
+
+def test_sabr_exposes_only_the_sabr_surface():
+    calculator = SABRCalculator()
+    for name in ("calibrate_ssvi", "_fit", "_warm_start", "max_workers"):
+        assert not hasattr(calculator, name)
+
+    params = calculator.calibrate(load_chain(), valuation_date=VALUATION_DATE)
+    assert list(params.columns) == ["T", "forward"] + SABR_PARAMS + ["rmse", "success"]
+    assert params["success"].mean() > 0.9
@@ -0,0 +1,63 @@
+import pandas as pd
+
+from fixtures import load_chain
+from SnapshotStore import SnapshotStore
+
+FIRST = pd.Timestamp("2025-01-29 10:00")
+SECOND = pd.Timestamp("2025-01-29 11:00")
+
+
+def _sorted(df):
+    df = df.copy()
+    df["Type"] = df["Type"].astype(str)
+    df["Expiration Date"] = pd.to_datetime(df["Expiration Date"]).astype("datetime64[ns]")
+    columns = ["Expiration Date", "Type", "Strike", "Bid", "Ask", "Index Spot"]
+    return df[columns].sort_values(columns, kind="stable").reset_index(drop=True)
+
+
+def _two_snapshots(root):
+    # One expiry's quotes move between the snapshots; the others are unchanged
+    chain = load_chain()
+    changed = chain.copy()
+    expiry = changed["Expiration Date"].drop_duplicates().iloc[2]
+    rows = changed["Expiration Date"] == expiry
+    changed.loc[rows, "Bid"] += 0.05
+    changed.loc[rows, "Ask"] += 0.05
+    store = SnapshotStore(root)
+    store.append(chain, FIRST)
+    store.append(changed, SECOND)
+    return chain, changed, expiry
+
+
+def test_snapshot_keeps_unchanged_expiries(tmp_path):
+    _, changed, _ = _two_snapshots(tmp_path)
+    store = SnapshotStore(tmp_path)
+    restored = store.snapshot(SECOND)
+    assert len(restored) == len(changed)
+    pd.testing.assert_frame_equal(_sorted(restored), _sorted(changed))
+
+
+def test_every_expiry_gets_an_index_row(tmp_path):
+    chain, _, expiry = _two_snapshots(tmp_path)
+    index = SnapshotStore(tmp_path).index()
+    second = index[index["Snapshot Time"] == SECOND]
+    assert len(second) == chain["Expiration Date"].nunique()
+    assert (second.loc[second["Expiration Date"] != expiry, "Rows"] == 0).all()
+
+
+def test_query_lists_unchanged_snapshots(tmp_path):
+    chain, _, expiry = _two_snapshots(tmp_path)
+    unchanged = chain["Expiration Date"].drop_duplicates().iloc[0]
+    history = SnapshotStore(tmp_path).query(unchanged)
+    assert sorted(history["Snapshot Time"].unique()) == [FIRST, SECOND]
+    assert (history.groupby("Snapshot Time").size() == (chain["Expiration Date"] == unchanged).sum()).all()
+
+
+def test_spot_change_alone_is_recorded(tmp_path):
+    chain = load_chain()
+    store = SnapshotStore(tmp_path)
+    store.append(chain, FIRST)
+    store.append(chain.assign(**{"Index Spot": chain["Index Spot"] + 1.0}), SECOND)
+    restored = SnapshotStore(tmp_path).snapshot(SECOND)
+    assert len(restored) == len(chain)
+    assert (restored["Index Spot"] == chain["Index Spot"].iloc[0] + 1.0).all()
@@ -0,0 +1,18 @@
+import numpy as np
+
+from fixtures import VALUATION_DATE, load_chain
+from VolSurfaceCalculator import SSVI_CALENDAR_TOL, SVI_PARAMS, VolSurfaceCalculator, svi_total_variance
+
+
+def test_essvi_fits_most_slices_without_calendar_arbitrage():
+    calculator = VolSurfaceCalculator()
+    chain = load_chain()
+    ssvi = calculator.calibrate_ssvi(chain, valuation_date=VALUATION_DATE)
+    essvi = calculator.calibrate_ssvi(chain, valuation_date=VALUATION_DATE, extended=True)
+
+    assert essvi["success"].mean() >= 0.55
+    assert essvi["success"].sum() > ssvi["success"].sum()
+    assert essvi.attrs["ssvi"]["calendar_violation"] <= SSVI_CALENDAR_TOL
+    # Total variance never falls from one expiry to the next, anywhere on the strike axis
+    w = svi_total_variance(essvi[SVI_PARAMS].to_numpy(dtype=float)[:, None, :], np.linspace(-3.0, 1.0, 801))
+    assert np.diff(w, axis=0).min() >= -1e-12
@@ -0,0 +1,109 @@
+import threading
+import time
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+from ChainStore import ChainStore
+from YFinanceDownloader import YFinanceDownloader
+
+EXPIRATIONS = ("2025-02-07", "2025-02-14", "2025-02-21", "2025-02-28", "2025-03-21", "2025-04-17")
+STRIKES = np.arange(580.0, 620.0, 5.0)
+OptionChain = namedtuple("OptionChain", ["calls", "puts"])
+
+
+class StubClient:
+    """
+    Stand-in for the yfinance module: Ticker objects that refuse to be shared between threads and
+    record when every request was made.
+    """
+
+    def __init__(self, delay=0.0, failures=()):
+        self.delay = delay
+        self.failures = set(failures)
+        self.tickers = []
+        self.calls = []
+        self.active = 0
+        self.max_active = 0
+        self.lock = threading.Lock()
+
+    def Ticker(self, symbol):
+        ticker = StubTicker(self, symbol)
+        with self.lock:
+            self.tickers.append(ticker)
+        return ticker
+
+    def request(self, ticker, what):
+        with self.lock:
+            if ticker.thread is None:
+                ticker.thread = threading.get_ident()
+            assert ticker.thread == threading.get_ident(), "Ticker shared between threads"
+            self.calls.append((time.monotonic(), what))
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+            fail = what in self.failures
+            self.failures.discard(what)
+        try:
+            time.sleep(self.delay)
+            if fail:
+                raise ConnectionError(f"stub failure for {what}")
+        finally:
+            with self.lock:
+                self.active -= 1
+
+
+class StubTicker:
+    def __init__(self, client, symbol):
+        self.client = client
+        self.symbol = symbol
+        self.thread = None
+
+    @property
+    def options(self):
+        return EXPIRATIONS
+
+    def history(self, period="1d"):
+        self.client.request(self, "history")
+        return pd.DataFrame({"Close": [600.0]})
+
+    def option_chain(self, expiry):
+        self.client.request(self, expiry)
+        n = len(STRIKES)
+        quotes = pd.DataFrame({
+            "strike": STRIKES, "lastPrice": 1.0, "change": 0.0, "bid": 1.0, "ask": 1.1,
+            "volume": 10, "openInterest": 100, "impliedVolatility": 0.2,
+        }, index=np.arange(n))
+        return OptionChain(quotes, quotes.copy())
+
+
+def _downloader(tmp_path, client, **kwargs):
+    return YFinanceDownloader(ticker="SPY", store_dir=str(tmp_path / "chain_store"),
+                              history_dir=str(tmp_path / "snapshot_store"), client=client, backoff=0.01, **kwargs)
+
+
+def test_concurrent_assembly_uses_a_ticker_per_thread(tmp_path):
+    client = StubClient(delay=0.05, failures={EXPIRATIONS[1]})
+    downloader = _downloader(tmp_path, client, max_workers=4)
+    assert downloader.refresh()
+
+    chain = ChainStore(str(tmp_path / "chain_store")).read()
+    assert sorted(chain["Expiration Date"].dt.strftime("%Y-%m-%d").unique()) == list(EXPIRATIONS)
+    assert len(chain) == 2 * len(STRIKES) * len(EXPIRATIONS)
+    assert (chain["Index Spot"] == 600.0).all()
+    # Requests overlapped, each worker thread had its own Ticker, and the failed expiry was retried
+    assert client.max_active > 1
+    used = [ticker for ticker in client.tickers if ticker.thread is not None]
+    assert len({ticker.thread for ticker in used}) == len(used)
+    assert sum(what == EXPIRATIONS[1] for _, what in client.calls) == 2
+
+
+def test_rate_limit_spaces_requests(tmp_path):
+    client = StubClient()
+    rate = 50.0
+    _downloader(tmp_path, client, max_workers=4, rate_limit=rate).refresh()
+
+    starts = np.sort([t for t, _ in client.calls])
+    assert len(starts) == len(EXPIRATIONS) + 1
+    # The limiter hands out start slots 1 / rate apart; thread wake-up only adds jitter between them
+    assert starts[-1] - starts[0] >= 0.95 * (len(starts) - 1) / rate